@@ -0,0 +1,521 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+An asyncio IMAP client.
+
+AsyncIMAPClient offers coroutine versions of the main IMAPClient
+methods over asyncio streams, so one event loop can drive many IMAP
+sessions at once::
+
+    async def count_unseen(host, user, password):
+        async with AsyncIMAPClient(host, ssl=True) as client:
+            await client.login(user, password)
+            await client.select_folder('INBOX', readonly=True)
+            return len(await client.search('UNSEEN'))
+
+Responses are parsed with the same response_parser and response_lexer
+code as IMAPClient and results have the same form.
+
+This module requires Python 3.5 or later and is not imported by the
+imapclient package.
+"""
+
+import asyncio
+import re
+
+from .imapclient import (
+    IMAPClient,
+    DELETED,
+    UIDSet,
+    as_pairs,
+    _parse_untagged_response,
+    datetime_to_imap,
+    from_bytes,
+    messages_to_str,
+    normalise_search_criteria,
+    normalise_text_list,
+    seq_to_parenstr,
+    seq_to_parenstr_upper,
+    to_bytes,
+)
+from .imap_utf7 import encode as encode_utf7
+from .response_parser import parse_fetch_response, parse_response
+from .transport import MAXLINE
+
+__all__ = ['AsyncIMAPClient']
+
+CRLF = b'\r\n'
+
+TAGGED_RE = re.compile(br'(?P<tag>[A-Za-z0-9]+) (?P<type>[A-Za-z]+) ?(?P<data>.*)', re.DOTALL)
+UNTAGGED_RE = re.compile(br'\* (?:(?P<num>\d+) )?(?P<type>[A-Za-z-]+) ?(?P<data>.*)', re.DOTALL)
+RESPONSE_CODE_RE = re.compile(br'\[(?P<type>[A-Za-z-]+) ?(?P<data>[^\]]*)\]')
+LITERAL_RE = re.compile(br'\{(?P<size>\d+)\}$')
+
+# How long idle_check() keeps reading once a response has arrived, to
+# collect responses sent together.
+IDLE_DRAIN_TIMEOUT = 0.05
+
+
+class _Response(object):
+    # One response from the server. *records* are in the form imaplib
+    # uses for untagged data: the text after the response type, with a
+    # (text, literal) tuple for each literal.
+
+    def __init__(self, tag, type, records, raw=None):
+        self.tag = tag
+        self.type = type
+        self.records = records
+        self.raw = raw
+
+
+class AsyncIMAPClient(object):
+    """An asyncio IMAP client.
+
+    The constructor arguments are as per IMAPClient, except that
+    *stream* isn't supported. *ssl_context* may be given to control
+    certificate checks for SSL connections. The connection is opened by
+    ``connect()``, or by entering an ``async with`` block.
+
+    The *use_uid*, *folder_encode*, *normalise_times*,
+    *buffer_literals* and *epoch_times* attributes behave as they do for
+    IMAPClient. Errors are reported with the same exception classes.
+    """
+
+    Error = IMAPClient.Error
+    AbortError = IMAPClient.AbortError
+    ReadOnlyError = IMAPClient.ReadOnlyError
+
+    def __init__(self, host, port=None, use_uid=True, ssl=False, ssl_context=None):
+        if port is None:
+            port = ssl and 993 or 143
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.ssl_context = ssl_context
+        self.use_uid = use_uid
+        self.folder_encode = True
+        self.normalise_times = True
+        self.buffer_literals = False
+        self.epoch_times = False
+
+        self.welcome = None
+        self._reader = None
+        self._writer = None
+        self._tagnum = 0
+        self._untagged = {}
+        self._cached_capabilities = None
+        self._idle_tag = None
+
+    # These only depend on the attributes above.
+    _proc_folder_list = IMAPClient._proc_folder_list
+    _process_select_response = IMAPClient._process_select_response
+    _filter_fetch_dict = IMAPClient._filter_fetch_dict
+    _save_capabilities = IMAPClient._save_capabilities
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.logout()
+        else:
+            self.close()
+
+    async def connect(self):
+        """Open the connection and read the server greeting."""
+        self._reader, self._writer = await self._open_connection()
+        greeting = await self._read_response()
+        if greeting.type not in ('OK', 'PREAUTH'):
+            raise self.Error('Unexpected greeting: %r' % greeting.records)
+        self.welcome = from_bytes(greeting.records[0])
+        code = self._untagged.pop('CAPABILITY', None)
+        if code:
+            self._save_capabilities(code[0])
+
+    def _open_connection(self):
+        ssl = None
+        if self.ssl:
+            ssl = self.ssl_context or True
+        # The stream's limit caps the length of a line, as imaplib's
+        # _MAXLINE does; asyncio's default is only 64 KiB.
+        return asyncio.open_connection(self.host, self.port, ssl=ssl,
+                                       limit=MAXLINE)
+
+    def close(self):
+        """Close the connection without logging out."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def login(self, username, password):
+        """Login using *username* and *password*, returning the
+        server response.
+        """
+        text, _ = await self._simple_command('LOGIN', _quote(username), _quote(password))
+        self._cached_capabilities = None
+        code = self._untagged.pop('CAPABILITY', None)
+        if code:
+            self._save_capabilities(code[0])
+        return text
+
+    async def logout(self):
+        """Logout, returning the server response."""
+        try:
+            tag = await self._send_command('LOGOUT')
+            while True:
+                response = await self._read_response()
+                if response.tag == tag:
+                    return from_bytes(response.records[0])
+        finally:
+            self.close()
+
+    async def capabilities(self):
+        """Returns the server capability list, as per
+        IMAPClient.capabilities().
+        """
+        if not self._cached_capabilities:
+            await self._simple_command('CAPABILITY')
+            self._save_capabilities(self._untagged.pop('CAPABILITY')[0])
+        return self._cached_capabilities
+
+    async def has_capability(self, capability):
+        """Return ``True`` if the IMAP server has the given *capability*.
+        """
+        return capability.upper() in await self.capabilities()
+
+    async def list_folders(self, directory="", pattern="*"):
+        """Return a list of folders on the server, as per
+        IMAPClient.list_folders().
+        """
+        return await self._do_list('LIST', directory, pattern)
+
+    async def list_sub_folders(self, directory="", pattern="*"):
+        """Return a list of subscribed folders on the server, as per
+        IMAPClient.list_sub_folders().
+        """
+        return await self._do_list('LSUB', directory, pattern)
+
+    async def _do_list(self, cmd, directory, pattern):
+        await self._simple_command(cmd, self._normalise_folder(directory),
+                                   self._normalise_folder(pattern))
+        return self._proc_folder_list(self._untagged.pop(cmd, []))
+
+    async def select_folder(self, folder, readonly=False):
+        """Set the current folder on the server, returning the
+        ``SELECT`` response as per IMAPClient.select_folder().
+        """
+        self._untagged = {}
+        await self._simple_command(readonly and 'EXAMINE' or 'SELECT',
+                                   self._normalise_folder(folder))
+        untagged, self._untagged = self._untagged, {}
+        return self._process_select_response(untagged)
+
+    async def close_folder(self):
+        """Close the currently selected folder, returning the server
+        response string.
+        """
+        text, _ = await self._simple_command('CLOSE')
+        return text
+
+    async def create_folder(self, folder):
+        """Create *folder* on the server returning the server response string.
+        """
+        text, _ = await self._simple_command('CREATE', self._normalise_folder(folder))
+        return text
+
+    async def delete_folder(self, folder):
+        """Delete *folder* on the server returning the server response string.
+        """
+        text, _ = await self._simple_command('DELETE', self._normalise_folder(folder))
+        return text
+
+    async def folder_status(self, folder, what=None):
+        """Return the status of *folder*, as per
+        IMAPClient.folder_status().
+        """
+        if what is None:
+            what = ('MESSAGES', 'RECENT', 'UIDNEXT', 'UIDVALIDITY', 'UNSEEN')
+        else:
+            what = normalise_text_list(what)
+        await self._simple_command('STATUS', self._normalise_folder(folder),
+                                   '(%s)' % ' '.join(what))
+        _, status_items = parse_response(self._untagged.pop('STATUS')[-1:])
+        return dict(as_pairs(status_items))
+
+    async def search(self, criteria='ALL', charset=None):
+        """Return a list of messages ids matching *criteria*, as per
+        IMAPClient.search().
+        """
+        return [int(i) for i in (await self._search(criteria, charset)).split()]
+
+    async def search_uidset(self, criteria='ALL', charset=None):
+        """Return a UIDSet of the message ids matching *criteria*, as
+        per IMAPClient.search_uidset().
+        """
+        return UIDSet.from_search(await self._search(criteria, charset))
+
+    async def _search(self, criteria, charset):
+        args = ['CHARSET', charset] if charset else []
+        args.extend(normalise_search_criteria(criteria))
+        await self._simple_command('SEARCH', *args, uid=True)
+        return b' '.join(data for data in self._untagged.pop('SEARCH', []) if data)
+
+    async def fetch(self, messages, data, modifiers=None):
+        """Retrieve selected *data* associated with one or more
+        *messages*, as per IMAPClient.fetch().
+        """
+        if not messages:
+            return {}
+        await self._simple_command('FETCH', messages_to_str(messages),
+                                   seq_to_parenstr_upper(data),
+                                   seq_to_parenstr_upper(modifiers) if modifiers else None,
+                                   uid=True)
+        return parse_fetch_response(self._untagged.pop('FETCH', [None]),
+                                    self.normalise_times, self.use_uid,
+                                    buffer_literals=self.buffer_literals,
+                                    epoch_times=self.epoch_times,
+                                    decode_literals=True)
+
+    async def get_flags(self, messages):
+        """Return the flags set for each message in *messages*."""
+        return self._filter_fetch_dict(await self.fetch(messages, ['FLAGS']), 'FLAGS')
+
+    async def add_flags(self, messages, flags):
+        """Add *flags* to *messages*, as per IMAPClient.add_flags()."""
+        return await self._store('+FLAGS', messages, flags)
+
+    async def remove_flags(self, messages, flags):
+        """Remove *flags* from *messages*, as per
+        IMAPClient.remove_flags()."""
+        return await self._store('-FLAGS', messages, flags)
+
+    async def set_flags(self, messages, flags):
+        """Set the *flags* for *messages*, as per IMAPClient.set_flags()."""
+        return await self._store('FLAGS', messages, flags)
+
+    async def delete_messages(self, messages):
+        """Delete one or more *messages* from the currently selected
+        folder, as per IMAPClient.delete_messages().
+        """
+        return await self.add_flags(messages, DELETED)
+
+    async def _store(self, cmd, messages, flags):
+        if not messages:
+            return {}
+        await self._simple_command('STORE', messages_to_str(messages), cmd,
+                                   seq_to_parenstr(flags), uid=True)
+        return self._filter_fetch_dict(
+            parse_fetch_response(self._untagged.pop('FETCH', [None]), decode_literals=True),
+            'FLAGS')
+
+    async def append(self, folder, msg, flags=(), msg_time=None):
+        """Append a message to *folder*, as per IMAPClient.append().
+        """
+        time_val = '"%s"' % datetime_to_imap(msg_time) if msg_time else None
+        text, _ = await self._simple_command('APPEND', self._normalise_folder(folder),
+                                             seq_to_parenstr(flags), time_val,
+                                             literal=to_bytes(msg))
+        return text
+
+    async def copy(self, messages, folder):
+        """Copy one or more messages from the current folder to
+        *folder*. Returns the COPY response string returned by the
+        server.
+        """
+        text, _ = await self._simple_command('COPY', messages_to_str(messages),
+                                             self._normalise_folder(folder), uid=True)
+        return text
+
+    async def expunge(self):
+        """Remove messages with the ``\\Deleted`` flag set, returning
+        the server response message and the untagged responses, as per
+        IMAPClient.expunge().
+        """
+        return await self._simple_command('EXPUNGE', parse=True)
+
+    async def noop(self):
+        """Execute the NOOP command, returning the server response
+        message and any status updates, as per IMAPClient.noop().
+        """
+        return await self._simple_command('NOOP', parse=True)
+
+    async def idle(self):
+        """Put the server into IDLE mode. Use ``idle_check()`` to wait
+        for IDLE responses and ``idle_done()`` to stop IDLE mode.
+        """
+        self._idle_tag = tag = await self._send_command('IDLE')
+        while True:
+            response = await self._read_response()
+            if response.tag == '+':
+                return
+            if response.tag == tag:
+                self._idle_tag = None
+                raise self.Error('Unexpected IDLE response: %r' % response.records)
+
+    async def idle_check(self, timeout=None):
+        """Wait for IDLE responses from the server.
+
+        Waits for at most *timeout* seconds (forever if None) for a
+        response, returning an empty list if none arrives. Otherwise
+        returns the parsed responses, as per IMAPClient.idle_check().
+        """
+        try:
+            response = await self._read_response(timeout)
+        except asyncio.TimeoutError:
+            return []
+        out = []
+        while True:
+            if response.tag is None:
+                out.append(_parse_untagged(response))
+            elif response.tag == self._idle_tag:
+                # The server ended IDLE itself.
+                self._idle_tag = None
+                raise self.Error('IDLE ended by the server: %r' %
+                                 from_bytes(response.records[0]))
+            try:
+                response = await self._read_response(IDLE_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                return out
+
+    async def idle_done(self):
+        """Take the server out of IDLE mode, returning the command text
+        and any IDLE responses not yet returned by idle_check().
+        """
+        if self._idle_tag is None:
+            raise self.Error('not in IDLE mode')
+        self._writer.write(b'DONE' + CRLF)
+        tag, self._idle_tag = self._idle_tag, None
+        return await self._complete(tag, 'IDLE', parse=True)
+
+    def _normalise_folder(self, folder_name):
+        if isinstance(folder_name, bytes):
+            folder_name = folder_name.decode('ascii')
+        if self.folder_encode:
+            folder_name = encode_utf7(folder_name)
+        return _quote(folder_name)
+
+    async def _simple_command(self, name, *args, uid=False, literal=None, parse=False):
+        if uid and self.use_uid:
+            name = 'UID ' + name
+        tag = await self._send_command(name, *args, literal=literal)
+        return await self._complete(tag, name, parse)
+
+    async def _send_command(self, name, *args, literal=None):
+        self._tagnum += 1
+        tag = 'A%d' % self._tagnum
+        line = b' '.join([to_bytes(tag), to_bytes(name)] +
+                         [to_bytes(arg) for arg in args if arg is not None])
+        if literal is None:
+            self._writer.write(line + CRLF)
+        else:
+            self._writer.write(line + b' {%d}' % len(literal) + CRLF)
+            response = await self._read_response()
+            while response.tag != '+':
+                if response.tag == tag:
+                    raise self.Error('%s failed: %r' % (name, from_bytes(response.records[0])))
+                response = await self._read_response()
+            self._writer.write(literal + CRLF)
+        await self._writer.drain()
+        return tag
+
+    async def _complete(self, tag, command, parse=False):
+        # Read responses until *tag* completes, returning the response
+        # text and, if *parse* is true, the parsed untagged responses
+        # (otherwise None). Untagged data is also kept in
+        # self._untagged, keyed by type, as imaplib does.
+        responses = []
+        while True:
+            response = await self._read_response()
+            if response.tag == tag:
+                break
+            if response.type == 'BYE':
+                raise self.AbortError(from_bytes(response.records[0]))
+            if parse and response.tag is None:
+                responses.append(response)
+        text = from_bytes(response.records[0])
+        if response.type != 'OK':
+            raise self.Error('%s failed: %r' % (command.lower(), text))
+        if not parse:
+            return text, None
+        return text, [_parse_untagged(r) for r in responses]
+
+    async def _read_response(self, timeout=None):
+        line = self._readline()
+        if timeout is not None:
+            line = asyncio.wait_for(line, timeout)
+        line = await line
+        if not line:
+            raise self.AbortError('socket error: EOF')
+
+        raw = []
+        while True:
+            line = line[:-2] if line.endswith(CRLF) else line.rstrip(b'\r\n')
+            match = LITERAL_RE.search(line)
+            if not match:
+                raw.append(line)
+                break
+            literal = await self._reader.readexactly(int(match.group('size')))
+            raw.append((line, literal))
+            line = await self._readline()
+        return self._classify(raw)
+
+    async def _readline(self):
+        try:
+            return await self._reader.readline()
+        except ValueError:
+            # Raised by the stream for lines longer than its limit.
+            raise self.Error('got more than %d bytes' % MAXLINE)
+
+    def _classify(self, raw):
+        records = list(raw)
+        first = records[0]
+        text = first[0] if isinstance(first, tuple) else first
+        if text.startswith(b'+'):
+            return _Response('+', None, [text[2:]])
+
+        match = UNTAGGED_RE.match(text)
+        if match:
+            typ = match.group('type').decode('ascii').upper()
+            data = match.group('data')
+            if match.group('num'):
+                data = match.group('num') + (b' ' + data if data else b'')
+            if typ in ('OK', 'NO', 'BAD', 'PREAUTH', 'BYE'):
+                code = RESPONSE_CODE_RE.match(data)
+                if code:
+                    self._untagged.setdefault(code.group('type').decode('ascii').upper(), []) \
+                        .append(code.group('data'))
+                    data = data[code.end():].lstrip()
+            records[0] = (data, first[1]) if isinstance(first, tuple) else data
+            self._untagged.setdefault(typ, []).extend(records)
+            return _Response(None, typ, records, raw)
+
+        match = TAGGED_RE.match(text)
+        if not match:
+            raise self.AbortError('unexpected response: %r' % text)
+        data = match.group('data')
+        code = RESPONSE_CODE_RE.match(data)
+        if code:
+            self._untagged.setdefault(code.group('type').decode('ascii').upper(), []) \
+                .append(code.group('data'))
+        return _Response(match.group('tag').decode('ascii'),
+                         match.group('type').decode('ascii').upper(), [data])
+
+
+def _parse_untagged(response):
+    # Parse an untagged response as IMAPClient.idle_check() does.
+    first = response.raw[0]
+    if isinstance(first, tuple):
+        records = [(first[0][2:], first[1])] + response.raw[1:]
+        return parse_response(records)
+    return _parse_untagged_response(first)
+
+
+def _quote(arg):
+    if isinstance(arg, bytes):
+        arg = arg.decode('ascii')
+    arg = arg.replace('\\', '\\\\')
+    arg = arg.replace('"', '\\"')
+    return '"%s"' % arg
@@ -0,0 +1,162 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Batch planning for bulk FETCH.
+
+Fetching many messages in fixed size batches is either wasteful (many
+round trips for small items like FLAGS) or risky (huge responses for
+RFC822 of large messages). A BatchPlanner picks each batch so that the
+expected response is about *target_bytes*, using the RFC822.SIZE of
+the messages if known, and adjusts as it measures how long batches
+take::
+
+    planner = BatchPlanner(target_bytes=4 * 1024 * 1024)
+    for msgid, data in fetch_in_batches(client, uids, ['RFC822'], planner):
+        ...
+    print(planner.batch_sizes)
+
+Batches also stay within *max_line_length*, so the FETCH command line
+isn't rejected by servers that limit its length.
+"""
+
+from __future__ import division, unicode_literals
+
+from timeit import default_timer
+
+from .imapclient import _format_run, normalise_text_list
+from .six import iteritems
+
+__all__ = ['BatchPlanner', 'fetch_in_batches']
+
+# Space kept on the command line for the tag, command and data items.
+COMMAND_OVERHEAD = 200
+
+
+class BatchPlanner(object):
+    """Chooses FETCH batch sizes.
+
+    Messages whose size isn't known are estimated at
+    *default_message_size* bytes. Batches hold between *min_batch* and
+    *max_batch* messages. After each batch is recorded, the byte target
+    is halved if the batch took longer than *target_seconds* and
+    doubled (up to *target_bytes*) if it took less than a quarter of
+    that.
+    """
+
+    def __init__(self, target_bytes=1024 * 1024, target_seconds=2.0,
+                 default_message_size=256, min_batch=1, max_batch=5000,
+                 max_line_length=8000):
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.default_message_size = default_message_size
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.max_line_length = max_line_length
+        self.byte_limit = target_bytes
+        self.history = []
+
+    @property
+    def batch_sizes(self):
+        """The number of messages in each batch recorded so far."""
+        return [count for count, _, _ in self.history]
+
+    def plan(self, messages, sizes=None):
+        """Yield lists of message ids from *messages*, in order, one per
+        batch. *sizes* is an optional dict of message id to size in
+        bytes.
+
+        Batches are planned as they are requested, so a batch reflects
+        the timings recorded for earlier batches.
+        """
+        sizes = sizes or {}
+        default_size = self.default_message_size
+        line_limit = self.max_line_length - COMMAND_OVERHEAD
+        batch = []
+        total = 0
+        line_length = 0
+        run_start = None
+        for msgid in messages:
+            size = sizes.get(msgid, default_size)
+            extends = batch and msgid == batch[-1] + 1
+            if extends:
+                added = (len(_format_run(run_start, msgid)) -
+                         len(_format_run(run_start, batch[-1])))
+            else:
+                added = len(str(msgid)) + (1 if batch else 0)
+            if batch and (len(batch) >= self.max_batch or
+                          line_length + added > line_limit or
+                          (total + size > self.byte_limit and len(batch) >= self.min_batch)):
+                yield batch
+                batch = []
+                total = 0
+                line_length = 0
+                extends = False
+                added = len(str(msgid))
+            if not extends:
+                run_start = msgid
+            line_length += added
+            batch.append(msgid)
+            total += size
+        if batch:
+            yield batch
+
+    def record(self, count, seconds, nbytes=None):
+        """Record that a batch of *count* messages (*nbytes* bytes, if
+        known) took *seconds* to fetch, and adjust the byte target.
+        """
+        self.history.append((count, seconds, nbytes))
+        if seconds > self.target_seconds:
+            self.byte_limit = max(self.byte_limit // 2, 1)
+        elif seconds < self.target_seconds / 4:
+            self.byte_limit = min(self.byte_limit * 2, self.target_bytes)
+
+
+def fetch_in_batches(client, messages, data, planner=None, sizes=None,
+                     prefetch_sizes=None, modifiers=None):
+    """Fetch *data* for *messages* with *client*, in batches chosen by
+    *planner* (a default BatchPlanner if None). Yields ``(msgid,
+    dict)`` tuples as per IMAPClient.fetch().
+
+    *sizes* is an optional dict of message id to size. If it isn't
+    given and *data* includes message content (RFC822, BODY[...],
+    etc.), the RFC822.SIZE of every message is fetched first, unless
+    *prefetch_sizes* is False.
+    """
+    if planner is None:
+        planner = BatchPlanner()
+    messages = list(messages)
+    if sizes is None:
+        if prefetch_sizes is None:
+            prefetch_sizes = _fetches_content(data)
+        if prefetch_sizes and messages:
+            # RFC822.SIZE responses are small, so only the line length
+            # and max_batch limit these batches.
+            size_planner = BatchPlanner(default_message_size=0,
+                                        max_batch=planner.max_batch,
+                                        max_line_length=planner.max_line_length)
+            sizes = {}
+            for batch in size_planner.plan(messages):
+                for msgid, values in iteritems(client.fetch(batch, ['RFC822.SIZE'])):
+                    sizes[msgid] = values.get('RFC822.SIZE', 0)
+
+    for batch in planner.plan(messages, sizes):
+        start = default_timer()
+        fetched = client.fetch(batch, data, modifiers)
+        elapsed = default_timer() - start
+        nbytes = sizes and sum(sizes.get(msgid, 0) for msgid in batch)
+        planner.record(len(batch), elapsed, nbytes or None)
+        for msgid in batch:
+            if msgid in fetched:
+                yield msgid, fetched[msgid]
+
+
+def _fetches_content(data):
+    for item in normalise_text_list(data):
+        item = item.upper()
+        if item == 'RFC822.SIZE' or item == 'RFC822.HEADER':
+            continue
+        if item.startswith(('RFC822', 'BODY[', 'BODY.PEEK[', 'BINARY')):
+            return True
+    return False
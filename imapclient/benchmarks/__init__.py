@@ -0,0 +1,10 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Benchmarks for IMAPClient. These are not unit tests and are not run
+by the test suite. Run them as modules, eg.::
+
+    python -m imapclient.benchmarks.bodystructure_memory
+"""
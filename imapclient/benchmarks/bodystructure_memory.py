@@ -0,0 +1,131 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Measure the memory used by BODYSTRUCTURE trees.
+
+The slotted, lazily built Body/BodyData nodes are compared with the
+previous representation, where every node was a list with a __dict__
+holding its type and content type and every sub-part was converted up
+front. Both are built over the same parsed tuples, so only the memory
+added by the node representation is counted.
+
+Requires tracemalloc (Python 3.4+).
+"""
+
+from __future__ import print_function, unicode_literals
+
+import gc
+from optparse import OptionParser
+
+from ..response_parser import parse_response, Body, BodyData
+from ..six import string_types, moves
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+STRUCTURES = [
+    '("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 1152 23)',
+    '(("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 2210 50)'
+    '("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 9012 180) "ALTERNATIVE")',
+    '(("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 320 8)'
+    '("APPLICATION" "OCTET-STREAM" ("NAME" "smime.p7m") NIL NIL "BASE64" 88120) "MIXED")',
+    '((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 540 12)'
+    '("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 2400 40) "ALTERNATIVE")'
+    '("IMAGE" "PNG" ("NAME" "logo.png") "<logo@x>" NIL "BASE64" 12034)'
+    '("APPLICATION" "PDF" ("NAME" "report.pdf") NIL NIL "BASE64" 402311) "MIXED")',
+]
+
+
+class _ListBody(list):
+    # The representation before Body became a slotted tuple.
+
+    @classmethod
+    def create(cls, data):
+        if isinstance(data[0], tuple):
+            return _ListBodyTypeMPart(data)
+        return _ListBodyType1Part(data)
+
+
+class _ListBodyType1Part(_ListBody):
+
+    def __init__(self, data):
+        self.extend(data)
+        if (data[0].lower() == 'message' and data[1].lower() == 'rfc822'):
+            self.type = 'body-type-msg'
+        elif (data[0].lower() == 'text'):
+            self.type = 'body-type-text'
+        else:
+            self.type = 'body-type-basic'
+        self.content_type = "{0}/{1}".format(data[0].lower(), data[1].lower())
+
+
+class _ListBodyTypeMPart(_ListBody):
+
+    def __init__(self, data):
+        self.type = 'body-type-mpart'
+        for i, part in enumerate(data):
+            if isinstance(part, string_types):
+                break
+        self.extend(map(_ListBody.create, data[:i]))
+        self.extend(data[i:])
+        self.content_type = "multipart/{0}".format(part.lower())
+
+
+def make_structures(count):
+    templates = [parse_response([text])[0] for text in STRUCTURES]
+    # Every structure gets its own tuples, as it would when parsed.
+    return [_copy(templates[i % len(templates)]) for i in moves.xrange(count)]
+
+
+def _copy(data):
+    return tuple(_copy(item) if isinstance(item, tuple) else item
+                 for item in data)
+
+
+def measure(create, structures):
+    """Return the bytes allocated by calling *create* on each of the
+    *structures* and reading the content type of the result."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start = tracemalloc.get_traced_memory()[0]
+        nodes = [create(data) for data in structures]
+        for node in nodes:
+            node.content_type
+        used = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    del nodes
+    return used
+
+
+def main():
+    p = OptionParser(usage='%prog [options]')
+    p.add_option('-n', '--count', dest='count', type=int, default=100000,
+                 help='number of structures to build (default: %default)')
+    opts, args = p.parse_args()
+    if args:
+        p.error('unexpected arguments %s' % ' '.join(args))
+    if tracemalloc is None:
+        p.error('tracemalloc is needed for this benchmark (Python 3.4+)')
+
+    structures = make_structures(opts.count)
+    results = [
+        ('list nodes (previous)', measure(_ListBody.create, structures)),
+        ('Body nodes', measure(Body.create, structures)),
+        ('BodyData nodes', measure(BodyData.create, structures)),
+    ]
+    baseline = results[0][1]
+    print('%d structures' % opts.count)
+    for name, used in results:
+        print('%-22s %12d bytes %8.1f bytes/structure %6.1f%% of previous' % (
+            name, used, float(used) / opts.count, 100.0 * used / baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Measure the effect of COMPRESS=DEFLATE on bulk downloads.
+
+The synthetic FETCH responses from imapclient.benchmarks.corpus are
+laid out as they would be sent by a server, compressed as a server
+would compress them, and read back the way imaplib reads responses
+(a line, then any literal) with and without a DeflateReader. For each
+corpus the bytes on the wire and the client's read time are reported,
+along with the estimated wall-clock time of the download over a link
+of the given bandwidth::
+
+    python -m imapclient.benchmarks.compression --bandwidth 100
+"""
+
+from __future__ import print_function, unicode_literals
+
+import re
+import sys
+import zlib
+from io import BytesIO
+from optparse import OptionParser
+from timeit import default_timer
+
+from . import corpus
+from ..compression import DeflateReader
+
+SIZES = dict(
+    count=50,
+    message_size=256 * 1024,
+)
+
+_literal_re = re.compile(br'\{(\d+)\}\r\n$')
+
+
+def wire_bytes(responses):
+    """Lay out FETCH response data with literals, as returned by
+    imaplib, as sent by the server."""
+    out = []
+    for item in responses:
+        if isinstance(item, tuple):
+            line, literal = item
+            out.append(b'* ' + line + b'\r\n' + literal)
+        else:
+            out.append(item + b'\r\n')
+    return b''.join(out)
+
+
+def read_all(fileobj):
+    """Read responses from *fileobj* as imaplib does, returning the
+    number of literal bytes read."""
+    total = 0
+    while True:
+        line = fileobj.readline()
+        if not line:
+            return total
+        match = _literal_re.search(line)
+        if match:
+            total += len(fileobj.read(int(match.group(1))))
+
+
+def deflate(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = default_timer()
+        func()
+        elapsed = default_timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def measure(name, data, bandwidth, level, repeat):
+    compressed = deflate(data, level)
+    compress_secs = best_time(lambda: deflate(data, level), repeat)
+    plain_secs = best_time(lambda: read_all(BytesIO(data)), repeat)
+    inflate_secs = best_time(
+        lambda: read_all(DeflateReader(BytesIO(compressed).read)), repeat)
+    bytes_per_sec = bandwidth * 1000000 / 8.0
+    return dict(name=name,
+                plain_bytes=len(data),
+                compressed_bytes=len(compressed),
+                ratio=len(compressed) / float(len(data)),
+                compress_secs=compress_secs,
+                plain_read_secs=plain_secs,
+                compressed_read_secs=inflate_secs,
+                plain_wall_secs=len(data) / bytes_per_sec + plain_secs,
+                compressed_wall_secs=len(compressed) / bytes_per_sec + inflate_secs)
+
+
+def format_result(r):
+    return ('%-8s %12d -> %12d bytes (%3.0f%%)  deflate %.3fs  '
+            'read %.3fs -> %.3fs  wall %.2fs -> %.2fs' % (
+                r['name'], r['plain_bytes'], r['compressed_bytes'],
+                r['ratio'] * 100, r['compress_secs'], r['plain_read_secs'],
+                r['compressed_read_secs'], r['plain_wall_secs'],
+                r['compressed_wall_secs']))
+
+
+def main(argv=None):
+    p = OptionParser(usage='%prog [options]')
+    p.add_option('-s', '--scale', dest='scale', type=float, default=1.0,
+                 help='multiply the message count by this (default: %default)')
+    p.add_option('-b', '--bandwidth', dest='bandwidth', type=float, default=100.0,
+                 help='link speed in Mbit/s for the wall-clock estimate '
+                      '(default: %default)')
+    p.add_option('-l', '--level', dest='level', type=int, default=-1,
+                 help='zlib compression level used by the "server" '
+                      '(default: %default)')
+    p.add_option('-r', '--repeat', dest='repeat', type=int, default=3,
+                 help='runs per measurement, the best is kept (default: %default)')
+    opts, args = p.parse_args(argv)
+    if args:
+        p.error('unexpected arguments %s' % ' '.join(args))
+
+    count = max(1, int(SIZES['count'] * opts.scale))
+    size = SIZES['message_size']
+    corpora = [
+        ('rfc822', corpus.fetch_rfc822(count, size)),
+        ('smime', corpus.fetch_smime(count, size)),
+    ]
+    print('%d messages of %d bytes at %g Mbit/s' % (count, size, opts.bandwidth))
+    for name, responses in corpora:
+        result = measure(name, wire_bytes(responses), opts.bandwidth,
+                         opts.level, opts.repeat)
+        print(format_result(result))
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Synthetic IMAP responses for benchmarking.
+
+Each function returns data shaped like imaplib's untagged response
+data: a list of byte strings, with ``(line, literal)`` tuples where
+the server sent a literal. The output is deterministic for a given
+*seed*.
+"""
+
+from __future__ import unicode_literals
+
+import base64
+import binascii
+import random
+
+from ..imap_utf7 import encode as encode_utf7
+from ..six import moves
+
+xrange = moves.xrange
+
+FLAGS = ['\\Seen', '\\Answered', '\\Flagged', '\\Deleted', '\\Draft',
+         '$Forwarded', '$MDNSent', 'NonJunk']
+
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+WORDS = ['quarterly', 'report', 'meeting', 'lunch', 'invoice', 'Re:', 'Fwd:',
+         'project', 'update', 'urgent', 'the', 'for', 'status', 'review']
+
+BODYSTRUCTURES = [
+    '("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" %(size)d 23 NIL NIL NIL)',
+    '(("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" %(size)d 50 NIL NIL NIL)'
+    '("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 9012 180 NIL NIL NIL)'
+    ' "ALTERNATIVE" ("BOUNDARY" "----=_Part_%(n)d") NIL NIL)',
+    '(("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 320 8 NIL NIL NIL)'
+    '("APPLICATION" "OCTET-STREAM" ("NAME" "smime.p7m") NIL NIL "BASE64" %(size)d NIL'
+    ' ("ATTACHMENT" ("FILENAME" "smime.p7m")) NIL) "MIXED" ("BOUNDARY" "b%(n)d") NIL NIL)',
+    '((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 540 12 NIL NIL NIL)'
+    '("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 2400 40 NIL NIL NIL) "ALTERNATIVE"'
+    ' ("BOUNDARY" "alt%(n)d") NIL NIL)'
+    '("IMAGE" "PNG" ("NAME" "logo.png") "<logo%(n)d@example.com>" NIL "BASE64" 12034 NIL'
+    ' ("INLINE" NIL) NIL)'
+    '("APPLICATION" "PDF" ("NAME" "report.pdf") NIL NIL "BASE64" %(size)d NIL'
+    ' ("ATTACHMENT" ("FILENAME" "report.pdf")) NIL) "MIXED" ("BOUNDARY" "mix%(n)d") NIL NIL)',
+]
+
+
+def _internaldate(rng):
+    return '%2d-%s-%d %02d:%02d:%02d %s%02d%02d' % (
+        rng.randint(1, 28), rng.choice(MONTHS), rng.randint(2000, 2014),
+        rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59),
+        rng.choice('+-'), rng.randint(0, 12), rng.choice((0, 30)))
+
+
+def _address(rng):
+    name = rng.choice(WORDS).capitalize()
+    return '("%s Smith" NIL "%s" "example.com")' % (name, name.lower())
+
+
+def _envelope(rng, n):
+    return '("%s" "%s" (%s) (%s) (%s) (%s) NIL NIL NIL "<%d.%d@example.com>")' % (
+        _internaldate(rng),
+        ' '.join(rng.choice(WORDS) for _ in xrange(rng.randint(2, 8))),
+        _address(rng), _address(rng), _address(rng), _address(rng),
+        n, rng.randint(0, 10 ** 9))
+
+
+def fetch_metadata(count, seed=0):
+    """FETCH responses for ``(UID FLAGS INTERNALDATE RFC822.SIZE
+    ENVELOPE BODYSTRUCTURE)``, one line per message.
+    """
+    rng = random.Random(seed)
+    out = []
+    for n in xrange(1, count + 1):
+        flags = ' '.join(rng.sample(FLAGS, rng.randint(0, 3)))
+        size = rng.randint(500, 2000000)
+        line = '%d (UID %d FLAGS (%s) INTERNALDATE "%s" RFC822.SIZE %d ENVELOPE %s BODYSTRUCTURE %s)' % (
+            n, n + 1000, flags, _internaldate(rng), size, _envelope(rng, n),
+            rng.choice(BODYSTRUCTURES) % dict(size=size, n=n))
+        out.append(line.encode('ascii'))
+    return out
+
+
+def fetch_rfc822(count, size, seed=0):
+    """FETCH responses for ``(UID RFC822)`` where each message is a
+    literal of roughly *size* bytes.
+    """
+    rng = random.Random(seed)
+    body_line = b'QUJDREVGR0hJSktMTU5PUFFSU1RVVldYWVphYmNkZWZnaGlqa2xtbm9wcXJzdHV2d3h5ejAxMjM0\r\n'
+    out = []
+    for n in xrange(1, count + 1):
+        header = ('From: a@example.com\r\nTo: b@example.com\r\n'
+                  'Subject: message %d\r\nMessage-ID: <%d@example.com>\r\n\r\n'
+                  % (n, rng.randint(0, 10 ** 9))).encode('ascii')
+        message = header + body_line * max(1, (size - len(header)) // len(body_line))
+        line = '%d (UID %d RFC822 {%d}' % (n, n + 1000, len(message))
+        out.append((line.encode('ascii'), message))
+        out.append(b')')
+    return out
+
+
+def fetch_smime(count, size, seed=0):
+    """FETCH responses for ``(UID RFC822)`` where each message of
+    roughly *size* bytes is mostly a base64 encoded smime.p7m
+    attachment of random (incompressible) bytes, like encrypted mail.
+    """
+    rng = random.Random(seed)
+    out = []
+    for n in xrange(1, count + 1):
+        header = ('From: a@example.com\r\nTo: b@example.com\r\n'
+                  'Subject: message %d\r\nMIME-Version: 1.0\r\n'
+                  'Content-Type: multipart/mixed; boundary="b"\r\n\r\n'
+                  '--b\r\nContent-Type: text/plain\r\n\r\n'
+                  'This is an S/MIME message.\r\n--b\r\n'
+                  'Content-Type: application/octet-stream; name="smime.p7m"\r\n'
+                  'Content-Transfer-Encoding: base64\r\n\r\n' % n).encode('ascii')
+        raw_size = max(1, (size - len(header)) * 3 // 4)
+        raw = binascii.unhexlify(('%x' % rng.getrandbits(raw_size * 8)).zfill(raw_size * 2))
+        encoded = base64.b64encode(raw)
+        lines = [encoded[i:i + 76] for i in xrange(0, len(encoded), 76)]
+        message = header + b'\r\n'.join(lines) + b'\r\n--b--\r\n'
+        line = '%d (UID %d RFC822 {%d}' % (n, n + 1000, len(message))
+        out.append((line.encode('ascii'), message))
+        out.append(b')')
+    return out
+
+
+def list_folders(count, seed=0):
+    """LIST responses for *count* folders, some of them with non-ASCII
+    (modified UTF-7 encoded) names.
+    """
+    rng = random.Random(seed)
+    accented = ['Entw\xfcrfe', '\xc9l\xe8ves', 'Gr\xfc\xdfe', '\u65e5\u672c']
+    out = []
+    for n in xrange(count):
+        depth = rng.randint(1, 4)
+        parts = [rng.choice(WORDS + accented) for _ in xrange(depth)]
+        name = encode_utf7('/'.join(parts) + ' %d' % n)
+        flags = rng.choice(['\\HasNoChildren', '\\HasChildren', '\\HasNoChildren \\Marked'])
+        out.append(('(%s) "/" "%s"' % (flags, name)).encode('ascii'))
+    return out
+
+
+def search(count, seed=0):
+    """A single SEARCH response containing *count* message ids with
+    occasional gaps, as returned by imaplib (without the SEARCH keyword).
+    """
+    rng = random.Random(seed)
+    ids = []
+    uid = 0
+    for _ in xrange(count):
+        uid += 1 if rng.random() < 0.95 else rng.randint(2, 50)
+        ids.append(str(uid))
+    return [' '.join(ids).encode('ascii')]
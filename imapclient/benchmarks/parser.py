@@ -0,0 +1,206 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Micro-benchmarks for response parsing.
+
+Times parse_response, parse_fetch_response, _proc_folder_list,
+imap_utf7.decode and from_bytes over the synthetic corpora in
+imapclient.benchmarks.corpus, reporting tokens/sec and messages/sec.
+
+Results can be saved as JSON and a later run compared against them::
+
+    python -m imapclient.benchmarks.parser --save baseline.json
+    python -m imapclient.benchmarks.parser --baseline baseline.json
+
+When comparing, benchmarks that got slower by more than the threshold
+are flagged and the exit status is 1.
+"""
+
+from __future__ import print_function, unicode_literals
+
+import json
+import platform
+import sys
+import time
+from optparse import OptionParser
+from timeit import default_timer
+
+from . import corpus
+from ..imap_utf7 import decode as decode_utf7
+from ..imapclient import IMAPClient, from_bytes
+from ..response_lexer import TokenSource
+from ..response_parser import parse_response, parse_fetch_response
+
+# Corpus sizes at --scale 1
+SIZES = dict(
+    fetch=10000,
+    rfc822=200,
+    rfc822_size=64 * 1024,
+    folders=50000,
+    search=1000000,
+)
+
+
+class Benchmark(object):
+    """A timed function with the corpus it runs over.
+
+    *messages* is the number of messages (or folders, or ids) in the
+    corpus. Tokens are counted with the default lexer if *count_tokens*
+    is True.
+    """
+
+    def __init__(self, name, func, data, messages, count_tokens=True):
+        self.name = name
+        self.func = func
+        self.data = data
+        self.messages = messages
+        self.tokens = count_tokens and count_tokens_in(data) or None
+
+    def run(self, repeat):
+        best = None
+        for _ in range(repeat):
+            start = default_timer()
+            self.func(self.data)
+            elapsed = default_timer() - start
+            if best is None or elapsed < best:
+                best = elapsed
+        result = dict(seconds=best,
+                      messages=self.messages,
+                      messages_per_sec=self.messages / best)
+        if self.tokens:
+            result['tokens'] = self.tokens
+            result['tokens_per_sec'] = self.tokens / best
+        return result
+
+
+def count_tokens_in(data):
+    count = 0
+    for _ in TokenSource(from_bytes(data)):
+        count += 1
+    return count
+
+
+def _folder_lister():
+    # _proc_folder_list only needs folder_encode, so skip connecting.
+    client = IMAPClient.__new__(IMAPClient)
+    client.folder_encode = True
+    return client._proc_folder_list
+
+
+def make_benchmarks(scale=1.0):
+    def size(name):
+        return max(1, int(SIZES[name] * scale))
+
+    fetch_raw = corpus.fetch_metadata(size('fetch'))
+    fetch_text = from_bytes(fetch_raw)
+    rfc822_raw = corpus.fetch_rfc822(size('rfc822'), SIZES['rfc822_size'])
+    rfc822_text = from_bytes(rfc822_raw)
+    folders_text = from_bytes(corpus.list_folders(size('folders')))
+    folder_names = parse_response(folders_text)[2::3]
+    search_text = from_bytes(corpus.search(size('search')))
+
+    return [
+        Benchmark('parse_response.fetch', parse_response,
+                  fetch_text, len(fetch_text)),
+        Benchmark('parse_fetch_response.fetch', parse_fetch_response,
+                  fetch_text, len(fetch_text)),
+        Benchmark('parse_fetch_response.fetch_bytes', parse_fetch_response,
+                  fetch_raw, len(fetch_raw)),
+        Benchmark('parse_fetch_response.rfc822', parse_fetch_response,
+                  rfc822_text, size('rfc822')),
+        Benchmark('parse_fetch_response.rfc822_bytes', parse_fetch_response,
+                  rfc822_raw, size('rfc822')),
+        Benchmark('parse_fetch_response.rfc822_buffers',
+                  lambda data: parse_fetch_response(data, buffer_literals=True),
+                  rfc822_raw, size('rfc822')),
+        Benchmark('parse_response.search', parse_response,
+                  search_text, size('search')),
+        Benchmark('_proc_folder_list', _folder_lister(),
+                  folders_text, len(folders_text)),
+        Benchmark('imap_utf7.decode',
+                  lambda names: [decode_utf7(name) for name in names],
+                  folder_names, len(folder_names), count_tokens=False),
+        Benchmark('from_bytes.fetch', from_bytes,
+                  fetch_raw, len(fetch_raw), count_tokens=False),
+        Benchmark('from_bytes.rfc822', from_bytes,
+                  rfc822_raw, size('rfc822'), count_tokens=False),
+    ]
+
+
+def run(benchmarks, repeat, out=sys.stdout):
+    results = {}
+    for bench in benchmarks:
+        result = results[bench.name] = bench.run(repeat)
+        print(format_result(bench.name, result), file=out)
+        out.flush()
+    return results
+
+
+def format_result(name, result):
+    line = '%-38s %9.4fs %12.0f msgs/s' % (name, result['seconds'],
+                                          result['messages_per_sec'])
+    if 'tokens_per_sec' in result:
+        line += ' %12.0f tokens/s' % result['tokens_per_sec']
+    return line
+
+
+def compare(results, baseline, threshold):
+    """Return a list of ``(name, ratio)`` for benchmarks that are more
+    than *threshold* (a fraction) slower than in *baseline*.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = result['seconds'] / base['seconds']
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main(argv=None):
+    p = OptionParser(usage='%prog [options]')
+    p.add_option('-s', '--scale', dest='scale', type=float, default=1.0,
+                 help='multiply corpus sizes by this (default: %default)')
+    p.add_option('-r', '--repeat', dest='repeat', type=int, default=3,
+                 help='runs per benchmark, the best is kept (default: %default)')
+    p.add_option('-o', '--save', dest='save', default=None,
+                 help='write results as JSON to this file')
+    p.add_option('-b', '--baseline', dest='baseline', default=None,
+                 help='compare results against this JSON file')
+    p.add_option('-t', '--threshold', dest='threshold', type=float, default=0.1,
+                 help='slowdown (as a fraction) flagged as a regression '
+                      '(default: %default)')
+    opts, args = p.parse_args(argv)
+    if args:
+        p.error('unexpected arguments %s' % ' '.join(args))
+
+    results = run(make_benchmarks(opts.scale), opts.repeat)
+
+    if opts.save:
+        with open(opts.save, 'w') as fh:
+            json.dump(dict(python=platform.python_version(),
+                           time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                           scale=opts.scale,
+                           results=results),
+                      fh, indent=2, sort_keys=True)
+
+    if opts.baseline:
+        with open(opts.baseline) as fh:
+            baseline = json.load(fh)
+        if baseline.get('scale') != opts.scale:
+            print('warning: baseline was run with --scale %s' % baseline.get('scale'))
+        regressions = compare(results, baseline['results'], opts.threshold)
+        for name, ratio in regressions:
+            print('REGRESSION %s: %.0f%% slower than baseline' % (name, (ratio - 1) * 100))
+        if regressions:
+            return 1
+        print('No regressions against %s' % opts.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
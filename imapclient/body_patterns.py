@@ -0,0 +1,445 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Declarative patterns over BODY and BODYSTRUCTURE responses.
+
+Patterns are built from a few constructors and compiled once into a
+predicate that takes a BODY or BODYSTRUCTURE value as returned by
+fetch() (a BodyData, or any tuple of the same shape) and returns True
+or False::
+
+    p7m = part('application/octet-stream', params={'name': 'smime.p7m'},
+               encoding='base64')
+    is_smime = compile(multipart('mixed', ANY, p7m))
+
+    for msgid, data in client.iter_fetch(uids, ['BODYSTRUCTURE']):
+        if is_smime(data['BODYSTRUCTURE']):
+            ...
+
+Every pattern is matched against one node of the tree. ``part()``
+matches single part nodes, ``multipart()`` matches multipart nodes and
+their leading sub-parts, and ``contains()`` matches if the node or any
+node below it (including the bodies of attached message/rfc822 parts)
+matches. ``all_of()``, ``any_of()`` and ``not_()`` combine patterns.
+
+The *depth* of the top level node is 0. The *position* of a node is
+its 1-based index among its siblings; the top level node has no
+position.
+"""
+
+from __future__ import unicode_literals
+
+from . import six
+from .response_parser import _content_type
+
+__all__ = ['ANY', 'part', 'multipart', 'contains', 'all_of', 'any_of',
+           'not_', 'compile', 'classify', 'oversized', 'SMIME_P7M',
+           'SMIME_P7M_PART', 'WINMAIL_DAT', 'NESTED_MESSAGE']
+
+_string_types = six.string_types
+
+
+class Pattern(object):
+    """Base class for patterns. Subclasses implement _compile(), which
+    returns a function taking ``(node, depth, position)``.
+    """
+
+    _compiled = None
+
+    def compile(self):
+        if self._compiled is None:
+            self._compiled = self._compile()
+        return self._compiled
+
+
+class _Any(Pattern):
+
+    def _compile(self):
+        return lambda node, depth, position: True
+
+    def __repr__(self):
+        return 'ANY'
+
+ANY = _Any()
+
+
+class _Node(Pattern):
+    # Checks shared by part() and multipart().
+
+    def __init__(self, params=None, depth=None, position=None,
+                 min_size=None, max_size=None):
+        self.params = params and dict((k.lower(), v and v.lower())
+                                      for k, v in params.items())
+        self.depth = depth
+        self.position = position
+        self.min_size = min_size
+        self.max_size = max_size
+
+    def _common_checks(self, params_index, size):
+        checks = []
+        if self.depth is not None:
+            depth = self.depth
+            checks.append(lambda node, d, p: d == depth)
+        if self.position is not None:
+            position = self.position
+            checks.append(lambda node, d, p: p == position)
+        if self.params:
+            wanted = self.params
+            checks.append(lambda node, d, p: _params_match(_params(node, params_index(node)), wanted))
+        if self.min_size is not None:
+            min_size = self.min_size
+            checks.append(lambda node, d, p: size(node) >= min_size)
+        if self.max_size is not None:
+            max_size = self.max_size
+            checks.append(lambda node, d, p: size(node) <= max_size)
+        return checks
+
+
+class _Part(_Node):
+
+    def __init__(self, content_type=None, encoding=None, filename=None, **kwargs):
+        super(_Part, self).__init__(**kwargs)
+        self.content_type = content_type and content_type.lower()
+        self.encoding = encoding and encoding.lower()
+        self.filename = filename and filename.lower()
+
+    def _compile(self):
+        checks = []
+        if self.content_type and self.content_type != '*/*':
+            content_type = self.content_type
+            if content_type.endswith('/*'):
+                maintype = content_type[:-2]
+                checks.append(lambda node, d, p: _lower(node[0]) == maintype)
+            else:
+                checks.append(lambda node, d, p: _node_type(node) == content_type)
+        if self.encoding:
+            encoding = self.encoding
+            checks.append(lambda node, d, p: _lower(_get(node, 5)) == encoding)
+        if self.filename:
+            filename = self.filename
+            checks.append(lambda node, d, p: _filename(node) == filename)
+        checks.extend(self._common_checks(lambda node: 2, _part_size))
+        return _all_checks(checks, lambda node: not isinstance(node[0], tuple))
+
+    def __repr__(self):
+        return 'part(%r)' % self.content_type
+
+
+class _Multipart(_Node):
+
+    def __init__(self, subtype=None, parts=(), exact=False, **kwargs):
+        super(_Multipart, self).__init__(**kwargs)
+        self.subtype = subtype and subtype.lower()
+        self.parts = parts
+        self.exact = exact
+
+    def _compile(self):
+        checks = []
+        if self.subtype and self.subtype != '*':
+            subtype = self.subtype
+            checks.append(lambda node, d, p: _lower(_get(node, _part_count(node))) == subtype)
+        if self.parts or self.exact:
+            part_checks = [part.compile() for part in self.parts]
+            count = len(part_checks)
+            exact = self.exact
+
+            def parts_match(node, d, p):
+                n = _part_count(node)
+                if n < count or (exact and n != count):
+                    return False
+                d += 1
+                for i, check in enumerate(part_checks):
+                    if not check(node[i], d, i + 1):
+                        return False
+                return True
+            checks.append(parts_match)
+        checks.extend(self._common_checks(lambda node: _part_count(node) + 1, _multipart_size))
+        return _all_checks(checks, lambda node: isinstance(node[0], tuple))
+
+    def __repr__(self):
+        return 'multipart(%r)' % self.subtype
+
+
+class _Contains(Pattern):
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def _compile(self):
+        check = self.pattern.compile()
+
+        def contains(node, depth, position):
+            pending = [(node, depth, position)]
+            while pending:
+                node, depth, position = pending.pop()
+                if check(node, depth, position):
+                    return True
+                pending.extend(_children(node, depth))
+            return False
+        return contains
+
+
+class _AllOf(Pattern):
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+
+    def _compile(self):
+        return _all_checks([p.compile() for p in self.patterns])
+
+
+class _AnyOf(Pattern):
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+
+    def _compile(self):
+        checks = [p.compile() for p in self.patterns]
+
+        def any_of(node, depth, position):
+            for check in checks:
+                if check(node, depth, position):
+                    return True
+            return False
+        return any_of
+
+
+class _Not(Pattern):
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def _compile(self):
+        check = self.pattern.compile()
+        return lambda node, depth, position: not check(node, depth, position)
+
+
+def part(content_type=None, params=None, encoding=None, filename=None,
+         min_size=None, max_size=None, depth=None, position=None):
+    """Match a single part node.
+
+    *content_type* is eg. ``'text/plain'`` or ``'image/*'``. *params*
+    is a dict of content type parameters that must be present; a value
+    of None only requires the parameter to be present. *filename* is
+    matched against the ``filename`` disposition parameter, or the
+    ``name`` content type parameter if there isn't one. Names and
+    values are compared case-insensitively. *min_size* and *max_size*
+    bound the size of the part in octets.
+    """
+    return _Part(content_type, encoding, filename, params=params,
+                 min_size=min_size, max_size=max_size,
+                 depth=depth, position=position)
+
+
+def multipart(subtype=None, *parts, **kwargs):
+    """Match a multipart node with the given *subtype* (eg.
+    ``'mixed'``) whose leading sub-parts match *parts* in order. Pass
+    ``exact=True`` to require exactly that many sub-parts.
+
+    The *params*, *min_size*, *max_size*, *depth* and *position*
+    keyword arguments are as for part(). The size of a multipart node
+    is the sum of the sizes of its parts.
+    """
+    return _Multipart(subtype, parts, **kwargs)
+
+
+def contains(pattern):
+    """Match if *pattern* matches the node or any node below it."""
+    return _Contains(pattern)
+
+
+def all_of(*patterns):
+    return _AllOf(patterns)
+
+
+def any_of(*patterns):
+    return _AnyOf(patterns)
+
+
+def not_(pattern):
+    return _Not(pattern)
+
+
+def oversized(min_size):
+    """Match messages with a single part of at least *min_size*
+    octets anywhere in them."""
+    return contains(part(min_size=min_size))
+
+
+def compile(pattern):
+    """Return a predicate taking a BODY or BODYSTRUCTURE value and
+    returning True if *pattern* matches it. Missing values (None) never
+    match.
+    """
+    check = pattern.compile()
+
+    def predicate(body):
+        if not body:
+            return False
+        return check(_plain(body), 0, None)
+    return predicate
+
+
+def classify(fetched, patterns, key='BODYSTRUCTURE'):
+    """Match fetched BODY or BODYSTRUCTURE data against several
+    patterns.
+
+    *fetched* is an iterable of ``(msgid, data)`` tuples, as yielded
+    by ``iter_fetch()`` or the items of the dict returned by
+    ``fetch()``. *patterns* is a dict mapping names to patterns. Yields
+    ``(msgid, names)`` tuples, where *names* is the list of the names
+    of the patterns that matched the value under *key* in *data*.
+    """
+    compiled = [(name, compile(pattern)) for name, pattern in sorted(patterns.items())]
+    for msgid, data in fetched:
+        body = data.get(key)
+        yield msgid, [name for name, predicate in compiled if predicate(body)]
+
+
+def _plain(body):
+    # Work on plain tuples so Body nodes don't wrap each sub-part
+    # accessed, and undo BodyData's optional nesting of sub-parts.
+    if isinstance(body, tuple):
+        body = tuple.__getitem__(body, slice(None))
+    else:
+        body = _tuples(body)
+    if isinstance(body[0], list):
+        return tuple(body[0]) + body[1:]
+    return body
+
+
+def _tuples(value):
+    # Lists (and tuples holding them) as nested plain tuples.
+    if isinstance(value, (list, tuple)):
+        return tuple(_tuples(item) for item in value)
+    return value
+
+
+def _all_checks(checks, guard=None):
+    if guard is not None:
+        checks = [lambda node, d, p: guard(node)] + checks
+    if len(checks) == 1:
+        return checks[0]
+
+    def all_of(node, depth, position):
+        for check in checks:
+            if not check(node, depth, position):
+                return False
+        return True
+    return all_of
+
+
+def _lower(value):
+    if isinstance(value, _string_types):
+        return value.lower()
+    return value
+
+
+def _get(node, index):
+    return node[index] if len(node) > index else None
+
+
+def _node_type(node):
+    # The content type of a single part node, or None if its type
+    # fields are missing or not strings.
+    maintype, subtype = _get(node, 0), _get(node, 1)
+    if isinstance(maintype, _string_types) and isinstance(subtype, _string_types):
+        return _content_type(maintype, subtype)
+    return None
+
+
+def _part_count(node):
+    count = 0
+    for item in node:
+        if not isinstance(item, tuple):
+            break
+        count += 1
+    return count
+
+
+def _children(node, depth):
+    depth += 1
+    if isinstance(node[0], tuple):
+        children = []
+        for i, item in enumerate(node):
+            if not isinstance(item, tuple):
+                break
+            children.append((item, depth, i + 1))
+        return children
+    if _is_message(node) and len(node) > 8 and isinstance(node[8], tuple):
+        return [(node[8], depth, 1)]
+    return []
+
+
+def _is_message(node):
+    return _node_type(node) == 'message/rfc822'
+
+
+def _part_size(node):
+    size = node[6] if len(node) > 6 else None
+    return size if isinstance(size, six.integer_types) else 0
+
+
+def _multipart_size(node):
+    total = 0
+    for child, _, _ in _children(node, 0):
+        if isinstance(child[0], tuple):
+            total += _multipart_size(child)
+        else:
+            total += _part_size(child)
+    return total
+
+
+def _params(node, index):
+    # Returns a dict of lowercased parameter names and values.
+    if len(node) <= index or not isinstance(node[index], tuple):
+        return {}
+    values = node[index]
+    return dict((_lower(values[i]), _lower(values[i + 1]))
+                for i in range(0, len(values) - 1, 2))
+
+
+def _params_match(params, wanted):
+    for name, value in wanted.items():
+        if name not in params:
+            return False
+        if value is not None and params[name] != value:
+            return False
+    return True
+
+
+def _disposition_index(node):
+    # Extension data follows the fields for the body type.
+    maintype = _lower(node[0])
+    if maintype == 'text':
+        return 9
+    if _is_message(node):
+        return 11
+    return 8
+
+
+def _filename(node):
+    index = _disposition_index(node)
+    if len(node) > index and isinstance(node[index], tuple) and len(node[index]) > 1:
+        filename = _params(node[index], 1).get('filename')
+        if filename:
+            return filename
+    return _params(node, 2).get('name')
+
+
+#: An S/MIME smime.p7m attachment.
+SMIME_P7M_PART = part('application/octet-stream',
+                      params={'name': 'smime.p7m'}, encoding='base64')
+
+#: A multipart/mixed message with an S/MIME smime.p7m attachment as
+#: its second part.
+SMIME_P7M = multipart('mixed', ANY, SMIME_P7M_PART)
+
+#: A message with a TNEF (winmail.dat) attachment anywhere in it.
+WINMAIL_DAT = contains(any_of(part('application/ms-tnef'),
+                              part(filename='winmail.dat')))
+
+#: A message with another message attached.
+NESTED_MESSAGE = contains(part('message/rfc822'))
@@ -0,0 +1,199 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+A persistent cache of message metadata.
+
+MetadataCache keeps fetched items (BODYSTRUCTURE, ENVELOPE, FLAGS,
+INTERNALDATE, RFC822.SIZE by default) in an SQLite database, keyed by
+``(host, folder, uidvalidity, uid)``. UIDs are never reused within a
+UIDVALIDITY, so only messages that arrived since the last run need to
+be fetched::
+
+    cache = MetadataCache('~/.imap-cache.sqlite')
+    metadata = cache.sync_folder(client, 'INBOX')   # {uid: data}
+
+If the UIDVALIDITY of a folder changes, everything cached for it is
+dropped. Cached FLAGS are as they were when the message was first
+fetched.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import pickle
+import sqlite3
+import threading
+
+from .six import iteritems
+
+__all__ = ['MetadataCache', 'DEFAULT_ITEMS']
+
+DEFAULT_ITEMS = ('BODYSTRUCTURE', 'ENVELOPE', 'FLAGS', 'INTERNALDATE', 'RFC822.SIZE')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    host TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uidnext INTEGER,
+    PRIMARY KEY (host, folder)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    host TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uid INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (host, folder, uidvalidity, uid)
+);
+"""
+
+# Protocol 2 is the newest Python 2 can read.
+PICKLE_PROTOCOL = 2
+
+
+class MetadataCache(object):
+    """An SQLite backed cache of fetched message data, stored in the
+    file at *path* (``':memory:'`` for a throwaway cache).
+
+    One cache can be shared by several threads.
+    """
+
+    def __init__(self, path=':memory:'):
+        if path != ':memory:':
+            path = os.path.expanduser(path)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def folder_state(self, host, folder):
+        """Return ``(uidvalidity, uidnext)`` as last recorded for
+        *folder*, or None if nothing is cached for it.
+        """
+        with self._lock:
+            row = self._db.execute(
+                'SELECT uidvalidity, uidnext FROM folders WHERE host = ? AND folder = ?',
+                (host, folder)).fetchone()
+        return row and tuple(row)
+
+    def check_uidvalidity(self, host, folder, uidvalidity):
+        """Drop everything cached for *folder* if it was cached under
+        a different *uidvalidity*. Returns the UIDNEXT recorded for the
+        folder if the cache is still valid, otherwise None.
+        """
+        state = self.folder_state(host, folder)
+        if state is None:
+            return None
+        if state[0] != uidvalidity:
+            self.drop_folder(host, folder)
+            return None
+        return state[1]
+
+    def drop_folder(self, host, folder):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM messages WHERE host = ? AND folder = ?',
+                             (host, folder))
+            self._db.execute('DELETE FROM folders WHERE host = ? AND folder = ?',
+                             (host, folder))
+
+    def get(self, host, folder, uidvalidity, uids=None):
+        """Return a dict of UID to cached data for *folder*, for all
+        cached messages or only those in *uids*.
+        """
+        query = ('SELECT uid, data FROM messages '
+                 'WHERE host = ? AND folder = ? AND uidvalidity = ?')
+        with self._lock:
+            rows = self._db.execute(query, (host, folder, uidvalidity)).fetchall()
+        if uids is not None:
+            uids = set(uids)
+            rows = [row for row in rows if row[0] in uids]
+        return dict((uid, pickle.loads(bytes(data))) for uid, data in rows)
+
+    def store(self, host, folder, uidvalidity, fetched, uidnext=None):
+        """Cache *fetched*, a dict of UID to data as returned by
+        IMAPClient.fetch(). The SEQ item isn't stored as sequence
+        numbers change. If *uidnext* is given it is recorded as the
+        folder's UIDNEXT.
+        """
+        rows = []
+        for uid, data in iteritems(fetched):
+            data = dict((k, v) for k, v in iteritems(data) if k != 'SEQ')
+            rows.append((host, folder, uidvalidity, uid,
+                         sqlite3.Binary(pickle.dumps(data, PICKLE_PROTOCOL))))
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR IGNORE INTO folders (host, folder, uidvalidity) VALUES (?, ?, ?)',
+                (host, folder, uidvalidity))
+            if uidnext is not None:
+                self._db.execute(
+                    'UPDATE folders SET uidnext = ? WHERE host = ? AND folder = ?',
+                    (uidnext, host, folder))
+            self._db.executemany(
+                'INSERT OR REPLACE INTO messages (host, folder, uidvalidity, uid, data) '
+                'VALUES (?, ?, ?, ?, ?)', rows)
+
+    def discard(self, host, folder, uidvalidity, uids):
+        """Remove *uids* (eg. expunged messages) from the cache."""
+        with self._lock, self._db:
+            self._db.executemany(
+                'DELETE FROM messages WHERE host = ? AND folder = ? '
+                'AND uidvalidity = ? AND uid = ?',
+                [(host, folder, uidvalidity, uid) for uid in uids])
+
+    def sync_folder(self, client, folder, items=DEFAULT_ITEMS, prune=True,
+                    select_info=None):
+        """Select *folder* (read-only) with *client*, fetch *items* for
+        messages that aren't cached yet and return a dict of UID to
+        data for every message in the folder.
+
+        If the folder is already selected on *client*, pass the
+        select_folder() response as *select_info* (eg. a pool's
+        folder_info()) and it isn't selected again. Its UIDNEXT may be
+        out of date, so it isn't relied on: ``n:*`` is fetched anyway.
+
+        Only UIDs at or above the UIDNEXT recorded by the last sync are
+        fetched. If *prune* is True, a ``UID SEARCH ALL`` finds
+        messages that have been expunged so they are removed from the
+        cache and the result.
+
+        *client* must have use_uid set.
+        """
+        host = client.host
+        if select_info is None:
+            info = client.select_folder(folder, readonly=True)
+            uidnext = info.get('UIDNEXT')
+        else:
+            info = select_info
+            uidnext = None
+        uidvalidity = info['UIDVALIDITY']
+        cached_uidnext = self.check_uidvalidity(host, folder, uidvalidity)
+        if cached_uidnext is None:
+            cached_uidnext = 1
+
+        fetched = {}
+        if uidnext is None or uidnext > cached_uidnext:
+            # "n:*" always includes the last message, even if its
+            # UID is below n.
+            fetched = dict((uid, data) for uid, data in
+                           iteritems(client.fetch('%d:*' % cached_uidnext, items))
+                           if uid >= cached_uidnext)
+            if uidnext is None:
+                uidnext = max(fetched) + 1 if fetched else cached_uidnext
+        self.store(host, folder, uidvalidity, fetched, max(uidnext, cached_uidnext))
+
+        out = self.get(host, folder, uidvalidity)
+        if prune and out:
+            present = client.search_uidset('ALL')
+            gone = [uid for uid in out if uid not in present]
+            if gone:
+                self.discard(host, folder, uidvalidity, gone)
+                for uid in gone:
+                    del out[uid]
+        return out
@@ -24,6 +24,7 @@ def parse_config_file(path):
         password=None,
         ssl='false',
         stream='false',
+        compress='false',
         oauth='false',
         oauth_token=None,
         oauth_token_secret=None,
@@ -48,6 +49,7 @@ def parse_config_file(path):
         port=port,
         ssl=parser.getboolean(section, 'ssl'),
         stream=parser.getboolean(section, 'stream'),
+        compress=parser.getboolean(section, 'compress'),
 
         username=parser.get(section, 'username'),
         password=parser.get(section, 'password'),
@@ -88,6 +90,7 @@ def get_oauth2_token(client_id, client_secret, refresh_token):
 def create_client_from_config(conf):
     client = imapclient.IMAPClient(conf.host, port=conf.port,
                                    ssl=conf.ssl, stream=conf.stream)
+    client.use_compression = conf.get('compress', False)
     if conf.oauth:
         client.oauth_login(conf.oauth_url,
                            conf.oauth_token,
@@ -16,13 +16,15 @@ class FixedOffset(tzinfo):
     """
 
     def __init__(self, minutes):
+        self.__minutes = minutes
         self.__offset = timedelta(minutes=minutes)
 
         sign = '+'
         if minutes < 0:
             sign = '-'
         hours, remaining_mins = divmod(abs(minutes), 60)
-        self.__name = '%s%02d%02d' % (sign, hours, remaining_mins)
+        # tzname() must return a native str under Python 2.
+        self.__name = str('%s%02d%02d' % (sign, hours, remaining_mins))
 
     def utcoffset(self, _):
         return self.__offset
@@ -33,6 +35,10 @@ class FixedOffset(tzinfo):
     def dst(self, _):
         return ZERO
 
+    def __getinitargs__(self):
+        # Lets instances be pickled.
+        return (self.__minutes,)
+
     @classmethod
     def for_system(klass):
         """Return a FixedOffset instance for the current working timezone and
@@ -0,0 +1,252 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Watching many IDLE sessions from one thread.
+
+``IMAPClient.idle_check()`` waits on one connection at a time, so
+watching many folders that way needs a thread per folder. An
+IdleWatcher instead waits on all of its sessions at once with the
+``selectors`` module (epoll, kqueue or poll where available) and calls
+a callback for each folder with the untagged responses received::
+
+    def changed(client, folder, responses):
+        print(folder, responses)
+
+    watcher = IdleWatcher()
+    for folder in folders:
+        watcher.add(connect_and_login(), folder, changed)
+    watcher.run()
+
+Each session is an IMAPClient that has logged in; IMAP can only IDLE
+on the selected folder, so every folder watched needs a session of its
+own. The responses passed to the callback are parsed as by
+``idle_check()``.
+
+Servers may drop connections that have been idle for 30 minutes
+(:rfc:`2177`), so the watcher ends and restarts IDLE on every session
+every *renew_interval* seconds, without blocking on any of them.
+
+Requires the ``selectors`` module (Python 3.4 or later).
+"""
+
+from __future__ import unicode_literals
+
+import imaplib
+import os
+import re
+import socket
+import time
+
+try:
+    import selectors
+except ImportError:
+    selectors = None
+
+from .imapclient import _parse_untagged_response
+
+__all__ = ['IdleWatcher']
+
+READ_SIZE = 64 * 1024
+
+_tagged_re = re.compile(br'^(?P<tag>[-\w]+) (?P<type>[A-Z]+)( (?P<text>.*))?$')
+
+
+class _Session(object):
+    # The IDLE state of one connection: 'starting' once IDLE has been
+    # sent, 'idling' once the server accepted it and 'stopping' once
+    # DONE has been sent.
+
+    def __init__(self, client, folder, callback):
+        self.client = client
+        self.folder = folder
+        self.callback = callback
+        self.imap = imap = client._imap
+        if isinstance(imap, imaplib.IMAP4_stream):
+            self.fileobj = imap.readfile
+            self.waitable = imap.readfile
+        else:
+            self.fileobj = imap.file
+            self.waitable = getattr(imap, 'sslobj', None) or imap.sock
+        self.read = getattr(self.fileobj, 'read1', None) or self.waitable.recv
+        self.buf = b''
+        self.tag = None
+        self.state = None
+        self.renew_at = None
+
+    def set_blocking(self, flag):
+        if hasattr(self.waitable, 'setblocking'):
+            self.waitable.setblocking(flag)
+        else:
+            os.set_blocking(self.waitable.fileno(), flag)
+
+    def start(self, renew_interval):
+        self.tag = self.imap._new_tag()
+        self.imap.send(self.tag + b' IDLE\r\n')
+        self.state = 'starting'
+        self.renew_at = time.time() + renew_interval
+
+    def stop(self):
+        self.imap.send(b'DONE\r\n')
+        self.state = 'stopping'
+
+    def read_available(self):
+        # Read what has arrived without blocking. Returns False if the
+        # connection was closed, assuming it was ready for reading.
+        first = True
+        while True:
+            try:
+                data = self.read(READ_SIZE)
+            except (socket.error, IOError):
+                return True
+            if not data:
+                return not first
+            self.buf += data
+            first = False
+
+
+class IdleWatcher(object):
+    """Runs IDLE on many IMAPClient sessions from one thread.
+
+    IDLE is ended and restarted on each session every
+    *renew_interval* seconds (29 minutes by default).
+    """
+
+    def __init__(self, renew_interval=29 * 60):
+        if selectors is None:
+            raise RuntimeError('IdleWatcher needs the selectors module')
+        self.renew_interval = renew_interval
+        self.closed = []
+        self._selector = selectors.DefaultSelector()
+        self._sessions = {}
+        self._running = False
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def add(self, client, folder, callback, readonly=True):
+        """Select *folder* on *client* (a logged in IMAPClient that
+        isn't used for anything else while it is watched) and start
+        IDLE on it. ``callback(client, folder, responses)`` is called
+        with the list of parsed untagged responses each time some
+        arrive.
+        """
+        client.select_folder(folder, readonly)
+        session = _Session(client, folder, callback)
+        session.start(self.renew_interval)
+        session.set_blocking(False)
+        self._sessions[client] = session
+        self._selector.register(session.waitable, selectors.EVENT_READ, session)
+        # imaplib may already have read responses into its buffer.
+        session.read_available()
+        self._process(session, True)
+
+    def remove(self, client):
+        """Stop watching *client*, ending IDLE so that it can be used
+        again. Returns the responses received in the meantime, parsed
+        as by ``idle_check()``.
+        """
+        session = self._sessions.pop(client)
+        self._selector.unregister(session.waitable)
+        session.set_blocking(True)
+        responses = []
+        want_stop = True
+        while session.state is not None:
+            if session.state == 'idling' and want_stop:
+                session.stop()
+                want_stop = False
+            lines = self._split_lines(session)
+            if not lines:
+                data = session.read(READ_SIZE)
+                if not data:
+                    break
+                session.buf += data
+                continue
+            for line in lines:
+                responses.extend(self._handle_line(session, line, restart=False))
+        return responses
+
+    def poll(self, timeout=None):
+        """Wait up to *timeout* seconds (forever if None) for responses
+        on any session, dispatch them to the callbacks and renew IDLE
+        where it is due. Returns the number of sessions that had
+        responses.
+        """
+        if not self._sessions:
+            return 0
+        renewals = [s.renew_at for s in self._sessions.values()
+                    if s.state == 'idling']
+        if renewals:
+            wait = max(0, min(renewals) - time.time())
+            timeout = wait if timeout is None else min(timeout, wait)
+        dispatched = 0
+        for key, _ in self._selector.select(timeout):
+            session = key.data
+            if session.client in self._sessions:
+                if self._process(session, session.read_available()):
+                    dispatched += 1
+        now = time.time()
+        for session in list(self._sessions.values()):
+            if session.state == 'idling' and session.renew_at <= now:
+                session.stop()
+        return dispatched
+
+    def run(self):
+        """Call poll() until stop() is called or no sessions are left."""
+        self._running = True
+        while self._running and self._sessions:
+            self.poll()
+
+    def stop(self):
+        """Make run() return (eg. from a callback)."""
+        self._running = False
+
+    def close(self):
+        """Stop watching every session."""
+        for client in list(self._sessions):
+            self.remove(client)
+        self._selector.close()
+
+    def _process(self, session, alive):
+        responses = []
+        for line in self._split_lines(session):
+            responses.extend(self._handle_line(session, line, restart=True))
+        if responses:
+            session.callback(session.client, session.folder, responses)
+        if not alive or any(r[0] == 'BYE' for r in responses):
+            self._drop(session)
+        return bool(responses)
+
+    def _split_lines(self, session):
+        lines = session.buf.split(b'\r\n')
+        session.buf = lines.pop()
+        return lines
+
+    def _handle_line(self, session, line, restart):
+        # Returns a list of the parsed untagged response in line.
+        if line.startswith(b'* '):
+            return [_parse_untagged_response(line)]
+        if line.startswith(b'+'):
+            if session.state == 'starting':
+                session.state = 'idling'
+            return []
+        match = _tagged_re.match(line)
+        if match and match.group('tag') == session.tag:
+            session.imap.tagged_commands.pop(session.tag, None)
+            session.state = None
+            if match.group('type') != b'OK':
+                self._drop(session)
+            elif restart:
+                session.start(self.renew_interval)
+        return []
+
+    def _drop(self, session):
+        # The server closed the connection or refused IDLE.
+        if self._sessions.pop(session.client, None) is not None:
+            self._selector.unregister(session.waitable)
+            try:
+                session.set_blocking(True)
+            except (socket.error, ValueError):
+                pass
+            self.closed.append((session.client, session.folder))
@@ -5,6 +5,7 @@
 from __future__ import unicode_literals
 
 import imaplib
+import re
 import select
 import socket
 import sys
@@ -12,7 +13,7 @@ import warnings
 from datetime import datetime
 from operator import itemgetter
 
-from . import response_lexer
+from . import compression, response_lexer, transport
 
 # Confusingly, this module is for OAUTH v1, not v2
 try:
@@ -22,6 +23,9 @@ except ImportError:
 
 from .imap_utf7 import encode as encode_utf7, decode as decode_utf7
 from .fixed_offset import FixedOffset
+from .internaldate import InternalDateConverter
+from .spool import SpooledLiteral, spool
+from .uidset import UIDSet
 from .six import moves, iteritems, text_type, integer_types, PY3, binary_type
 xrange = moves.xrange
 
@@ -29,9 +33,10 @@ if PY3:
     long = int  # long is just int in python3
 
 
-__all__ = ['IMAPClient', 'DELETED', 'SEEN', 'ANSWERED', 'FLAGGED', 'DRAFT', 'RECENT']
+__all__ = ['IMAPClient', 'UIDSet', 'SpooledLiteral', 'parse_copyuid',
+           'parse_appenduid', 'DELETED', 'SEEN', 'ANSWERED', 'FLAGGED', 'DRAFT', 'RECENT']
 
-from .response_parser import parse_response, parse_fetch_response
+from .response_parser import parse_response, parse_fetch_response, gen_fetch_response
 
 # We also offer the gmail-specific XLIST command...
 if 'XLIST' not in imaplib.Commands:
@@ -41,6 +46,14 @@ if 'XLIST' not in imaplib.Commands:
 if 'IDLE' not in imaplib.Commands:
   imaplib.Commands['IDLE'] = imaplib.Commands['APPEND']
 
+# ...and ENABLE
+if 'ENABLE' not in imaplib.Commands:
+  imaplib.Commands['ENABLE'] = ('AUTH',)
+
+# ...and COMPRESS
+if 'COMPRESS' not in imaplib.Commands:
+  imaplib.Commands['COMPRESS'] = ('AUTH', 'SELECTED')
+
 
 # System flags
 DELETED = r'\Deleted'
@@ -85,6 +98,29 @@ class IMAPClient(object):
     system time). This attribute can be changed between ``fetch()``
     calls if required.
 
+    If the *epoch_times* attribute is True, ``INTERNALDATE`` values
+    returned by ``fetch()`` and ``iter_fetch()`` are integer seconds
+    since the Unix epoch instead of datetimes. This is cheaper for
+    large fetches where the dates are only sorted or compared. It
+    defaults to False.
+
+    If the *buffer_literals* attribute is True, literal values
+    returned by ``fetch()`` and ``iter_fetch()`` (eg. ``RFC822`` or
+    ``BODY[]``) are read-only ``memoryview`` objects over the bytes
+    received from the server rather than strings. This avoids copying
+    and decoding large messages. It defaults to False.
+
+    If the *spool_threshold* attribute is set to a number of bytes,
+    literals at least that large are written to a temporary file (in
+    the *spool_dir* directory, or the system default) as they are
+    received, and are returned by ``fetch()`` and ``iter_fetch()`` as
+    SpooledLiteral objects. This keeps memory use bounded when
+    downloading large messages. It defaults to None (no spooling).
+
+    If the *use_compression* attribute is True, ``login()`` (and the
+    OAUTH login methods) turn on COMPRESS=DEFLATE if the server
+    supports it. See ``compress()``. It defaults to False.
+
     The *debug* property can be used to enable debug logging. It can
     be set to an integer from 0 to 5 where 0 disables debug output and
     5 enables full output with wire logging and parsing logs. ``True``
@@ -117,24 +153,50 @@ class IMAPClient(object):
         self.folder_encode = True
         self.log_file = sys.stderr
         self.normalise_times = True
+        self.buffer_literals = False
+        self.epoch_times = False
+        self.spool_threshold = None
+        self.spool_dir = None
+        self.use_compression = False
+        self._deflate = None
 
         self._cached_capabilities = None
         self._imap = self._create_IMAP4()
         self._imap._mesg = self._log    # patch in custom debug log method
+        self._imap.read = self._literal_reader(self._imap)
         self._idle_tag = None
 
+    def _literal_reader(self, imap):
+        # imaplib reads literals with IMAP4.read(). Replace it with a
+        # wrapper so that large literals are spooled to disk if
+        # requested.
+        def read(size):
+            return type(imap).read(imap, size)
+
+        def read_literal(size):
+            threshold = self.spool_threshold
+            if threshold is None or size < threshold:
+                return read(size)
+            try:
+                return spool(read, size, dir=self.spool_dir)
+            except EOFError as err:
+                raise self.AbortError(str(err))
+        return read_literal
+
     def _create_IMAP4(self):
         # Create the IMAP instance in a separate method to make unit tests easier
         if self.stream:
-            return imaplib.IMAP4_stream(self.host)
-        ImapClass = self.ssl and imaplib.IMAP4_SSL or imaplib.IMAP4
+            return transport.IMAP4_stream(self.host)
+        ImapClass = self.ssl and transport.IMAP4_SSL or transport.IMAP4
         return ImapClass(self.host, self.port)
 
     def login(self, username, password):
         """Login using *username* and *password*, returning the
         server response.
         """
-        return self._command_and_check('login', username, password, unpack=True)
+        data = self._command_and_check('login', username, password, unpack=True)
+        self._start_compression()
+        return data
 
     def oauth_login(self, url, oauth_token, oauth_token_secret,
                     consumer_key='anonymous', consumer_secret='anonymous'):
@@ -146,7 +208,9 @@ class IMAPClient(object):
             token = oauth_module.Token(oauth_token, oauth_token_secret)
             consumer = oauth_module.Consumer(consumer_key, consumer_secret)
             xoauth_callable = lambda x: oauth_module.build_xoauth_string(url, consumer, token)
-            return self._command_and_check('authenticate', 'XOAUTH', xoauth_callable, unpack=True)
+            data = self._command_and_check('authenticate', 'XOAUTH', xoauth_callable, unpack=True)
+            self._start_compression()
+            return data
         else:
             raise self.Error('The optional oauth2 package is needed for OAUTH authentication')
 
@@ -156,7 +220,38 @@ class IMAPClient(object):
         This only works with IMAP servers that support OAUTH2 (e.g. Gmail).
         """
         auth_string = lambda x: 'user=%s\1auth=Bearer %s\1\1' % (user, access_token)
-        return self._command_and_check('authenticate', 'XOAUTH2', auth_string)
+        data = self._command_and_check('authenticate', 'XOAUTH2', auth_string)
+        self._start_compression()
+        return data
+
+    def _start_compression(self):
+        if (self.use_compression and self._deflate is None and
+                self.has_capability('COMPRESS=DEFLATE')):
+            self.compress()
+
+    def compress(self, level=-1):
+        """Compress everything sent and received on the connection
+        from now on with DEFLATE (:rfc:`4978`), returning the server
+        response string. The server must support COMPRESS=DEFLATE.
+
+        *level* is the zlib compression level for data sent (-1 for
+        zlib's default). Once compression is on, *compressed_bytes*
+        gives the number of bytes received on the wire and
+        *uncompressed_bytes* what they decompressed to.
+        """
+        typ, data = self._imap._simple_command('COMPRESS', 'DEFLATE')
+        data = from_bytes(data)
+        self._checkok('compress', typ, data)
+        self._deflate = compression.enable(self._imap, level)
+        return data[0]
+
+    @property
+    def compressed_bytes(self):
+        return self._deflate and self._deflate.bytes_in
+
+    @property
+    def uncompressed_bytes(self):
+        return self._deflate and self._deflate.bytes_out
 
     def logout(self):
         """Logout, returning the server response.
@@ -211,6 +306,22 @@ class IMAPClient(object):
         # be detected by this method.
         return capability.upper() in self.capabilities()
 
+    def enable(self, *capabilities):
+        """Activate one or more server side capability extensions,
+        such as ``CONDSTORE`` or ``QRESYNC``. This must be done after
+        logging in and before selecting a folder.
+
+        Returns the list of capabilities the server enabled.
+
+        See :rfc:`5161` for more details.
+        """
+        typ, data = self._imap._simple_command('ENABLE', *capabilities)
+        self._checkok('enable', typ, data)
+        typ, data = self._imap._untagged_response(typ, data, 'ENABLED')
+        if not data[0]:
+            return []
+        return from_bytes(data[0]).upper().split()
+
     def namespace(self):
         """Return the namespace for the account as a (personal, other,
         shared) tuple.
@@ -306,16 +417,15 @@ class IMAPClient(object):
         directory = self._normalise_folder(directory)
         pattern = self._normalise_folder(pattern)
         typ, dat = self._imap._simple_command(cmd, directory, pattern)
-        dat = from_bytes(dat)
         self._checkok(cmd, typ, dat)
         typ, dat = self._imap._untagged_response(typ, dat, cmd)
-        return self._proc_folder_list(from_bytes(dat))
+        return self._proc_folder_list(dat)
 
     def _proc_folder_list(self, folder_data):
         # Filter out empty strings and None's.
         # This also deals with the special case of - no 'untagged'
         # responses (ie, no folders). This comes back as [None].
-        folder_data = [item for item in folder_data if item not in ('', None)]
+        folder_data = [item for item in folder_data if item not in ('', b'', None)]
 
         ret = []
         parsed = parse_response(folder_data)
@@ -329,8 +439,11 @@ class IMAPClient(object):
                 # with quotes. These get parsed to ints so convert them
                 # back to strings.
                 name = text_type(name)
-            elif self.folder_encode:
-                name = decode_utf7(name)
+            else:
+                # Names sent as literals are left as bytes by the parser.
+                name = from_bytes(name)
+                if self.folder_encode:
+                    name = decode_utf7(name)
 
             ret.append((flags, delim, name))
         return ret
@@ -355,12 +468,12 @@ class IMAPClient(object):
         """
         self._command_and_check('select', self._normalise_folder(folder), readonly)
         untagged = self._imap.untagged_responses
-        return self._process_select_response(from_bytes(untagged))
+        return self._process_select_response(untagged)
 
     def _process_select_response(self, resp):
         out = {}
         for key, value in iteritems(resp):
-            key = key.upper()
+            key = from_bytes(key).upper()
             if key == 'OK':
                 continue
             elif key in ('EXISTS', 'RECENT', 'UIDNEXT', 'UIDVALIDITY', 'HIGHESTMODSEQ'):
@@ -369,6 +482,8 @@ class IMAPClient(object):
                 value = parse_response(value)[0]
             elif key == 'READ-WRITE':
                 value = True
+            else:
+                value = from_bytes(value)
             out[key] = value
         return out
 
@@ -438,11 +553,19 @@ class IMAPClient(object):
         sock.setblocking(0)
         try:
             resps = []
+            # Responses may already have been read from the socket and
+            # be waiting in the transport's buffer or, with compression
+            # on, to be decompressed.
+            buffered = self._deflate is not None and self._deflate.pending
+            if isinstance(self._imap, transport.BufferedTransport):
+                buffered = buffered or self._imap.pending
+            if buffered:
+                timeout = 0
             rs, _, _ = select.select([sock], [], [], timeout)
-            if rs:
+            if rs or buffered:
                 while True:
                     try:
-                        line = from_bytes(self._imap._get_line())
+                        line = self._imap._get_line()
                     except (socket.timeout, socket.error):
                         break
                     except IMAPClient.AbortError:
@@ -553,6 +676,22 @@ class IMAPClient(object):
 
         See :rfc:`3501#section-6.4.4` for more details.
         """
+        data = self._search(criteria, charset)
+        if data is None:    # no untagged responses...
+            return []
+        return [long(i) for i in data.split()]
+
+    def search_uidset(self, criteria='ALL', charset=None):
+        """Return a UIDSet of the message ids matching *criteria*.
+
+        The arguments are as per search(). The ids are read straight
+        into ranges, which uses far less memory than a list for large
+        folders. The result can be passed to fetch(), copy(),
+        delete_messages() and the flag methods.
+        """
+        return UIDSet.from_search(self._search(criteria, charset))
+
+    def _search(self, criteria, charset):
         criteria = normalise_search_criteria(criteria)
 
         if self.use_uid:
@@ -565,13 +704,8 @@ class IMAPClient(object):
         else:
             typ, data = self._imap.search(charset, *criteria)
 
-        data = from_bytes(data)
-
         self._checkok('search', typ, data)
-        data = data[0]
-        if data is None:    # no untagged responses...
-            return []
-        return [long(i) for i in data.split()]
+        return data[0]
 
     def thread(self, algorithm='REFERENCES', criteria='ALL', charset='UTF-8'):
         """Return a list of messages threads matching *criteria*.
@@ -758,6 +892,58 @@ class IMAPClient(object):
         if not messages:
             return {}
 
+        tag = self._imap._command(*self._fetch_args(messages, data, modifiers))
+        typ, data = self._imap._command_complete('FETCH', tag)
+        self._checkok('fetch', typ, data)
+        typ, data = self._imap._untagged_response(typ, data, 'FETCH')
+        return parse_fetch_response(data, self.normalise_times, self.use_uid,
+                                    buffer_literals=self.buffer_literals,
+                                    epoch_times=self.epoch_times,
+                                    decode_literals=True)
+
+    def iter_fetch(self, messages, data, modifiers=None):
+        """Retrieve selected *data* associated with one or more
+        *messages*, yielding results as they arrive from the server.
+
+        The arguments are as per fetch(). Instead of waiting for the
+        command to complete and returning a dictionary, this generator
+        yields a ``(msgid, dict)`` tuple as soon as each FETCH
+        response has been received and parsed. The dicts are the same
+        as the values in the dictionary returned by fetch().
+
+        A message is yielded more than once if the server sends
+        several FETCH responses for it (eg. unsolicited flag updates).
+
+        .. note::
+
+            The generator must be exhausted before any other command
+            is issued on this connection.
+        """
+        if not messages:
+            return
+
+        imap = self._imap
+        tag = imap._command(*self._fetch_args(messages, data, modifiers))
+        tagged_commands = imap.tagged_commands
+        convert_date = InternalDateConverter(self.normalise_times,
+                                             self.epoch_times)
+        while not tagged_commands[tag]:
+            imap._get_response()
+            imap._check_bye()
+            fetched = imap.untagged_responses.pop('FETCH', None)
+            if fetched:
+                for item in gen_fetch_response(fetched,
+                                               self.normalise_times,
+                                               self.use_uid,
+                                               self.buffer_literals,
+                                               self.epoch_times,
+                                               decode_literals=True,
+                                               convert_date=convert_date):
+                    yield item
+        typ, data = tagged_commands.pop(tag)
+        self._checkok('fetch', typ, data)
+
+    def _fetch_args(self, messages, data, modifiers):
         args = [
             'FETCH',
             messages_to_str(messages),
@@ -766,12 +952,27 @@ class IMAPClient(object):
         ]
         if self.use_uid:
             args.insert(0, 'UID')
-        tag = self._imap._command(*args)
-        typ, data = self._imap._command_complete('FETCH', tag)
-        data = from_bytes(data)
-        self._checkok('fetch', typ, data)
-        typ, data = self._imap._untagged_response(typ, data, 'FETCH')
-        return parse_fetch_response(from_bytes(data), self.normalise_times, self.use_uid)
+        return args
+
+    def pipeline(self, window=16):
+        """Return a Pipeline for sending several commands to the
+        server in one round trip, with at most *window* commands in
+        flight at once.
+
+        Use it as a context manager; the queued commands are sent
+        when the block exits::
+
+            with client.pipeline() as p:
+                flags = p.fetch(uids, ['FLAGS'])
+                status = p.folder_status('INBOX')
+            print(flags.result(), status.result())
+
+        FETCH, STORE (via the flag methods), COPY and STATUS commands
+        can be pipelined. See the imapclient.pipeline module for
+        details.
+        """
+        from .pipeline import Pipeline
+        return Pipeline(self, window)
 
     def append(self, folder, msg, flags=(), msg_time=None):
         """Append a message to *folder*.
@@ -790,21 +991,116 @@ class IMAPClient(object):
 
         Returns the APPEND response as returned by the server.
         """
-        if msg_time:
-            time_val = '"%s"' % datetime_to_imap(msg_time)
-            if PY3:
-                time_val = to_unicode(time_val)
-            else:
-                time_val = to_bytes(time_val)
-        else:
-            time_val = None
         return self._command_and_check('append',
                                        self._normalise_folder(folder),
                                        seq_to_parenstr(flags),
-                                       time_val,
+                                       self._append_time(msg_time),
                                        to_bytes(msg),
                                        unpack=True)
 
+    def _append_time(self, msg_time):
+        if not msg_time:
+            return None
+        time_val = '"%s"' % datetime_to_imap(msg_time)
+        if PY3:
+            return to_unicode(time_val)
+        return to_bytes(time_val)
+
+    def multi_append(self, folder, messages):
+        """Append several messages to *folder* with as few round
+        trips as the server allows.
+
+        Each item of *messages* is either a message, as for
+        ``append()``, or a ``(msg, flags, msg_time)`` tuple (trailing
+        items may be left out). A message may also be a SpooledLiteral,
+        which is sent from its file a chunk at a time; it must already
+        use CRLF line endings.
+
+        If the server supports MULTIAPPEND (:rfc:`3502`) all the
+        messages are sent in one APPEND command, which adds either all
+        of them or none. Otherwise one APPEND is sent per message
+        without waiting for the previous one to complete. Messages are
+        sent without waiting for the server's continuation request if
+        the server supports LITERAL+, or LITERAL- and the message is
+        at most 4096 bytes (see :rfc:`7888`), so the whole upload
+        costs about one round trip.
+
+        Returns a list of the APPEND responses, one per APPEND command
+        sent. If any APPEND fails IMAPClient.Error is raised, once the
+        responses to all of them have been read.
+        """
+        items = []
+        for item in messages:
+            if not isinstance(item, tuple):
+                item = (item,)
+            msg, flags, msg_time = item + ((), None)[len(item) - 1:]
+            if not isinstance(msg, SpooledLiteral):
+                msg = imaplib.MapCRLF.sub(b'\r\n', to_bytes(msg))
+            items.append((msg, seq_to_parenstr(flags), self._append_time(msg_time)))
+        if not items:
+            return []
+        if self.has_capability('MULTIAPPEND'):
+            commands = [items]
+        else:
+            commands = [[item] for item in items]
+
+        imap = self._imap
+        folder = to_bytes(self._normalise_folder(folder))
+        tags = []
+        for command in commands:
+            tag = imap._new_tag()
+            tags.append(tag)
+            args = [tag, b'APPEND', folder]
+            for msg, flags, time_val in command:
+                args.append(to_bytes(flags))
+                if time_val is not None:
+                    args.append(to_bytes(time_val))
+                nonsync = self._can_send_nonsync_literal(len(msg))
+                args.append(to_bytes('{%d%s}' % (len(msg), nonsync and '+' or '')))
+                imap.send(b' '.join(args) + b'\r\n')
+                if not nonsync and not self._wait_for_continuation(tag):
+                    break
+                if isinstance(msg, SpooledLiteral):
+                    for chunk in msg.iter_chunks():
+                        imap.send(chunk)
+                else:
+                    imap.send(msg)
+                args = [b'']
+            else:
+                imap.send(b'\r\n')
+
+        responses = []
+        error = None
+        for tag in tags:
+            while not imap.tagged_commands[tag]:
+                imap._get_response()
+                imap._check_bye()
+            typ, data = imap.tagged_commands.pop(tag)
+            data = from_bytes(data)
+            try:
+                self._checkok('append', typ, data)
+            except self.Error as err:
+                error = error or err
+            responses.append(data[0])
+        if error is not None:
+            raise error
+        return responses
+
+    def _can_send_nonsync_literal(self, size):
+        return (self.has_capability('LITERAL+') or
+                (size <= 4096 and self.has_capability('LITERAL-')))
+
+    def _wait_for_continuation(self, tag):
+        # Read responses until the server asks for a literal (True) or
+        # completes the command instead (False).
+        imap = self._imap
+        while True:
+            if imap._get_response() is None:
+                return True
+            imap._check_bye()
+            if imap.tagged_commands[tag]:
+                return False
+
     def copy(self, messages, folder):
         """Copy one or more messages from the current folder to
         *folder*. Returns the COPY response string returned by the
@@ -815,6 +1111,49 @@ class IMAPClient(object):
                                        self._normalise_folder(folder),
                                        uid=True, unpack=True)
 
+    def move(self, messages, folder):
+        """Move one or more messages from the current folder to
+        *folder*.
+
+        The MOVE command (:rfc:`6851`) is used if the server supports
+        it. Otherwise the messages are copied, flagged as
+        ``\\Deleted`` and, if the server supports UIDPLUS and
+        *use_uid* is set, removed with UID EXPUNGE, which leaves any
+        other deleted messages in the folder alone. Without UIDPLUS
+        the messages are left flagged as deleted.
+
+        Returns a dict mapping the UID of each moved message to its
+        UID in *folder*, from the server's COPYUID response (see
+        :rfc:`4315`), or an empty dict if the server didn't send one.
+        """
+        if not messages:
+            return {}
+        messages = messages_to_str(messages)
+        folder = self._normalise_folder(folder)
+        if self.has_capability('MOVE'):
+            data = self._uid_command('MOVE', messages, folder)
+            data = self._imap.untagged_responses.pop('OK', []) + data
+        else:
+            data = self._uid_command('COPY', messages, folder)
+            self._uid_command('STORE', messages, '+FLAGS.SILENT', '(%s)' % DELETED)
+            if self.use_uid and self.has_capability('UIDPLUS'):
+                self._uid_command('EXPUNGE', messages)
+        for text in data:
+            copyuid = parse_copyuid(text)
+            if copyuid:
+                return copyuid[1]
+        return {}
+
+    def _uid_command(self, command, *args):
+        # Like _command_and_check with uid=True, but returns the text
+        # of the tagged response (imaplib's uid() drops it).
+        if self.use_uid:
+            args = (command,) + args
+            command = 'UID'
+        typ, data = self._imap._simple_command(command, *args)
+        self._checkok(command.lower(), typ, from_bytes(data))
+        return data
+
     def expunge(self):
         """Remove any messages from the currently selected folder that
         have the ``\\Deleted`` flag set.
@@ -863,7 +1202,7 @@ class IMAPClient(object):
         Raises IMAPClient.Error if the command fails.
         """
         if typ != expected:
-            raise self.Error('%s failed: %r' % (command, data[0]))
+            raise self.Error('%s failed: %r' % (command, from_bytes(data[0])))
 
     def _consume_until_tagged_response(self, tag, command):
         tagged_commands = self._imap.tagged_commands
@@ -872,7 +1211,7 @@ class IMAPClient(object):
             line = self._imap._get_response()
             if tagged_commands[tag]:
                 break
-            resps.append(_parse_untagged_response(from_bytes(line)))
+            resps.append(_parse_untagged_response(line))
         typ, data = tagged_commands.pop(tag)
         data = from_bytes(data)
         self._checkok(command, typ, data)
@@ -881,6 +1220,7 @@ class IMAPClient(object):
     def _command_and_check(self, command, *args, **kwargs):
         unpack = pop_with_default(kwargs, 'unpack', False)
         uid = pop_with_default(kwargs, 'uid', False)
+        decode = pop_with_default(kwargs, 'decode', True)
         assert not kwargs, "unexpected keyword args: " + ', '.join(kwargs)
 
         if uid and self.use_uid:
@@ -888,7 +1228,8 @@ class IMAPClient(object):
         else:
             meth = getattr(self._imap, command)
             typ, data = meth(*args)
-        data = from_bytes(data)
+        if decode:
+            data = from_bytes(data)
         self._checkok(command, typ, data)
         if unpack:
             return data[0]
@@ -908,8 +1249,9 @@ class IMAPClient(object):
                                        messages_to_str(messages),
                                        cmd,
                                        seq_to_parenstr(flags),
-                                       uid=True)
-        return self._filter_fetch_dict(parse_fetch_response(data), fetch_key)
+                                       uid=True, decode=False)
+        return self._filter_fetch_dict(parse_fetch_response(data, decode_literals=True),
+                                       fetch_key)
 
     def _filter_fetch_dict(self, fetch_dict, key):
         return dict((msgid, data[key])
@@ -949,17 +1291,40 @@ def seq_to_parenstr_upper(items):
     return _join_and_paren(item.upper() for item in _normalise_text_list(items))
 
 def messages_to_str(messages):
-    """Convert a sequence of messages ids or a single integer message id
-    into an id list string for use with IMAP commands
+    """Convert a sequence of messages ids, a UIDSet or a single integer
+    message id into an id list string for use with IMAP commands.
+
+    Runs of consecutive integer ids are written as ranges (eg.
+    ``1:5000``).
     """
+    if isinstance(messages, UIDSet):
+        return messages.to_seq_str()
     if isinstance(messages, (text_type, binary_type, integer_types)):
         messages = (messages,)
-    return ','.join(_maybe_int_to_unicode(m) for m in messages)
-
-def _maybe_int_to_unicode(val):
-    if isinstance(val, integer_types):
-        return text_type(val)
-    return to_unicode(val)
+    return ','.join(_compress_runs(messages))
+
+def _compress_runs(messages):
+    start = end = None
+    for m in messages:
+        if isinstance(m, integer_types):
+            if end is not None and m == end + 1:
+                end = m
+                continue
+            if end is not None:
+                yield _format_run(start, end)
+            start = end = m
+        else:
+            if end is not None:
+                yield _format_run(start, end)
+                start = end = None
+            yield to_unicode(m)
+    if end is not None:
+        yield _format_run(start, end)
+
+def _format_run(start, end):
+    if start == end:
+        return text_type(start)
+    return '%d:%d' % (start, end)
 
 def normalise_search_criteria(criteria):
     if not criteria:
@@ -984,11 +1349,53 @@ def datetime_to_imap(dt):
         dt = dt.replace(tzinfo=FixedOffset.for_system())
     return dt.strftime("%d-%b-%Y %H:%M:%S %z")
 
+_copyuid_re = re.compile(r'\[COPYUID (\d+) ([\d:,]+) ([\d:,]+)\]', re.I)
+_appenduid_re = re.compile(r'\[APPENDUID (\d+) ([\d:,]+)\]', re.I)
+
+def parse_copyuid(text):
+    """Parse the COPYUID response code (:rfc:`4315`) in the response
+    to a COPY or MOVE command.
+
+    Returns ``(uidvalidity, mapping)`` where *mapping* is a dict of
+    source UID to the UID of the copy in the destination folder, or
+    None if *text* has no COPYUID response code.
+    """
+    match = _copyuid_re.search(from_bytes(text or ''))
+    if not match:
+        return None
+    uidvalidity, source, dest = match.groups()
+    return int(uidvalidity), dict(zip(_expand_uid_set(source),
+                                      _expand_uid_set(dest)))
+
+def parse_appenduid(text):
+    """Parse the APPENDUID response code (:rfc:`4315`) in the
+    response to an APPEND command.
+
+    Returns ``(uidvalidity, uids)`` where *uids* lists the UIDs of the
+    appended messages in order, or None if *text* has no APPENDUID
+    response code.
+    """
+    match = _appenduid_re.search(from_bytes(text or ''))
+    if not match:
+        return None
+    return int(match.group(1)), _expand_uid_set(match.group(2))
+
+def _expand_uid_set(text):
+    # UIDs in the order given; a:b ranges count up whichever way round
+    # they are written.
+    uids = []
+    for item in text.split(','):
+        start, _, end = item.partition(':')
+        start = int(start)
+        end = int(end) if end else start
+        uids.extend(range(min(start, end), max(start, end) + 1))
+    return uids
+
 def _parse_untagged_response(text):
-    assert text.startswith('* ')
+    assert text[:2] in ('* ', b'* ')
     text = text[2:]
-    if text.startswith(('OK ', 'NO ')):
-        return tuple(text.split(' ', 1))
+    if text[:3] in ('OK ', 'NO ', b'OK ', b'NO '):
+        return tuple(from_bytes(text).split(' ', 1))
     return parse_response([text])
 
 def pop_with_default(dct, key, default):
@@ -0,0 +1,117 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Conversion of INTERNALDATE values in bulk.
+
+INTERNALDATE strings have a fixed layout (``dd-Mon-yyyy hh:mm:ss
++hhmm``, the day padded with a space), so they are sliced apart
+directly rather than matched with imaplib's regular expression. Values
+that don't have the expected layout are checked against the regular
+expression before being rejected.
+"""
+
+from __future__ import unicode_literals
+
+import calendar
+from datetime import datetime, timedelta
+
+from .fixed_offset import FixedOffset
+
+try:
+    import imaplib2 as imaplib
+except ImportError:
+    imaplib2 = None
+    import imaplib
+
+__all__ = ['InternalDateConverter', 'offset_for']
+
+MONTHS = dict((name.decode('ascii') if isinstance(name, bytes) else name, num)
+              for name, num in imaplib.Mon2num.items())
+
+_offsets = {}
+
+
+def offset_for(minutes):
+    """Return a shared FixedOffset instance for *minutes* east of UTC.
+    """
+    try:
+        return _offsets[minutes]
+    except KeyError:
+        return _offsets.setdefault(minutes, FixedOffset(minutes))
+
+
+class InternalDateConverter(object):
+    """Convert INTERNALDATE strings from one batch of FETCH responses.
+
+    If *normalise_times* is True, naive datetimes in the host system's
+    timezone are returned, otherwise datetimes carry a FixedOffset
+    tzinfo for the offset given by the server. The system timezone is
+    looked up once, when the converter is created.
+
+    If *epoch* is True, integer seconds since the Unix epoch are
+    returned instead of datetimes, which is cheaper when the values are
+    only sorted or compared. *normalise_times* has no effect then.
+    """
+
+    def __init__(self, normalise_times=True, epoch=False):
+        self.normalise_times = normalise_times
+        self.epoch = epoch
+        if normalise_times and not epoch:
+            self._system_minutes = _minutes(FixedOffset.for_system())
+            self._shifts = {}
+
+    def __call__(self, date_string):
+        day, mon, year, hour, minute, sec, zone = _split(date_string)
+        if self.epoch:
+            return (calendar.timegm((year, mon, day, hour, minute, sec))
+                    - zone * 60)
+        if self.normalise_times:
+            return datetime(year, mon, day, hour, minute, sec) + self._shift(zone)
+        return datetime(year, mon, day, hour, minute, sec, 0, offset_for(zone))
+
+    def _shift(self, zone):
+        # The difference between the server's offset and the system's.
+        try:
+            return self._shifts[zone]
+        except KeyError:
+            shift = timedelta(minutes=self._system_minutes - zone)
+            return self._shifts.setdefault(zone, shift)
+
+
+def _minutes(tz):
+    delta = tz.utcoffset(None)
+    return delta.days * 24 * 60 + delta.seconds // 60
+
+
+def _split(date_string):
+    # Returns (day, month, year, hour, minute, second, zone minutes).
+    s = date_string
+    if (len(s) == 26 and s[2] == '-' and s[6] == '-' and s[11] == ' '
+            and s[14] == ':' and s[17] == ':' and s[20] == ' '):
+        try:
+            zone = int(s[22:24]) * 60 + int(s[24:26])
+            if s[21] == '-':
+                zone = -zone
+            elif s[21] != '+':
+                raise ValueError
+            return (int(s[0:2]), MONTHS[s[3:6]], int(s[7:11]),
+                    int(s[12:14]), int(s[15:17]), int(s[18:20]), zone)
+        except (ValueError, KeyError):
+            pass
+    return _split_regex(date_string)
+
+
+def _split_regex(date_string):
+    date_msg = 'INTERNALDATE "%s"' % date_string
+    mo = imaplib.InternalDate.match(date_msg.encode('latin-1'))
+    if not mo or mo.group('mon') not in imaplib.Mon2num:
+        raise ValueError("couldn't parse date %r" % date_string)
+
+    zone = int(mo.group('zoneh')) * 60 + int(mo.group('zonem'))
+    if mo.group('zonen') == b'-':
+        zone = -zone
+    return (int(mo.group('day')), imaplib.Mon2num[mo.group('mon')],
+            int(mo.group('year')), int(mo.group('hour')),
+            int(mo.group('min')), int(mo.group('sec')), zone)
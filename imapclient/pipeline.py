@@ -0,0 +1,253 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Command pipelining.
+
+A Pipeline queues several commands, writes them to the server in one
+go and then reads the responses, so that a batch of commands costs one
+round trip instead of one per command::
+
+    with client.pipeline() as p:
+        bodies = [p.fetch(batch, ['BODY']) for batch in batches]
+        copied = p.copy(uids, 'Archive')
+    for result in bodies:
+        print(result.result())
+
+Each queued command returns a PipelineResult. Once the pipeline has
+been executed (when the ``with`` block exits, or by calling
+``execute()``) its ``result()`` method returns what the equivalent
+IMAPClient method would have returned, or raises the error it would
+have raised.
+
+At most *window* commands are in flight at once: the rest are sent as
+earlier ones complete, so neither side's socket buffers fill up while
+the other is still writing. ``iter_execute()`` yields each result as
+its command completes, so the results of a long pipeline needn't all
+be kept::
+
+    p = client.pipeline()
+    for batch in batches:
+        p.fetch(batch, ['BODY'])
+    for result in p.iter_execute():
+        process(result.result())
+
+Only commands that don't depend on each other should be pipelined
+(see :rfc:`3501#section-5.5`). Untagged responses are assigned to the
+earliest command that hasn't completed yet, which is correct for
+servers that run pipelined commands one at a time.
+"""
+
+from __future__ import unicode_literals
+
+from collections import deque
+
+from .imapclient import (
+    as_pairs,
+    from_bytes,
+    messages_to_str,
+    normalise_text_list,
+    seq_to_parenstr,
+    seq_to_parenstr_upper,
+    to_bytes,
+)
+from .response_parser import parse_fetch_response, parse_response
+
+__all__ = ['Pipeline', 'PipelineResult']
+
+#: The default number of commands in flight at once.
+WINDOW = 16
+
+
+class PipelineResult(object):
+    """The result of a command queued on a Pipeline."""
+
+    def __init__(self, command, response_key, process):
+        self.command = command
+        self.done = False
+        self._response_key = response_key
+        self._process = process
+        self._untagged = []
+        self._value = None
+        self._error = None
+
+    def result(self):
+        """Return the result of the command, raising IMAPClient.Error
+        if it failed. Raises ValueError if the pipeline hasn't been
+        executed yet.
+        """
+        if not self.done:
+            raise ValueError('pipeline has not been executed')
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def _complete(self, client, typ, data):
+        self.done = True
+        try:
+            client._checkok(self.command, typ, data)
+            self._value = self._process(self._untagged, from_bytes(data[0]))
+        except client.Error as err:
+            self._error = err
+        self._untagged = None
+
+
+class Pipeline(object):
+    """Queues commands for an IMAPClient and sends them together.
+
+    Use IMAPClient.pipeline() to create one. At most *window* commands
+    are sent before waiting for responses.
+    """
+
+    def __init__(self, client, window=WINDOW):
+        if window < 1:
+            raise ValueError('window must be at least 1')
+        self._client = client
+        self._window = window
+        self._queued = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def fetch(self, messages, data, modifiers=None):
+        """Queue a FETCH. The result is as per IMAPClient.fetch()."""
+        client = self._client
+        if not messages:
+            return self._empty('fetch', {})
+        args = [messages_to_str(messages),
+                seq_to_parenstr_upper(data),
+                seq_to_parenstr_upper(modifiers) if modifiers else None]
+
+        def process(untagged, text):
+            return parse_fetch_response(untagged, client.normalise_times,
+                                        client.use_uid,
+                                        buffer_literals=client.buffer_literals,
+                                        epoch_times=client.epoch_times,
+                                        decode_literals=True)
+        return self._queue('FETCH', args, 'FETCH', process, uid=True)
+
+    def add_flags(self, messages, flags):
+        """Queue a STORE adding *flags*. The result is as per
+        IMAPClient.add_flags()."""
+        return self._store('+FLAGS', messages, flags)
+
+    def remove_flags(self, messages, flags):
+        """Queue a STORE removing *flags*. The result is as per
+        IMAPClient.remove_flags()."""
+        return self._store('-FLAGS', messages, flags)
+
+    def set_flags(self, messages, flags):
+        """Queue a STORE setting *flags*. The result is as per
+        IMAPClient.set_flags()."""
+        return self._store('FLAGS', messages, flags)
+
+    def copy(self, messages, folder):
+        """Queue a COPY. The result is the server's response text."""
+        args = [messages_to_str(messages),
+                self._client._normalise_folder(folder)]
+        return self._queue('COPY', args, None,
+                           lambda untagged, text: text, uid=True)
+
+    def folder_status(self, folder, what=None):
+        """Queue a STATUS. The result is as per
+        IMAPClient.folder_status()."""
+        if what is None:
+            what = ('MESSAGES', 'RECENT', 'UIDNEXT', 'UIDVALIDITY', 'UNSEEN')
+        else:
+            what = normalise_text_list(what)
+        args = [self._client._normalise_folder(folder),
+                '(%s)' % ' '.join(what)]
+
+        def process(untagged, text):
+            _, status_items = parse_response(untagged[-1:])
+            return dict(as_pairs(status_items))
+        return self._queue('STATUS', args, 'STATUS', process)
+
+    def execute(self):
+        """Send the queued commands and read their responses. Returns
+        the list of PipelineResults in the order they were queued.
+        """
+        return list(self.iter_execute())
+
+    def iter_execute(self):
+        """Send the queued commands and read their responses, yielding
+        each PipelineResult as soon as its command has completed, in
+        the order they were queued.
+
+        .. note::
+
+            The generator must be exhausted before any other command
+            is issued on this connection.
+        """
+        queued, self._queued = deque(self._queued), []
+        if not queued:
+            return
+        imap = self._client._imap
+        untagged = imap.untagged_responses
+        for typ in ('OK', 'NO', 'BAD'):
+            untagged.pop(typ, None)
+
+        pending = deque()
+
+        def send_more():
+            lines = []
+            while queued and len(pending) < self._window:
+                name, args, result = queued.popleft()
+                tag = imap._new_tag()
+                lines.append(b' '.join([tag, to_bytes(name)] +
+                                       [to_bytes(arg) for arg in args if arg is not None]))
+                pending.append((tag, result))
+            if lines:
+                imap.send(b'\r\n'.join(lines) + b'\r\n')
+
+        send_more()
+        tagged_commands = imap.tagged_commands
+        while pending:
+            imap._get_response()
+            imap._check_bye()
+            tag, result = pending[0]
+            if result._response_key:
+                data = untagged.pop(result._response_key, None)
+                if data:
+                    result._untagged.extend(data)
+            completed = []
+            while pending and tagged_commands[pending[0][0]]:
+                tag, result = pending.popleft()
+                typ, data = tagged_commands.pop(tag)
+                result._complete(self._client, typ, data)
+                completed.append(result)
+            if completed:
+                # Keep the server busy while the results are used.
+                send_more()
+            for result in completed:
+                yield result
+
+    def _store(self, cmd, messages, flags):
+        if not messages:
+            return self._empty('store', {})
+        args = [messages_to_str(messages), cmd, seq_to_parenstr(flags)]
+        client = self._client
+
+        def process(untagged, text):
+            return client._filter_fetch_dict(
+                parse_fetch_response(untagged, decode_literals=True), 'FLAGS')
+        return self._queue('STORE', args, 'FETCH', process, uid=True)
+
+    def _empty(self, command, value):
+        # Nothing to send, eg. fetching no messages.
+        result = PipelineResult(command, None, None)
+        result.done = True
+        result._value = value
+        return result
+
+    def _queue(self, name, args, response_key, process, uid=False):
+        result = PipelineResult(name.lower(), response_key, process)
+        if uid and self._client.use_uid:
+            name = 'UID ' + name
+        self._queued.append((name, args, result))
+        return result
@@ -0,0 +1,228 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+A pool of authenticated IMAPClient sessions.
+
+A ConnectionPool logs in a number of sessions up front and lends them
+out to callers, possibly from several threads::
+
+    pool = ConnectionPool(parse_config_file('imap.ini'), size=4)
+    with pool.connection('INBOX', readonly=True) as client:
+        uids = client.search('UNSEEN')
+    pool.close()
+
+The pool remembers which folder each session has selected. A borrower
+asking for a folder gets a session that already has it selected if
+one is free, and no SELECT is sent. So that this works, borrowers
+should choose the folder by passing it to connection() rather than by
+calling select_folder() themselves. The pool keeps the SELECT response
+and ``folder_info()`` returns it, so borrowers needn't ask the server
+for the folder's UIDVALIDITY again.
+
+Sessions that haven't been used for *check_interval* seconds are
+checked with NOOP before being lent out, and are replaced if the check
+fails. Sessions whose borrower raised a connection error are replaced
+too.
+"""
+
+from __future__ import unicode_literals
+
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import create_client_from_config, parse_config_file
+from .imapclient import IMAPClient
+
+__all__ = ['ConnectionPool']
+
+# Errors after which a session can't be used any more.
+CONNECTION_ERRORS = (IMAPClient.AbortError, socket.error)
+
+
+class _Session(object):
+
+    def __init__(self, client):
+        self.client = client
+        self.folder = None
+        self.readonly = False
+        self.select_response = None
+        self.last_used = time.time()
+
+
+class ConnectionPool(object):
+    """Lends out up to *size* IMAPClient sessions created from *conf*.
+
+    *conf* is a config Bunch as returned by
+    ``imapclient.config.parse_config_file()``. The sessions are
+    created and logged in by *factory* (by default
+    ``create_client_from_config``), all of them when the pool is
+    created unless *prefill* is False, in which case they are created
+    as needed.
+    """
+
+    def __init__(self, conf, size=4, factory=create_client_from_config,
+                 check_interval=60, prefill=True):
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        self.conf = conf
+        self.size = size
+        self.factory = factory
+        self.check_interval = check_interval
+        self._idle = []
+        self._lent = {}
+        self._count = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        if prefill:
+            try:
+                for _ in range(size):
+                    self._idle.append(self._new_session())
+                    self._count += 1
+            except BaseException:
+                # Don't leave the sessions already created logged in.
+                for session in self._idle:
+                    _logout(session.client)
+                raise
+
+    @classmethod
+    def from_config_file(cls, path, **kwargs):
+        """Create a pool using the settings in the INI file at *path*."""
+        return cls(parse_config_file(path), **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextmanager
+    def connection(self, folder=None, readonly=False, timeout=None):
+        """Borrow a session for the duration of a ``with`` block.
+
+        If *folder* is given it will be selected (read-only if
+        *readonly* is True) when the block starts. Waits for at most
+        *timeout* seconds (forever if None) for a session to become
+        free, raising IMAPClient.Error if none does.
+        """
+        session = self._acquire(folder, readonly, timeout)
+        self._lent[session.client] = session
+        try:
+            if folder is not None and (session.folder, session.readonly) != (folder, readonly):
+                session.folder = session.select_response = None
+                session.select_response = session.client.select_folder(folder, readonly)
+                session.folder = folder
+                session.readonly = readonly
+            yield session.client
+        except CONNECTION_ERRORS:
+            del self._lent[session.client]
+            self._discard(session)
+            raise
+        except BaseException:
+            del self._lent[session.client]
+            self._release(session)
+            raise
+        else:
+            del self._lent[session.client]
+            self._release(session)
+
+    def folder_info(self, client):
+        """Return the response to the SELECT of the folder selected
+        on *client*, a session lent out by connection(), as returned
+        by ``select_folder()``. The session may have been lent out
+        before, so counts such as EXISTS may be out of date.
+        """
+        return self._lent[client].select_response
+
+    def close(self):
+        """Log out the sessions that aren't lent out. Sessions that are
+        lent out are logged out when they are returned.
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._count -= len(idle)
+            self._cond.notify_all()
+        for session in idle:
+            _logout(session.client)
+
+    def _acquire(self, folder, readonly, timeout):
+        deadline = timeout is not None and time.time() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise IMAPClient.Error('connection pool is closed')
+                if self._idle:
+                    session = self._pick(folder, readonly)
+                    break
+                if self._count < self.size:
+                    self._count += 1
+                    session = None
+                    break
+                remaining = deadline and deadline - time.time()
+                if deadline and remaining <= 0:
+                    raise IMAPClient.Error('no connection free after %s seconds' % timeout)
+                self._cond.wait(remaining or None)
+
+        if session is None:
+            return self._create()
+        if time.time() - session.last_used >= self.check_interval:
+            session = self._check(session)
+        return session
+
+    def _pick(self, folder, readonly):
+        # Prefer a session with the folder already selected, then the
+        # most recently used one, which is least likely to have timed
+        # out.
+        idle = self._idle
+        for i in range(len(idle) - 1, -1, -1):
+            if idle[i].folder == folder and idle[i].readonly == readonly:
+                return idle.pop(i)
+        return idle.pop()
+
+    def _check(self, session):
+        try:
+            session.client.noop()
+        except CONNECTION_ERRORS + (IMAPClient.Error,):
+            _logout(session.client)
+            return self._create()
+        return session
+
+    def _create(self):
+        # The caller has already counted the new session.
+        try:
+            return self._new_session()
+        except BaseException:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify()
+            raise
+
+    def _new_session(self):
+        return _Session(self.factory(self.conf))
+
+    def _release(self, session):
+        session.last_used = time.time()
+        with self._cond:
+            if not self._closed:
+                self._idle.append(session)
+                self._cond.notify()
+                return
+            self._count -= 1
+        _logout(session.client)
+
+    def _discard(self, session):
+        _logout(session.client)
+        with self._cond:
+            self._count -= 1
+            self._cond.notify()
+
+
+def _logout(client):
+    try:
+        client.logout()
+    except Exception:
+        pass
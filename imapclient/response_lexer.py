@@ -5,8 +5,17 @@
 """
 A lexical analyzer class for IMAP responses.
 
-Although Lexer does all the work, TokenSource is probably the class to
-use for external callers.
+Although the lexer classes do all the work, TokenSource is probably
+the class to use for external callers.
+
+Response records may be text or the bytes returned by imaplib. Bytes
+records are decoded (as latin-1) one line at a time as they are
+lexed; literals are passed through untouched.
+
+Two lexers are provided. RegexLexer scans each response record with
+compiled patterns and is used by default. Lexer is the original
+character-at-a-time implementation and remains available as a
+fallback (see TokenSource and DEFAULT_LEXER).
 """
 
 # This was heavily inspired by (ie, ripped off from) python 2.6's shlex
@@ -16,9 +25,11 @@ use for external callers.
 
 from __future__ import unicode_literals
 
+import re
+
 from . import six
 
-__all__ = ["Lexer"]
+__all__ = ["Lexer", "RegexLexer", "TokenSource"]
 
 if six.PY3:
     unichr = chr  # unichr doesn't exist in py3 where every string is unicode
@@ -29,6 +40,21 @@ SPECIALS = frozenset(' ()%"[')
 NON_SPECIALS = ALL_CHARS - SPECIALS - CTRL_CHARS
 WHITESPACE = frozenset(' \t\r\n')
 
+# The same character classes as above, expressed as regular
+# expressions for RegexLexer. ATOM_CHARS lists NON_SPECIALS explicitly
+# (rather than negating SPECIALS) so that characters outside latin-1
+# are treated as punctuation, exactly as Lexer does.
+ATOM_CHARS = r'\x21\x23\x24\x26\x27\x2a-\x5a\x5c-\xff'
+TOKEN_RE = re.compile(r"""
+    [ \t\r\n]*                            # skip whitespace
+    (?:
+        (?P<atom>(?:[%s]+|\[[^\]]*\])+)    # atom, possibly with [...]
+        (?=(?P<atom_quote>")?)             # note a directly following '"'
+      | (?P<quoted>"[^"\\]*(?:\\.[^"\\]*)*") # quoted string
+      | (?P<other>[^ \t\r\n])             # punctuation, eg. "("
+    )""" % ATOM_CHARS, re.VERBOSE | re.DOTALL)
+QUOTED_ESCAPE_RE = re.compile(r'\\([\\"])')
+
 
 class TokenSource(object):
     """
@@ -36,8 +62,8 @@ class TokenSource(object):
     the current IMAP literal.
     """
 
-    def __init__(self, text):
-        lex = Lexer()
+    def __init__(self, text, lexer_class=None):
+        lex = (lexer_class or DEFAULT_LEXER)()
         lex.sources = (LiteralHandlingIter(lex, chunk) for chunk in text)
         self.lex = lex
         self.src = iter(lex)
@@ -121,6 +147,45 @@ class Lexer(object):
                 yield tok
 
 
+class RegexLexer(Lexer):
+    """
+    A lexical analyzer for IMAP which scans each response record with
+    a compiled pattern instead of walking it one character at a time.
+
+    It produces the same tokens as Lexer.
+    """
+
+    def read_token_stream(self, text):
+        for atom, atom_quote, quoted, other in TOKEN_RE.findall(text):
+            if atom:
+                yield atom
+                # Lexer doesn't allow a quoted string to directly follow
+                # an atom.
+                assert not atom_quote
+            elif quoted:
+                if '\\' in quoted:
+                    quoted = QUOTED_ESCAPE_RE.sub(r'\1', quoted)
+                yield quoted
+            elif other == '"':
+                raise ValueError("No closing '\"'")
+            elif other == '[':
+                raise ValueError("No closing ']'")
+            else:
+                yield other
+
+    def __iter__(self):
+        "Generate tokens"
+        for source in self.sources:
+            self.current_source = source
+            for tok in self.read_token_stream(source.src_text):
+                yield tok
+
+
+# The lexer used by TokenSource when no lexer_class is given. Set this
+# to Lexer to fall back to the original implementation.
+DEFAULT_LEXER = RegexLexer
+
+
 # imaplib has poor handling of 'literals' - it both fails to remove the
 # {size} marker, and fails to keep responses grouped into the same logical
 # 'line'.  What we end up with is a list of response 'records', where each
@@ -138,18 +203,24 @@ class LiteralHandlingIter:
         if isinstance(resp_record, tuple):
             # A 'record' with a string which includes a literal marker, and
             # the literal itself.
-            self.src_text = resp_record[0]
+            self.src_text = _to_text(resp_record[0])
             assert self.src_text.endswith("}"), self.src_text
             self.literal = resp_record[1]
         else:
             # just a line with no literals.
-            self.src_text = resp_record
+            self.src_text = _to_text(resp_record)
             self.literal = None
 
     def __iter__(self):
         return PushableIterator(self.src_text)
 
 
+def _to_text(line):
+    if isinstance(line, six.binary_type):
+        return line.decode('latin-1')
+    return line
+
+
 class PushableIterator(object):
 
     NO_MORE = object()
@@ -15,20 +15,13 @@ from __future__ import unicode_literals
 
 import sys
 from collections import defaultdict
-from datetime import datetime
 
 from . import six
 xrange = six.moves.xrange
 
-from .fixed_offset import FixedOffset
+from .internaldate import InternalDateConverter
 from .response_lexer import TokenSource
 
-try:
-    import imaplib2 as imaplib
-except ImportError:
-    imaplib2 = None
-    import imaplib
-
 __all__ = ['parse_response', 'ParseError']
 
 
@@ -39,7 +32,9 @@ class ParseError(ValueError):
 def parse_response(data):
     """Pull apart IMAP command responses.
 
-    Returns nested tuples of appropriately typed objects.
+    *data* is a list of response records as returned by imaplib, as
+    bytes or text. Returns nested tuples of appropriately typed
+    objects. Literals are returned as they were received.
     """
     return tuple(gen_parsed_response(data))
 
@@ -60,17 +55,58 @@ def gen_parsed_response(text):
         raise ParseError("%s: %s" % (str(err), token))
 
 
-def parse_fetch_response(text, normalise_times=True, uid_is_key=True):
+def parse_fetch_response(text, normalise_times=True, uid_is_key=True,
+                         buffer_literals=False, epoch_times=False,
+                         decode_literals=False):
     """Pull apart IMAP FETCH responses as returned by imaplib.
 
     Returns a dictionary, keyed by message ID. Each value a dictionary
     keyed by FETCH field type (eg."RFC822").
+
+    *text* may be the undecoded bytes returned by imaplib. Literals
+    (eg. RFC822 or BODY[] values) are returned as they were received:
+    bytes stay bytes. If *decode_literals* is True, bytes literals are
+    decoded to strings instead, as when the whole response was decoded
+    before parsing. If *buffer_literals* is True, literals are returned
+    as read-only memoryview objects over the received bytes.
+
+    If *epoch_times* is True, INTERNALDATE values are returned as
+    integer seconds since the Unix epoch instead of datetimes.
     """
     if text == [None]:
         return {}
-    response = gen_parsed_response(text)
 
     parsed_response = defaultdict(dict)
+    for msg_id, msg_data in gen_fetch_response(text, normalise_times, uid_is_key,
+                                               buffer_literals, epoch_times,
+                                               decode_literals):
+        parsed_response[msg_id].update(msg_data)
+    return parsed_response
+
+
+def gen_fetch_response(text, normalise_times=True, uid_is_key=True,
+                       buffer_literals=False, epoch_times=False,
+                       decode_literals=False, convert_date=None):
+    """Pull apart IMAP FETCH responses, yielding ``(msg_id, dict)``
+    tuples one FETCH response at a time.
+
+    Unlike parse_fetch_response, nothing is merged: a message that
+    appears in more than one FETCH response is yielded more than once.
+
+    *convert_date*, if given, is the InternalDateConverter used for
+    INTERNALDATE values (so callers parsing many responses can share
+    one); *normalise_times* and *epoch_times* are then ignored.
+    """
+    if text == [None]:
+        return
+    if buffer_literals:
+        text = _with_literal_buffers(text)
+    elif decode_literals:
+        text = _with_text_literals(text)
+    response = gen_parsed_response(text)
+    if convert_date is None:
+        convert_date = InternalDateConverter(normalise_times, epoch_times)
+
     while True:
         try:
             msg_id = seq = _int_or_error(six.next(response),
@@ -102,15 +138,40 @@ def parse_fetch_response(text, normalise_times=True, uid_is_key=True):
                 else:
                     msg_data[word] = uid
             elif word == 'INTERNALDATE':
-                msg_data[word] = _convert_INTERNALDATE(value, normalise_times)
+                msg_data[word] = convert_date(value)
             elif word in ('BODY', 'BODYSTRUCTURE'):
                 msg_data[word] = BodyData.create(value)
             else:
                 msg_data[word] = value
 
-        parsed_response[msg_id].update(msg_data)
+        yield msg_id, msg_data
+
+
+def _with_literal_buffers(text):
+    # Wrap each literal in a memoryview so that it is neither decoded
+    # nor copied. Spooled literals are left alone.
+    for record in text:
+        if isinstance(record, tuple):
+            line, literal = record
+            if isinstance(literal, six.text_type):
+                literal = literal.encode('latin-1')
+            elif not isinstance(literal, six.binary_type):
+                yield record
+                continue
+            yield line, memoryview(literal)
+        else:
+            yield record
 
-    return parsed_response
+
+def _with_text_literals(text):
+    for record in text:
+        if isinstance(record, tuple):
+            line, literal = record
+            if isinstance(literal, six.binary_type):
+                literal = literal.decode('latin-1')
+            yield line, literal
+        else:
+            yield record
 
 
 def _int_or_error(value, error_text):
@@ -124,10 +185,35 @@ def _int_or_error(value, error_text):
 def listit(t):
     return list(map(listit, t)) if isinstance(t, (list, tuple)) else t
 
-class Body(list):
 
-    def set_content_type(self, content_type):
-        self.content_type = content_type
+# Content type strings are shared between all Body nodes with the same
+# media type and subtype (ignoring case), rather than being built and
+# stored per part.
+_content_types = {}
+_content_types_by_value = {}
+
+def _content_type(maintype, subtype):
+    key = (maintype, subtype)
+    try:
+        return _content_types[key]
+    except KeyError:
+        value = '%s/%s' % (maintype.lower(), subtype.lower())
+        value = _content_types_by_value.setdefault(value, value)
+        _content_types[key] = value
+        return value
+
+
+class Body(tuple):
+    """
+    A part of a BODY or BODYSTRUCTURE response.
+
+    Nodes are tuples with no per-instance state. The body type and
+    content type are worked out from the tuple when asked for, and the
+    sub-parts of a multipart body are only turned into Body nodes when
+    they are accessed.
+    """
+
+    __slots__ = ()
 
     @classmethod
     def create(cls, data):
@@ -141,31 +227,75 @@ class Body(list):
         else:
             raise ValueError('Invalid BODY input.')
 
+    @property
+    def part_count(self):
+        """The number of sub-parts (0 for a single part body)."""
+        count = 0
+        for item in tuple.__iter__(self):
+            if not isinstance(item, tuple):
+                break
+            count += 1
+        return count
+
+    @property
+    def type(self):
+        maintype = tuple.__getitem__(self, 0)
+        if not isinstance(maintype, six.string_types):
+            return 'body-type-mpart'
+        maintype = maintype.lower()
+        if (maintype == 'message'
+            and tuple.__getitem__(self, 1).lower() == 'rfc822'):
+            return 'body-type-msg'
+        elif maintype == 'text':
+            return 'body-type-text'
+        return 'body-type-basic'
+
+    @property
+    def content_type(self):
+        for i, item in enumerate(tuple.__iter__(self)):
+            if isinstance(item, six.string_types):
+                if i == 0:
+                    return _content_type(item, tuple.__getitem__(self, 1))
+                return _content_type('multipart', item)
+        return None
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self[i] for i in xrange(*index.indices(len(self))))
+        item = tuple.__getitem__(self, index)
+        if (type(item) is tuple
+            and (index if index >= 0 else index + len(self)) < self.part_count):
+            return self._wrap_part(item)
+        return item
+
+    def __getslice__(self, i, j):
+        # Python 2 slices tuple subclasses with __getslice__.
+        return self[max(0, i):max(0, j):]
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def _wrap_part(self, data):
+        return Body.create(data)
+
+
 class BodyType1Part(Body):
-    def __init__(self,data):
-        self.extend(data)
-        if (data[0].lower() == 'message' and data[1].lower() == 'rfc822'):
-            self.type = 'body-type-msg'
-        elif (data[0].lower() == 'text'):
-            self.type = 'body-type-text'
-        else:
-            self.type = 'body-type-basic'
-        content_type = "{}/{}".format(data[0].lower(),data[1].lower())
-        self.set_content_type(content_type)
+    __slots__ = ()
+
 
 class BodyTypeMPart(Body):
-    def __init__(self,data):
-        self.type = 'body-type-mpart'
-        for i,part in enumerate(data):
-            if isinstance(part, six.string_types):
-                break
-        newparts = list(map(Body.create,data[:i]))
-        newparts.extend(data[i:])
-        self.extend(newparts)
-        content_type = "multipart/{}".format(part.lower())
-        self.set_content_type(content_type)
+    __slots__ = ()
+
+
+class BodyData(Body):
+    """
+    A BODY or BODYSTRUCTURE response as returned by fetch().
+
+    Sub-parts are BodyData nodes themselves, created when accessed.
+    """
 
-class BodyData(tuple):
+    __slots__ = ()
     nest = False
 
     @classmethod
@@ -187,6 +317,9 @@ class BodyData(tuple):
     def is_multipart(self):
         return isinstance(self[0], list)
 
+    def _wrap_part(self, data):
+        return BodyData(data)
+
     def get_section(self, partnumber):
         """
         Uses IMAP section part numbers to get elements from the BodyData tuple.
@@ -214,33 +347,6 @@ class BodyData(tuple):
         return response
 
 
-def _convert_INTERNALDATE(date_string, normalise_times=True):
-    date_msg = 'INTERNALDATE "%s"' % date_string
-    mo = imaplib.InternalDate.match(date_msg.encode('latin-1'))
-    if not mo:
-        raise ValueError("couldn't parse date %r" % date_string)
-
-    zoneh = int(mo.group('zoneh'))
-    zonem = (zoneh * 60) + int(mo.group('zonem'))
-    if mo.group('zonen') == b'-':
-        zonem = -zonem
-    tz = FixedOffset(zonem)
-
-    year = int(mo.group('year'))
-    mon = imaplib.Mon2num[mo.group('mon')]
-    day = int(mo.group('day'))
-    hour = int(mo.group('hour'))
-    min = int(mo.group('min'))
-    sec = int(mo.group('sec'))
-
-    dt = datetime(year, mon, day, hour, min, sec, 0, tz)
-
-    if normalise_times:
-        # Normalise to host system's timezone
-        return dt.astimezone(FixedOffset.for_system()).replace(tzinfo=None)
-    return dt
-
-
 def atom(src, token):
     if token == '(':
         return parse_tuple(src)
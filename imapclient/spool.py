@@ -0,0 +1,105 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Spooling of large literals to temporary files.
+
+When the *spool_threshold* attribute of an IMAPClient is set, literals
+of at least that many bytes (eg. ``RFC822`` or ``BODY[]`` of large
+messages) are copied from the connection to a temporary file a chunk
+at a time as they arrive, and ``fetch()`` returns a SpooledLiteral
+for them instead of a string::
+
+    client.spool_threshold = 1024 * 1024
+    for uid, data in client.iter_fetch(uids, ['RFC822']):
+        with data['RFC822'] as literal:
+            msg = email.message_from_binary_file(literal.open())
+
+So downloading large messages needs memory for one chunk, not for the
+whole message.
+"""
+
+from __future__ import unicode_literals
+
+import tempfile
+
+__all__ = ['SpooledLiteral']
+
+CHUNK_SIZE = 64 * 1024
+
+
+class SpooledLiteral(object):
+    """A literal held in a temporary file.
+
+    ``len()`` gives its size in bytes. The file is removed when the
+    SpooledLiteral is closed (or used as a context manager) or garbage
+    collected.
+    """
+
+    def __init__(self, fileobj, size):
+        self._file = fileobj
+        self._size = size
+
+    def __len__(self):
+        return self._size
+
+    def open(self):
+        """Return the underlying binary file, positioned at the start.
+
+        The same file is returned each time, so only one reader
+        should use it at once.
+        """
+        self._file.seek(0)
+        return self._file
+
+    def read(self):
+        """Return the whole literal as bytes."""
+        return self.open().read()
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        """Yield the literal as bytes, *chunk_size* bytes at a time."""
+        fh = self.open()
+        while True:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        self._file.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return '<SpooledLiteral of %d bytes>' % self._size
+
+
+def spool(read, size, chunk_size=CHUNK_SIZE, dir=None):
+    """Copy a literal of *size* bytes to a temporary file in *dir*,
+    reading it with *read* (a function taking a number of bytes, such
+    as ``imaplib.IMAP4.read``) at most *chunk_size* bytes at a time.
+    Returns a SpooledLiteral.
+    """
+    fileobj = tempfile.TemporaryFile(dir=dir)
+    try:
+        remaining = size
+        while remaining:
+            chunk = read(min(chunk_size, remaining))
+            if not chunk:
+                raise EOFError('connection closed with %d bytes of literal unread' % remaining)
+            fileobj.write(chunk)
+            remaining -= len(chunk)
+        fileobj.flush()
+    except BaseException:
+        fileobj.close()
+        raise
+    return SpooledLiteral(fileobj, size)
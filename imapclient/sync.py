@@ -0,0 +1,202 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Incremental folder synchronisation using CONDSTORE and QRESYNC.
+
+A SyncEngine remembers, for each folder, the UIDVALIDITY, the highest
+mod-sequence seen and the UIDs in the folder. The next sync of the
+folder asks the server only for what changed since then::
+
+    engine = SyncEngine(client)
+    result = engine.sync('INBOX')      # first time: everything
+    ...
+    result = engine.sync('INBOX')      # later: just the changes
+    for uid, data in result.changed.items():
+        print(uid, data['FLAGS'])
+    print('expunged:', result.vanished)
+
+If the server supports QRESYNC (:rfc:`7162`) the changed flags and the
+expunged UIDs come back with the SELECT (the VANISHED response). With
+only CONDSTORE, changes are fetched with ``CHANGEDSINCE`` and expunged
+messages are found with ``UID SEARCH ALL``. Servers with neither, and
+folders whose UIDVALIDITY changed, get a full fetch.
+
+The state can be saved as JSON with save() and restored with load().
+"""
+
+from __future__ import unicode_literals
+
+import json
+
+from .imapclient import from_bytes, normalise_text_list
+from .response_parser import parse_fetch_response
+from .uidset import UIDSet
+
+__all__ = ['SyncEngine', 'SyncResult', 'FolderState']
+
+
+class FolderState(object):
+    """What a SyncEngine knows about a folder."""
+
+    def __init__(self, uidvalidity, highestmodseq, uids):
+        self.uidvalidity = uidvalidity
+        self.highestmodseq = highestmodseq
+        self.uids = uids
+
+    def as_dict(self):
+        return dict(uidvalidity=self.uidvalidity,
+                    highestmodseq=self.highestmodseq,
+                    uids=self.uids.to_seq_str())
+
+    @classmethod
+    def from_dict(cls, d):
+        uids = UIDSet.parse(d['uids']) if d['uids'] else UIDSet()
+        return cls(d['uidvalidity'], d['highestmodseq'], uids)
+
+
+class SyncResult(object):
+    """The outcome of SyncEngine.sync().
+
+    *changed* is a dict of UID to fetched data for new messages and
+    messages whose flags changed. *vanished* is a UIDSet of messages
+    expunged since the last sync. *full* is True if the whole folder
+    was fetched (first sync, UIDVALIDITY change or no CONDSTORE
+    support), in which case *changed* has every message. *info* is the
+    folder's select_folder() response.
+    """
+
+    def __init__(self, changed, vanished, full, info):
+        self.changed = changed
+        self.vanished = vanished
+        self.full = full
+        self.info = info
+
+
+class SyncEngine(object):
+    """Synchronises folders of *client* incrementally.
+
+    *items* are the FETCH items wanted for changed messages (FLAGS by
+    default; MODSEQ is added when the server supports CONDSTORE and
+    the folder has mod-sequences). The client must have use_uid
+    set. QRESYNC is enabled on the connection when the server supports
+    it and *use_qresync* is True; this must happen before a folder is
+    selected, so create the engine straight after logging in.
+    """
+
+    def __init__(self, client, items=('FLAGS',), readonly=True, use_qresync=True):
+        self.client = client
+        self.items = [item.upper() for item in normalise_text_list(items)]
+        self.readonly = readonly
+        self.folders = {}
+        self.qresync = False
+        if use_qresync and client.has_capability('QRESYNC'):
+            self.qresync = 'QRESYNC' in client.enable('QRESYNC')
+
+    def save(self, path):
+        """Write the state of every folder to *path* as JSON."""
+        state = dict((folder, fs.as_dict()) for folder, fs in self.folders.items())
+        with open(path, 'w') as fh:
+            json.dump(state, fh, indent=1, sort_keys=True)
+
+    def load(self, path):
+        """Read folder state saved with save()."""
+        with open(path) as fh:
+            state = json.load(fh)
+        self.folders = dict((folder, FolderState.from_dict(d))
+                            for folder, d in state.items())
+
+    def sync(self, folder):
+        """Select *folder* and return a SyncResult describing what
+        changed since it was last synchronised.
+        """
+        client = self.client
+        state = self.folders.get(folder)
+        changed = vanished = None
+        if state is not None and self.qresync:
+            info, changed, vanished = self._select_qresync(folder, state)
+        else:
+            info = client.select_folder(folder, self.readonly)
+
+        modseq = info.get('HIGHESTMODSEQ')
+        uidvalidity = info['UIDVALIDITY']
+        empty = info.get('EXISTS') == 0
+        items = self._fetch_items(modseq)
+        if state is None or modseq is None or state.uidvalidity != uidvalidity:
+            changed = {} if empty else dict(client.fetch('1:*', items))
+            result = SyncResult(changed, UIDSet(), True, info)
+            uids = UIDSet(changed)
+        else:
+            if changed is None:
+                changed = {}
+                if not empty:
+                    changed = dict(client.fetch('1:*', items,
+                                                ['CHANGEDSINCE %d' % state.highestmodseq]))
+                uids = client.search_uidset('ALL') if not empty else UIDSet()
+                vanished = state.uids - uids
+            else:
+                changed = self._complete_items(changed)
+                uids = (state.uids - vanished) | UIDSet(changed)
+            result = SyncResult(changed, vanished, False, info)
+
+        if modseq is None:
+            self.folders.pop(folder, None)
+        else:
+            self.folders[folder] = FolderState(uidvalidity, modseq, uids)
+        return result
+
+    def _select_qresync(self, folder, state):
+        # SELECT with the QRESYNC parameter. The server replies with
+        # FETCH responses for changed messages and a VANISHED
+        # (EARLIER) response for expunged ones.
+        client = self.client
+        imap = client._imap
+        name = self.readonly and 'EXAMINE' or 'SELECT'
+        imap.untagged_responses = {}
+        imap.is_readonly = self.readonly
+        typ, data = imap._simple_command(
+            name, client._normalise_folder(folder),
+            '(QRESYNC (%d %d))' % (state.uidvalidity, state.highestmodseq))
+        client._checkok(name.lower(), typ, data)
+        imap.state = 'SELECTED'
+
+        untagged = imap.untagged_responses
+        fetched = untagged.pop('FETCH', None)
+        vanished = parse_vanished(untagged.pop('VANISHED', []))
+        changed = {}
+        if fetched:
+            changed = dict(parse_fetch_response(fetched, client.normalise_times,
+                                                client.use_uid))
+        return client._process_select_response(untagged), changed, vanished
+
+    def _fetch_items(self, modseq):
+        # Servers without CONDSTORE, and folders without
+        # HIGHESTMODSEQ (NOMODSEQ), reject the MODSEQ fetch item.
+        if (modseq is None or 'MODSEQ' in self.items or
+                not (self.qresync or self.client.has_capability('CONDSTORE'))):
+            return self.items
+        return self.items + ['MODSEQ']
+
+    def _complete_items(self, changed):
+        # QRESYNC only reports UID, FLAGS and MODSEQ.
+        missing = [item for item in self.items
+                   if item not in ('UID', 'FLAGS', 'MODSEQ')]
+        if changed and missing:
+            for uid, data in self.client.fetch(list(changed), missing).items():
+                changed[uid].update(data)
+        return changed
+
+
+def parse_vanished(data):
+    """Return a UIDSet of the UIDs in VANISHED responses, given as
+    imaplib untagged response data (eg. ``[b'(EARLIER) 41,43:116']``).
+    """
+    uids = UIDSet()
+    for line in data:
+        line = from_bytes(line).strip()
+        if line.upper().startswith('(EARLIER)'):
+            line = line[len('(EARLIER)'):].strip()
+        if line:
+            uids = uids | UIDSet.parse(line)
+    return uids
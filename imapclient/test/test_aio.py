@@ -0,0 +1,227 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+from datetime import datetime
+from mock import Mock, patch
+
+from imapclient.test.util import unittest
+
+try:
+    import asyncio
+    from imapclient.aio import AsyncIMAPClient, MAXLINE
+except (ImportError, SyntaxError):
+    AsyncIMAPClient = None
+
+
+GREETING = b'* OK [CAPABILITY IMAP4rev1 IDLE] ready\r\n'
+
+
+class FakeServer(object):
+    """Stands in for the StreamReader/StreamWriter pair. Each write is
+    answered with the next scripted reply.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.written = []
+        self.closed = False
+        self.reader = asyncio.StreamReader(limit=MAXLINE)
+        self.reader.feed_data(GREETING)
+
+    def write(self, data):
+        self.written.append(data)
+        reply = self.replies.pop(0)
+        if reply:
+            self.reader.feed_data(reply)
+
+    def drain(self):
+        done = asyncio.get_event_loop().create_future()
+        done.set_result(None)
+        return done
+
+    def close(self):
+        self.closed = True
+
+
+@unittest.skipIf(AsyncIMAPClient is None, 'asyncio client needs Python 3.5+')
+class TestAsyncIMAPClient(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        test = self
+
+        class Client(AsyncIMAPClient):
+            def _open_connection(self):
+                test.server = FakeServer(test.replies)
+                opened = asyncio.get_event_loop().create_future()
+                opened.set_result((test.server.reader, test.server))
+                return opened
+
+        self.replies = []
+        self.client = Client('imap.test')
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_coro(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def connect(self, *replies):
+        self.replies.extend(replies)
+        self.run_coro(self.client.connect())
+
+    def test_connect(self):
+        self.connect()
+        self.assertEqual(self.client.welcome, 'ready')
+        self.assertEqual(self.client._cached_capabilities, ('IMAP4REV1', 'IDLE'))
+
+    def test_login(self):
+        self.connect(b'A1 OK [CAPABILITY IMAP4rev1 UIDPLUS] Logged in\r\n')
+        self.assertEqual(self.run_coro(self.client.login('fred', 'pa"ss')),
+                         '[CAPABILITY IMAP4rev1 UIDPLUS] Logged in')
+        self.assertEqual(self.server.written, [b'A1 LOGIN "fred" "pa\\"ss"\r\n'])
+        self.assertTrue(self.run_coro(self.client.has_capability('uidplus')))
+
+    def test_login_failure(self):
+        self.connect(b'A1 NO bad password\r\n')
+        self.assertRaisesRegex(AsyncIMAPClient.Error, 'bad password',
+                               self.run_coro, self.client.login('fred', 'x'))
+
+    def test_list_folders(self):
+        self.connect(b'* LIST (\\HasNoChildren) "/" "INBOX"\r\n'
+                     b'* LIST (\\HasNoChildren) "/" "Sent &AOQ-"\r\n'
+                     b'A1 OK done\r\n')
+        folders = self.run_coro(self.client.list_folders())
+        self.assertEqual(folders, [(('\\HasNoChildren',), '/', 'INBOX'),
+                                   (('\\HasNoChildren',), '/', 'Sent \xe4')])
+
+    def test_select_folder(self):
+        self.connect(b'* 3 EXISTS\r\n'
+                     b'* 0 RECENT\r\n'
+                     b'* FLAGS (\\Seen \\Deleted)\r\n'
+                     b'* OK [UIDVALIDITY 1239278212] UIDs valid\r\n'
+                     b'A1 OK [READ-WRITE] SELECT completed\r\n')
+        self.assertEqual(self.run_coro(self.client.select_folder('INBOX')), {
+            'EXISTS': 3,
+            'RECENT': 0,
+            'FLAGS': ('\\Seen', '\\Deleted'),
+            'UIDVALIDITY': 1239278212,
+            'READ-WRITE': True,
+        })
+        self.assertEqual(self.server.written, [b'A1 SELECT "INBOX"\r\n'])
+
+    def test_folder_status(self):
+        self.connect(b'* STATUS "INBOX" (MESSAGES 3 UIDNEXT 12)\r\n'
+                     b'A1 OK done\r\n')
+        status = self.run_coro(self.client.folder_status('INBOX', ['messages', 'uidnext']))
+        self.assertEqual(status, {'MESSAGES': 3, 'UIDNEXT': 12})
+        self.assertEqual(self.server.written,
+                         [b'A1 STATUS "INBOX" (messages uidnext)\r\n'])
+
+    def test_search(self):
+        self.connect(b'* SEARCH 1 2 3 7\r\nA1 OK done\r\n',
+                     b'* SEARCH\r\nA2 OK done\r\n')
+        self.assertEqual(self.run_coro(self.client.search_uidset()).ranges(),
+                         [(1, 3), (7, 7)])
+        self.assertEqual(self.run_coro(self.client.search(['UNSEEN'])), [])
+        self.assertEqual(self.server.written, [b'A1 UID SEARCH (ALL)\r\n',
+                                               b'A2 UID SEARCH (UNSEEN)\r\n'])
+
+    def test_line_limit(self):
+        with patch('imapclient.aio.asyncio.open_connection', new_callable=Mock) as open_connection:
+            AsyncIMAPClient('imap.test')._open_connection()
+        open_connection.assert_called_once_with('imap.test', 143, ssl=None, limit=MAXLINE)
+
+    def test_long_line(self):
+        uids = ' '.join(str(uid) for uid in range(1, 30001, 2)).encode('ascii')
+        self.connect(b'* SEARCH ' + uids + b'\r\nA1 OK done\r\n')
+        self.assertEqual(len(self.run_coro(self.client.search())), 15000)
+
+    def test_fetch_with_literal(self):
+        self.connect(b'* 1 FETCH (UID 5 FLAGS (\\Seen) RFC822 {10}\r\n'
+                     b'hello\r\nyou)\r\n'
+                     b'A1 OK done\r\n')
+        self.client.use_uid = False
+        result = self.run_coro(self.client.fetch([1], ['FLAGS', 'RFC822']))
+        self.assertEqual(result, {1: {'SEQ': 1, 'UID': 5, 'FLAGS': ('\\Seen',),
+                                      'RFC822': 'hello\r\nyou'}})
+        self.assertEqual(self.server.written, [b'A1 FETCH 1 (FLAGS RFC822)\r\n'])
+
+    @patch('imapclient.aio._parse_untagged')
+    def test_fetch_parsed_once(self, parse_untagged):
+        self.connect(b'* 1 FETCH (UID 5 FLAGS ())\r\nA1 OK done\r\n')
+        self.assertEqual(self.run_coro(self.client.fetch([5], ['FLAGS'])),
+                         {5: {'SEQ': 1, 'FLAGS': ()}})
+        self.assertFalse(parse_untagged.called)
+
+    def test_fetch_nothing(self):
+        self.connect()
+        self.assertEqual(self.run_coro(self.client.fetch([], ['FLAGS'])), {})
+        self.assertEqual(self.server.written, [])
+
+    def test_add_flags(self):
+        self.connect(b'* 1 FETCH (UID 5 FLAGS (\\Seen \\Flagged))\r\nA1 OK done\r\n')
+        result = self.run_coro(self.client.add_flags([5], ['\\Flagged']))
+        self.assertEqual(result, {5: ('\\Seen', '\\Flagged')})
+        self.assertEqual(self.server.written,
+                         [b'A1 UID STORE 5 +FLAGS (\\Flagged)\r\n'])
+
+    def test_append(self):
+        self.connect(b'+ go ahead\r\n', b'A1 OK [APPENDUID 1 7] done\r\n')
+        text = self.run_coro(self.client.append('INBOX', 'Subject: hi\r\n\r\nbody',
+                                                ['\\Seen'], datetime(2013, 2, 3, 4, 5, 6)))
+        self.assertEqual(text, '[APPENDUID 1 7] done')
+        command, literal = self.server.written
+        self.assertTrue(command.startswith(b'A1 APPEND "INBOX" (\\Seen) "03-Feb-2013 04:05:06 '))
+        self.assertTrue(command.endswith(b'" {19}\r\n'))
+        self.assertEqual(literal, b'Subject: hi\r\n\r\nbody\r\n')
+
+    def test_expunge(self):
+        self.connect(b'* 2 EXPUNGE\r\n* 1 EXPUNGE\r\nA1 OK done\r\n')
+        self.assertEqual(self.run_coro(self.client.expunge()),
+                         ('done', [(2, 'EXPUNGE'), (1, 'EXPUNGE')]))
+
+    def test_idle(self):
+        self.connect(b'+ idling\r\n', b'* 4 EXISTS\r\nA1 OK IDLE terminated\r\n')
+        self.run_coro(self.client.idle())
+        self.assertEqual(self.run_coro(self.client.idle_check(timeout=0.01)), [])
+
+        self.server.reader.feed_data(b'* 3 EXISTS\r\n* 1 FETCH (FLAGS ())\r\n')
+        self.assertEqual(self.run_coro(self.client.idle_check()),
+                         [(3, 'EXISTS'), (1, 'FETCH', ('FLAGS', ()))])
+
+        self.assertEqual(self.run_coro(self.client.idle_done()),
+                         ('IDLE terminated', [(4, 'EXISTS')]))
+        self.assertEqual(self.server.written, [b'A1 IDLE\r\n', b'DONE\r\n'])
+
+    def test_idle_check_skips_continuations(self):
+        self.connect(b'+ idling\r\n')
+        self.run_coro(self.client.idle())
+        self.server.reader.feed_data(b'+ still here\r\n* 3 EXISTS\r\n')
+        self.assertEqual(self.run_coro(self.client.idle_check()), [(3, 'EXISTS')])
+
+    def test_idle_ended_by_server(self):
+        self.connect(b'+ idling\r\n')
+        self.run_coro(self.client.idle())
+        self.server.reader.feed_data(b'* 3 EXISTS\r\nA1 BAD timed out\r\n')
+        self.assertRaisesRegex(AsyncIMAPClient.Error, 'timed out',
+                               self.run_coro, self.client.idle_check())
+        self.assertRaises(AsyncIMAPClient.Error, self.run_coro, self.client.idle_done())
+
+    def test_bye(self):
+        self.connect(b'* BYE going away\r\n')
+        self.assertRaisesRegex(AsyncIMAPClient.AbortError, 'going away',
+                               self.run_coro, self.client.noop())
+
+    def test_logout(self):
+        self.connect(b'* BYE see you\r\nA1 OK done\r\n')
+        self.assertEqual(self.run_coro(self.client.logout()), 'done')
+        self.assertTrue(self.server.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
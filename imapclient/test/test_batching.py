@@ -0,0 +1,125 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+from mock import Mock, patch
+
+from imapclient.batching import BatchPlanner, fetch_in_batches, COMMAND_OVERHEAD
+from imapclient.imapclient import messages_to_str
+from imapclient.test.util import unittest
+
+
+class TestBatchPlanner(unittest.TestCase):
+
+    def test_default_sizes(self):
+        planner = BatchPlanner(target_bytes=1000, default_message_size=100)
+        self.assertEqual([len(b) for b in planner.plan(range(1, 26))], [10, 10, 5])
+
+    def test_known_sizes(self):
+        planner = BatchPlanner(target_bytes=1000)
+        sizes = {1: 600, 2: 300, 3: 200, 4: 5000, 5: 10}
+        self.assertEqual(list(planner.plan([1, 2, 3, 4, 5], sizes)),
+                         [[1, 2], [3], [4], [5]])
+
+    def test_min_batch(self):
+        planner = BatchPlanner(target_bytes=100, default_message_size=100, min_batch=3)
+        self.assertEqual([len(b) for b in planner.plan(range(7))], [3, 3, 1])
+
+    def test_max_batch(self):
+        planner = BatchPlanner(default_message_size=1, max_batch=4)
+        self.assertEqual([len(b) for b in planner.plan(range(10))], [4, 4, 2])
+
+    def test_line_length(self):
+        planner = BatchPlanner(default_message_size=1, max_line_length=COMMAND_OVERHEAD + 30)
+        batches = list(planner.plan(range(1, 1000, 2)))
+        self.assertEqual(sum(batches, []), list(range(1, 1000, 2)))
+        for batch in batches:
+            self.assertLessEqual(len(messages_to_str(batch)), 30)
+        self.assertEqual(len(messages_to_str(batches[0])), 30)
+
+    def test_line_length_counts_runs(self):
+        planner = BatchPlanner(default_message_size=1, max_batch=100000,
+                               max_line_length=COMMAND_OVERHEAD + 30)
+        self.assertEqual([len(b) for b in planner.plan(range(1, 100000))], [99999])
+
+    def test_record_adjusts_byte_limit(self):
+        planner = BatchPlanner(target_bytes=1000, target_seconds=2)
+        planner.record(10, 3.0)
+        self.assertEqual(planner.byte_limit, 500)
+        planner.record(5, 1.0)
+        self.assertEqual(planner.byte_limit, 500)
+        planner.record(5, 0.1)
+        self.assertEqual(planner.byte_limit, 1000)
+        planner.record(10, 0.1)
+        self.assertEqual(planner.byte_limit, 1000)
+        self.assertEqual(planner.batch_sizes, [10, 5, 5, 10])
+
+    def test_plan_follows_records(self):
+        planner = BatchPlanner(target_bytes=1000, default_message_size=100)
+        batches = planner.plan(range(30))
+        self.assertEqual(len(next(batches)), 10)
+        planner.record(10, 10)
+        self.assertEqual(len(next(batches)), 5)
+
+
+class TestFetchInBatches(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Mock()
+        self.client.fetch.side_effect = self.fetch
+        self.sizes = dict((i, 400) for i in range(1, 11))
+
+    def fetch(self, messages, data, modifiers=None):
+        if data == ['RFC822.SIZE']:
+            return dict((m, {'RFC822.SIZE': self.sizes[m]}) for m in messages)
+        return dict((m, {'FLAGS': ()}) for m in messages if m != 3)
+
+    def test_metadata(self):
+        planner = BatchPlanner(target_bytes=1000, default_message_size=200)
+        out = list(fetch_in_batches(self.client, range(1, 11), ['FLAGS'], planner))
+        self.assertEqual([m for m, _ in out], [1, 2, 4, 5, 6, 7, 8, 9, 10])
+        self.assertEqual(planner.batch_sizes, [5, 5])
+        self.assertEqual(self.client.fetch.call_count, 2)
+
+    def test_prefetches_sizes_for_content(self):
+        planner = BatchPlanner(target_bytes=1000)
+        out = list(fetch_in_batches(self.client, range(1, 11), ['RFC822'], planner))
+        self.assertEqual(len(out), 9)
+        self.assertEqual(self.client.fetch.call_args_list[0][0], ([1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
+                                                                  ['RFC822.SIZE']))
+        self.assertEqual(planner.batch_sizes, [2, 2, 2, 2, 2])
+        self.assertEqual(planner.history[0][2], 800)
+
+    def test_prefetch_line_length(self):
+        self.sizes = dict((i, 10) for i in range(1, 20001, 2))
+        planner = BatchPlanner(max_line_length=1000)
+        out = list(fetch_in_batches(self.client, sorted(self.sizes), ['RFC822'], planner))
+        self.assertEqual(len(out), 9999)
+        prefetched = [c[0][0] for c in self.client.fetch.call_args_list
+                      if c[0][1] == ['RFC822.SIZE']]
+        self.assertEqual(sum(prefetched, []), sorted(self.sizes))
+        for batch in prefetched:
+            self.assertLessEqual(len(messages_to_str(batch)), 1000 - COMMAND_OVERHEAD)
+
+    def test_given_sizes(self):
+        planner = BatchPlanner(target_bytes=1000)
+        list(fetch_in_batches(self.client, [1, 2, 3], 'BODY.PEEK[]', planner,
+                              sizes={1: 900, 2: 900, 3: 10}))
+        self.assertEqual([c[0][0] for c in self.client.fetch.call_args_list],
+                         [[1], [2, 3]])
+
+    def test_slow_batches_shrink(self):
+        planner = BatchPlanner(target_bytes=1000, default_message_size=100, target_seconds=1)
+        with patch('imapclient.batching.default_timer', side_effect=[0, 5, 5, 6, 6, 7]):
+            list(fetch_in_batches(self.client, range(1, 21), ['FLAGS'], planner))
+        self.assertEqual(planner.batch_sizes, [10, 5, 5])
+
+    def test_nothing(self):
+        self.assertEqual(list(fetch_in_batches(self.client, [], ['RFC822'])), [])
+        self.assertFalse(self.client.fetch.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
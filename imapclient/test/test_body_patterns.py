@@ -0,0 +1,176 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+from imapclient.body_patterns import (
+    ANY,
+    part,
+    multipart,
+    contains,
+    all_of,
+    any_of,
+    not_,
+    compile,
+    classify,
+    oversized,
+    SMIME_P7M,
+    WINMAIL_DAT,
+    NESTED_MESSAGE,
+)
+from imapclient.response_parser import BodyData, parse_response
+from imapclient.test.util import unittest
+
+
+def body(text):
+    return BodyData.create(parse_response([text])[0])
+
+
+TEXT = body('("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 1152 23)')
+
+SMIME = body('(("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 320 8)'
+             '("APPLICATION" "OCTET-STREAM" ("NAME" "smime.p7m") NIL NIL "BASE64" 88120) "MIXED")')
+
+SMIME_EXTENDED = body(
+    '(("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 320 8 NIL NIL NIL)'
+    '("APPLICATION" "OCTET-STREAM" ("NAME" "smime.p7m") NIL NIL "BASE64" 88120 NIL'
+    ' ("ATTACHMENT" ("FILENAME" "smime.p7m")) NIL) "MIXED" ("BOUNDARY" "b1") NIL NIL)')
+
+WINMAIL = body(
+    '(("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 320 8 NIL NIL NIL)'
+    '("APPLICATION" "OCTET-STREAM" ("NAME" "x") NIL NIL "BASE64" 5000 NIL'
+    ' ("ATTACHMENT" ("FILENAME" "WINMAIL.DAT")) NIL) "MIXED" NIL NIL NIL)')
+
+FORWARDED = body(
+    '(("TEXT" "PLAIN" NIL NIL NIL "7BIT" 10 1)'
+    '("MESSAGE" "RFC822" NIL NIL NIL "7BIT" 900'
+    ' (NIL "inner" NIL NIL NIL NIL NIL NIL NIL NIL)'
+    ' (("TEXT" "PLAIN" NIL NIL NIL "7BIT" 20 1)'
+    '  ("IMAGE" "PNG" ("NAME" "big.png") NIL NIL "BASE64" 3000000) "MIXED")'
+    ' 30) "MIXED")')
+
+
+class TestPatterns(unittest.TestCase):
+
+    def test_part(self):
+        self.assertTrue(compile(part('text/plain'))(TEXT))
+        self.assertTrue(compile(part('TEXT/*'))(TEXT))
+        self.assertTrue(compile(part())(TEXT))
+        self.assertFalse(compile(part('text/html'))(TEXT))
+        self.assertFalse(compile(part())(SMIME))
+
+    def test_part_fields(self):
+        self.assertTrue(compile(part(params={'charset': 'US-ASCII'}))(TEXT))
+        self.assertTrue(compile(part(params={'charset': None}))(TEXT))
+        self.assertFalse(compile(part(params={'name': None}))(TEXT))
+        self.assertTrue(compile(part(encoding='7bit'))(TEXT))
+        self.assertFalse(compile(part(encoding='base64'))(TEXT))
+        self.assertTrue(compile(part(min_size=1152, max_size=1152))(TEXT))
+        self.assertFalse(compile(part(min_size=1153))(TEXT))
+        self.assertFalse(compile(part(max_size=1151))(TEXT))
+
+    def test_depth_and_position(self):
+        self.assertTrue(compile(part(depth=0))(TEXT))
+        self.assertFalse(compile(part(position=1))(TEXT))
+        self.assertTrue(compile(contains(part('application/*', depth=1, position=2)))(SMIME))
+        self.assertFalse(compile(contains(part('application/*', position=1)))(SMIME))
+
+    def test_filename(self):
+        self.assertTrue(compile(contains(part(filename='smime.p7m')))(SMIME))
+        self.assertTrue(compile(contains(part(filename='winmail.dat')))(WINMAIL))
+        self.assertFalse(compile(contains(part(filename='x')))(WINMAIL))
+
+    def test_multipart(self):
+        self.assertTrue(compile(multipart('mixed'))(SMIME))
+        self.assertTrue(compile(multipart())(SMIME))
+        self.assertFalse(compile(multipart('alternative'))(SMIME))
+        self.assertFalse(compile(multipart())(TEXT))
+        self.assertTrue(compile(multipart('mixed', part('text/plain')))(SMIME))
+        self.assertFalse(compile(multipart('mixed', part('text/plain'), exact=True))(SMIME))
+        self.assertTrue(compile(multipart('mixed', ANY, ANY, exact=True))(SMIME))
+        self.assertFalse(compile(multipart('mixed', ANY, ANY, ANY))(SMIME))
+        self.assertTrue(compile(multipart(params={'boundary': 'b1'}))(SMIME_EXTENDED))
+        self.assertTrue(compile(multipart(min_size=88440))(SMIME))
+
+    def test_combinators(self):
+        text = part('text/plain')
+        html = part('text/html')
+        self.assertTrue(compile(any_of(html, text))(TEXT))
+        self.assertFalse(compile(all_of(html, text))(TEXT))
+        self.assertTrue(compile(all_of(text, part(encoding='7bit')))(TEXT))
+        self.assertTrue(compile(not_(html))(TEXT))
+
+    def test_contains_descends_into_messages(self):
+        self.assertTrue(compile(contains(part('image/png', depth=3)))(FORWARDED))
+        self.assertTrue(compile(oversized(1000000))(FORWARDED))
+        self.assertFalse(compile(oversized(1000000))(SMIME))
+
+    def test_missing(self):
+        self.assertFalse(compile(ANY)(None))
+
+    def test_plain_tuples(self):
+        self.assertTrue(compile(SMIME_P7M)(tuple(SMIME)))
+
+    def test_lists(self):
+        def lists(value):
+            if isinstance(value, tuple):
+                return [lists(item) for item in value]
+            return value
+        self.assertTrue(compile(SMIME_P7M)(lists(SMIME)))
+        self.assertFalse(compile(SMIME_P7M)(lists(TEXT)))
+
+    def test_bad_type_fields(self):
+        bad = ((None, 'PLAIN', None, None, None, '7BIT', 10),
+               ('MESSAGE', None), (None,), 'MIXED')
+        for pattern in (SMIME_P7M, WINMAIL_DAT, NESTED_MESSAGE,
+                        contains(part('text/plain')), contains(part('text/*'))):
+            self.assertFalse(compile(pattern)(bad))
+
+    def test_nested_BodyData(self):
+        class NestedBodyData(BodyData):
+            __slots__ = ()
+            nest = True
+        nested = NestedBodyData.create(tuple.__getitem__(SMIME, slice(None)))
+        self.assertTrue(isinstance(tuple.__getitem__(nested, 0), list))
+        self.assertTrue(compile(SMIME_P7M)(nested))
+
+
+class TestBuiltins(unittest.TestCase):
+
+    def test_SMIME_P7M(self):
+        match = compile(SMIME_P7M)
+        self.assertTrue(match(SMIME))
+        self.assertTrue(match(SMIME_EXTENDED))
+        self.assertFalse(match(TEXT))
+        self.assertFalse(match(WINMAIL))
+
+    def test_WINMAIL_DAT(self):
+        self.assertTrue(compile(WINMAIL_DAT)(WINMAIL))
+        self.assertTrue(compile(WINMAIL_DAT)(body(
+            '("APPLICATION" "MS-TNEF" NIL NIL NIL "BASE64" 100)')))
+        self.assertFalse(compile(WINMAIL_DAT)(SMIME))
+
+    def test_NESTED_MESSAGE(self):
+        self.assertTrue(compile(NESTED_MESSAGE)(FORWARDED))
+        self.assertFalse(compile(NESTED_MESSAGE)(SMIME))
+
+
+class TestClassify(unittest.TestCase):
+
+    def test_classify(self):
+        fetched = [(1, {'BODYSTRUCTURE': SMIME}),
+                   (2, {'BODYSTRUCTURE': FORWARDED}),
+                   (3, {})]
+        patterns = {'smime': SMIME_P7M, 'nested': NESTED_MESSAGE,
+                    'big': oversized(1000000)}
+        self.assertEqual(list(classify(fetched, patterns)),
+                         [(1, ['smime']), (2, ['big', 'nested']), (3, [])])
+
+    def test_key(self):
+        self.assertEqual(list(classify([(1, {'BODY': SMIME})], {'s': SMIME_P7M}, 'BODY')),
+                         [(1, ['s'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+from mock import Mock
+
+from imapclient.cache import MetadataCache, DEFAULT_ITEMS
+from imapclient.fixed_offset import FixedOffset
+from imapclient.response_parser import BodyData
+from imapclient.test.util import unittest
+from imapclient.uidset import UIDSet
+
+
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = MetadataCache()
+
+    def tearDown(self):
+        self.cache.close()
+
+    def test_store_and_get(self):
+        data = {
+            'SEQ': 4,
+            'FLAGS': ('\\Seen',),
+            'INTERNALDATE': datetime(2013, 2, 3, 4, 5, 6, tzinfo=FixedOffset(60)),
+            'BODYSTRUCTURE': BodyData(('text', 'plain', None, None, None, '7bit', 10, 1)),
+            'RFC822.SIZE': 10,
+        }
+        self.cache.store('host', 'INBOX', 7, {12: data}, uidnext=13)
+        got = self.cache.get('host', 'INBOX', 7)
+        expected = dict(data)
+        del expected['SEQ']
+        self.assertEqual(got, {12: expected})
+        self.assertIsInstance(got[12]['BODYSTRUCTURE'], BodyData)
+        self.assertEqual(self.cache.folder_state('host', 'INBOX'), (7, 13))
+
+    def test_keys(self):
+        self.cache.store('host', 'INBOX', 7, {1: {'FLAGS': ()}, 2: {'FLAGS': ()}})
+        self.cache.store('other', 'INBOX', 7, {3: {'FLAGS': ()}})
+        self.assertEqual(sorted(self.cache.get('host', 'INBOX', 7)), [1, 2])
+        self.assertEqual(sorted(self.cache.get('host', 'INBOX', 7, [2, 3])), [2])
+        self.assertEqual(self.cache.get('host', 'Sent', 7), {})
+        self.assertEqual(self.cache.folder_state('host', 'Sent'), None)
+
+    def test_uidvalidity_change_drops_folder(self):
+        self.cache.store('host', 'INBOX', 7, {1: {'FLAGS': ()}}, uidnext=2)
+        self.assertEqual(self.cache.check_uidvalidity('host', 'INBOX', 7), 2)
+        self.assertEqual(self.cache.check_uidvalidity('host', 'INBOX', 8), None)
+        self.assertEqual(self.cache.folder_state('host', 'INBOX'), None)
+        self.assertEqual(self.cache.get('host', 'INBOX', 7), {})
+
+    def test_discard(self):
+        self.cache.store('host', 'INBOX', 7, {1: {}, 2: {}, 3: {}})
+        self.cache.discard('host', 'INBOX', 7, [1, 3])
+        self.assertEqual(list(self.cache.get('host', 'INBOX', 7)), [2])
+
+    def test_persists(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'cache.sqlite')
+            cache = MetadataCache(path)
+            cache.store('host', 'INBOX', 7, {1: {'FLAGS': ('\\Seen',)}}, uidnext=2)
+            cache.close()
+            cache = MetadataCache(path)
+            self.assertEqual(cache.get('host', 'INBOX', 7), {1: {'FLAGS': ('\\Seen',)}})
+            cache.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestSyncFolder(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = MetadataCache()
+        self.client = Mock()
+        self.client.host = 'imap.test'
+        self.client.select_folder.return_value = {'UIDVALIDITY': 7, 'UIDNEXT': 4}
+        self.client.fetch.return_value = {1: {'SEQ': 1, 'FLAGS': ()},
+                                          3: {'SEQ': 2, 'FLAGS': ('\\Seen',)}}
+        self.client.search_uidset.return_value = UIDSet([1, 3])
+
+    def sync(self):
+        return self.cache.sync_folder(self.client, 'INBOX')
+
+    def test_first_sync(self):
+        self.assertEqual(self.sync(), {1: {'FLAGS': ()}, 3: {'FLAGS': ('\\Seen',)}})
+        self.client.select_folder.assert_called_once_with('INBOX', readonly=True)
+        self.client.fetch.assert_called_once_with('1:*', DEFAULT_ITEMS)
+        self.assertEqual(self.cache.folder_state('imap.test', 'INBOX'), (7, 4))
+
+    def test_nothing_new(self):
+        self.sync()
+        self.client.fetch.reset_mock()
+        self.assertEqual(sorted(self.sync()), [1, 3])
+        self.assertFalse(self.client.fetch.called)
+
+    def test_fetches_new_only(self):
+        self.sync()
+        self.client.select_folder.return_value = {'UIDVALIDITY': 7, 'UIDNEXT': 6}
+        self.client.fetch.return_value = {5: {'SEQ': 3, 'FLAGS': ()}}
+        self.client.search_uidset.return_value = UIDSet([1, 3, 5])
+        self.assertEqual(sorted(self.sync()), [1, 3, 5])
+        self.client.fetch.assert_called_with('4:*', DEFAULT_ITEMS)
+        self.assertEqual(self.cache.folder_state('imap.test', 'INBOX'), (7, 6))
+
+    def test_ignores_last_message_below_uidnext(self):
+        self.sync()
+        self.client.select_folder.return_value = {'UIDVALIDITY': 7, 'UIDNEXT': 5}
+        self.client.fetch.return_value = {3: {'SEQ': 2, 'FLAGS': ('\\Answered',)}}
+        self.assertEqual(self.sync()[3], {'FLAGS': ('\\Seen',)})
+
+    def test_prunes_expunged(self):
+        self.sync()
+        self.client.search_uidset.return_value = UIDSet([3])
+        self.assertEqual(list(self.sync()), [3])
+        self.assertEqual(list(self.cache.get('imap.test', 'INBOX', 7)), [3])
+
+    def test_uidvalidity_change(self):
+        self.sync()
+        self.client.select_folder.return_value = {'UIDVALIDITY': 8, 'UIDNEXT': 2}
+        self.client.fetch.return_value = {1: {'SEQ': 1, 'FLAGS': ('\\Draft',)}}
+        self.client.search_uidset.return_value = UIDSet([1])
+        self.assertEqual(self.sync(), {1: {'FLAGS': ('\\Draft',)}})
+        self.client.fetch.assert_called_with('1:*', DEFAULT_ITEMS)
+        self.assertEqual(self.cache.get('imap.test', 'INBOX', 7), {})
+
+    def test_already_selected(self):
+        self.sync()
+        self.client.select_folder.reset_mock()
+        self.client.fetch.return_value = {5: {'SEQ': 3, 'FLAGS': ()}}
+        self.client.search_uidset.return_value = UIDSet([1, 3, 5])
+        # A stale UIDNEXT doesn't hide the new message.
+        info = {'UIDVALIDITY': 7, 'UIDNEXT': 4}
+        self.assertEqual(sorted(self.cache.sync_folder(self.client, 'INBOX',
+                                                       select_info=info)), [1, 3, 5])
+        self.assertFalse(self.client.select_folder.called)
+        self.client.fetch.assert_called_with('4:*', DEFAULT_ITEMS)
+        self.assertEqual(self.cache.folder_state('imap.test', 'INBOX'), (7, 6))
+
+    def test_no_uidnext(self):
+        self.client.select_folder.return_value = {'UIDVALIDITY': 7}
+        self.sync()
+        self.assertEqual(self.cache.folder_state('imap.test', 'INBOX'), (7, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
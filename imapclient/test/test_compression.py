@@ -0,0 +1,143 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+import zlib
+from io import BytesIO
+
+from imapclient import compression
+from imapclient.compression import DeflateReader
+from imapclient.test.testable_imapclient import TestableIMAPClient as IMAPClient
+from imapclient.test.util import unittest
+
+
+def deflate(data):
+    compressor = zlib.compressobj(-1, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+def inflate(data):
+    return zlib.decompressobj(-zlib.MAX_WBITS).decompress(data)
+
+
+class TestDeflateReader(unittest.TestCase):
+
+    def reader(self, data, chunk_size=7):
+        return DeflateReader(BytesIO(deflate(data)).read, chunk_size=chunk_size)
+
+    def test_readline(self):
+        reader = self.reader(b'* OK hello\r\n* 3 EXISTS\r\npartial')
+        self.assertEqual(reader.readline(), b'* OK hello\r\n')
+        self.assertEqual(reader.readline(), b'* 3 EXISTS\r\n')
+        self.assertEqual(reader.readline(), b'')
+        self.assertEqual(reader.pending, len(b'partial'))
+
+    def test_readline_limit(self):
+        reader = self.reader(b'0123456789\r\n')
+        self.assertEqual(reader.readline(4), b'0123')
+        self.assertEqual(reader.readline(100), b'456789\r\n')
+
+    def test_read(self):
+        literal = b'x' * 100000
+        data = b'* 1 FETCH (RFC822 {100000}\r\n' + literal + b')\r\n'
+        reader = self.reader(data, 1000)
+        self.assertEqual(reader.readline(), b'* 1 FETCH (RFC822 {100000}\r\n')
+        self.assertEqual(reader.read(100000), literal)
+        self.assertEqual(reader.readline(), b')\r\n')
+        self.assertEqual(reader.read(), b'')
+        self.assertEqual(reader.bytes_out, len(data))
+
+    def test_read_to_end(self):
+        self.assertEqual(self.reader(b'abc\r\ndef').read(), b'abc\r\ndef')
+
+    def test_nothing_lost_on_error(self):
+        compressed = deflate(b'* OK partial line\r\n')
+        pieces = [compressed[:5], IOError('would block'), compressed[5:]]
+
+        def read(size):
+            piece = pieces.pop(0)
+            if isinstance(piece, Exception):
+                raise piece
+            return piece
+        reader = DeflateReader(read)
+
+        self.assertRaises(IOError, reader.readline)
+        self.assertEqual(reader.readline(), b'* OK partial line\r\n')
+
+
+class FakeIMAP(object):
+
+    def __init__(self, incoming):
+        self.file = BytesIO(incoming)
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+
+class TestEnable(unittest.TestCase):
+
+    def test_enable(self):
+        imap = FakeIMAP(deflate(b'* OK compressed\r\n'))
+        original = imap.file
+
+        reader = compression.enable(imap)
+        imap.send(b'A1 NOOP\r\n')
+        imap.send(b'A2 NOOP\r\n')
+
+        self.assertIs(imap.file, reader)
+        self.assertEqual(imap.file.readline(), b'* OK compressed\r\n')
+        self.assertEqual(inflate(b''.join(imap.sent)), b'A1 NOOP\r\nA2 NOOP\r\n')
+        reader.close()
+        self.assertTrue(original.closed)
+
+
+class TestCompress(unittest.TestCase):
+
+    def setUp(self):
+        self.client = IMAPClient()
+        self.imap = self.client._imap
+        self.imap._simple_command.return_value = ('OK', [b'DEFLATE active'])
+        self.imap.file = BytesIO(deflate(b'* OK hi\r\n'))
+        self.sent = []
+        self.imap.send = self.sent.append
+
+    def test_compress(self):
+        self.assertEqual(self.client.compress(), 'DEFLATE active')
+        self.imap._simple_command.assert_called_once_with('COMPRESS', 'DEFLATE')
+        self.assertEqual(self.imap.file.readline(), b'* OK hi\r\n')
+        self.assertEqual(self.client.uncompressed_bytes, 9)
+
+    def test_refused(self):
+        self.imap._simple_command.return_value = ('NO', [b'no thanks'])
+        self.assertRaises(IMAPClient.Error, self.client.compress)
+        self.assertIsNone(self.client._deflate)
+
+    def test_after_login(self):
+        self.client.use_compression = True
+        self.client._cached_capabilities = ('IMAP4REV1', 'COMPRESS=DEFLATE')
+        self.imap.login.return_value = ('OK', [b'Logged in'])
+
+        self.assertEqual(self.client.login('user', 'pass'), 'Logged in')
+        self.assertIsNotNone(self.client._deflate)
+
+    def test_not_supported(self):
+        self.client.use_compression = True
+        self.client._cached_capabilities = ('IMAP4REV1',)
+        self.imap.login.return_value = ('OK', [b'Logged in'])
+
+        self.client.login('user', 'pass')
+        self.assertFalse(self.imap._simple_command.called)
+
+    def test_off_by_default(self):
+        self.client._cached_capabilities = ('IMAP4REV1', 'COMPRESS=DEFLATE')
+        self.imap.login.return_value = ('OK', [b'Logged in'])
+
+        self.client.login('user', 'pass')
+        self.assertFalse(self.imap._simple_command.called)
+
+
+if __name__ == '__main__':
+    unittest.main()
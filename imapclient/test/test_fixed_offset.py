@@ -4,6 +4,7 @@
 
 from __future__ import unicode_literals
 
+import pickle
 from datetime import timedelta
 from mock import Mock, patch, DEFAULT
 from imapclient.test.util import unittest
@@ -36,6 +37,10 @@ class TestFixedOffset(unittest.TestCase):
         self._check(FixedOffset(-11*60 - 30),
                     timedelta(minutes=(-11*60) - 30), '-1130')
 
+    def test_pickle(self):
+        self._check(pickle.loads(pickle.dumps(FixedOffset(-90), 2)),
+                    timedelta(minutes=-90), '-0130')
+
     @patch.multiple('imapclient.fixed_offset.time',
                     daylight=True, timezone=15*60*60, localtime=DEFAULT)
     def test_for_system_DST_not_active(self, localtime):
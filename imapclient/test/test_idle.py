@@ -0,0 +1,138 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+import itertools
+import socket
+
+from mock import Mock
+
+from imapclient import six
+from imapclient.idle import IdleWatcher, selectors
+from imapclient.test.testable_imapclient import TestableIMAPClient as IMAPClient
+from imapclient.test.util import unittest
+
+
+class FakeConnection(object):
+    # An IMAPClient whose imaplib instance talks over a socket pair,
+    # with the test playing the server.
+
+    def __init__(self):
+        self.client = IMAPClient()
+        self.client.select_folder = Mock()
+        self.sock, self.server = socket.socketpair()
+        self.server.settimeout(5)
+        imap = self.client._imap
+        imap.sock = self.sock
+        imap.sslobj = None
+        imap.file = self.sock.makefile('rb')
+        imap.send = self.sock.sendall
+        imap.tagged_commands = {}
+        tags = itertools.count(1)
+
+        def new_tag():
+            tag = ('A%d' % six.next(tags)).encode('ascii')
+            imap.tagged_commands[tag] = None
+            return tag
+        imap._new_tag = new_tag
+
+    def expect(self, data):
+        received = b''
+        while len(received) < len(data):
+            received += self.server.recv(1024)
+        assert received == data, received
+
+    def reply(self, data):
+        self.server.sendall(data)
+
+    def close(self):
+        self.sock.close()
+        self.server.close()
+
+
+@unittest.skipIf(selectors is None, 'needs the selectors module')
+class TestIdleWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.watcher = IdleWatcher()
+        self.calls = []
+        self.connections = []
+
+    def tearDown(self):
+        for conn in self.connections:
+            conn.close()
+
+    def callback(self, client, folder, responses):
+        self.calls.append((client, folder, responses))
+
+    def connect(self, folder):
+        conn = FakeConnection()
+        self.connections.append(conn)
+        self.watcher.add(conn.client, folder, self.callback)
+        conn.expect(b'A1 IDLE\r\n')
+        conn.reply(b'+ idling\r\n')
+        return conn
+
+    def test_dispatch(self):
+        inbox = self.connect('INBOX')
+        sent = self.connect('Sent')
+        inbox.client.select_folder.assert_called_once_with('INBOX', True)
+
+        sent.reply(b'* 4 EXISTS\r\n* 1 RECENT\r\n')
+        while not self.calls:
+            self.watcher.poll(5)
+
+        self.assertEqual(self.calls, [(sent.client, 'Sent', [(4, 'EXISTS'), (1, 'RECENT')])])
+
+    def test_partial_lines(self):
+        inbox = self.connect('INBOX')
+        self.watcher.poll(0.1)
+        inbox.reply(b'* 2 EXP')
+        self.watcher.poll(5)
+        self.assertEqual(self.calls, [])
+        inbox.reply(b'UNGE\r\n')
+        self.watcher.poll(5)
+        self.assertEqual(self.calls, [(inbox.client, 'INBOX', [(2, 'EXPUNGE')])])
+
+    def test_renew(self):
+        self.watcher.renew_interval = 0
+        inbox = self.connect('INBOX')
+        self.watcher.poll(5)        # sees the continuation
+        self.watcher.poll(0)        # renewal due
+        inbox.expect(b'DONE\r\n')
+        inbox.reply(b'A1 OK Idle completed\r\n')
+        self.watcher.poll(5)
+        inbox.expect(b'A2 IDLE\r\n')
+        self.assertEqual(inbox.client._imap.tagged_commands, {b'A2': None})
+
+    def test_remove(self):
+        inbox = self.connect('INBOX')
+        self.watcher.poll(5)
+        inbox.reply(b'* 3 EXISTS\r\nA1 OK Idle completed\r\n')
+
+        self.assertEqual(self.watcher.remove(inbox.client), [(3, 'EXISTS')])
+        inbox.expect(b'DONE\r\n')
+        self.assertEqual(len(self.watcher), 0)
+        self.assertEqual(inbox.sock.gettimeout(), None)
+
+    def test_connection_closed(self):
+        inbox = self.connect('INBOX')
+        inbox.reply(b'* BYE shutting down\r\n')
+        inbox.server.close()
+        self.watcher.run()
+        self.assertEqual(self.watcher.closed, [(inbox.client, 'INBOX')])
+        self.assertEqual(self.calls[0][2][0][0], 'BYE')
+
+    def test_idle_refused(self):
+        inbox = FakeConnection()
+        self.connections.append(inbox)
+        self.watcher.add(inbox.client, 'INBOX', self.callback)
+        inbox.reply(b'A1 BAD unknown command\r\n')
+        self.watcher.poll(5)
+        self.assertEqual(self.watcher.closed, [(inbox.client, 'INBOX')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,11 +8,13 @@ import itertools
 import socket
 import sys
 from datetime import datetime
+from io import BytesIO
 from mock import patch, sentinel, Mock
 
 from imapclient import six
 from imapclient.fixed_offset import FixedOffset
-from imapclient.imapclient import datetime_to_imap
+from imapclient.imapclient import datetime_to_imap, parse_appenduid, parse_copyuid, UIDSet
+from imapclient.spool import spool
 from imapclient.test.testable_imapclient import TestableIMAPClient as IMAPClient
 from imapclient.test.util import unittest
 
@@ -149,6 +151,18 @@ class TestListFolders(IMAPClientTest):
         folders = self.client._proc_folder_list(['', None, r'(\HasNoChildren) "/" "last"'])
         self.assertEqual(folders, [((r'\HasNoChildren',), '/', 'last')])
 
+    def test_bytes(self):
+        folders = self.client._proc_folder_list([b'', b'(\\HasNoChildren) "/" "Hello&AP8-world"',
+                                                 (b'(\\NoInferiors) "/" {5}', b'bang\xff')])
+        self.assertEqual(folders, [(('\\HasNoChildren',), '/', 'Hello\xffworld'),
+                                   (('\\NoInferiors',), '/', 'bang\xff')])
+
+    def test_bytes_folder_encode_off(self):
+        self.client.folder_encode = False
+        folders = self.client._proc_folder_list([(b'(\\NoInferiors) "/" {5}', b'bang!')])
+        self.assertEqual(folders, [(('\\NoInferiors',), '/', 'bang!')])
+        self.assertTrue(isinstance(folders[0][2], six.text_type))
+
 
 class TestSelectFolder(IMAPClientTest):
 
@@ -184,6 +198,41 @@ class TestSelectFolder(IMAPClientTest):
             'OTHER': ['blah']
         })
 
+    def test_bytes(self):
+        self.client._command_and_check = Mock()
+        self.client._imap.untagged_responses = {
+            'EXISTS': [b'1'],
+            'FLAGS': [b'(ABC \\Seen)'],
+            'OTHER': [b'blah'],
+        }
+
+        self.assertEqual(self.client.select_folder('folder_name'), {
+            'EXISTS': 1,
+            'FLAGS': ('ABC', '\\Seen'),
+            'OTHER': ['blah'],
+        })
+
+
+class TestSearch(IMAPClientTest):
+
+    def test_search(self):
+        self.client._imap.uid.return_value = ('OK', [b'1 2 3 7'])
+        self.assertEqual(self.client.search('UNSEEN'), [1, 2, 3, 7])
+        self.client._imap.uid.assert_called_once_with('SEARCH', '(UNSEEN)')
+
+    def test_search_uidset(self):
+        self.client._imap.uid.return_value = ('OK', [b'1 2 3 7'])
+        self.assertEqual(self.client.search_uidset().ranges(), [(1, 3), (7, 7)])
+
+    def test_search_uidset_nothing(self):
+        self.client._imap.uid.return_value = ('OK', [None])
+        self.assertEqual(self.client.search_uidset(), UIDSet())
+
+    def test_uidset_as_messages(self):
+        self.client._imap.uid.return_value = ('OK', [b'Copied'])
+        self.client.copy(UIDSet([1, 2, 3, 9]), 'Trash')
+        self.client._imap.uid.assert_called_once_with('copy', '1:3,9', '"Trash"')
+
 
 class TestAppend(IMAPClientTest):
 
@@ -210,6 +259,165 @@ class TestAppend(IMAPClientTest):
             '"foobar"', '(FLAG WAVE)', '"somedate"', msg)
 
 
+class TestMultiAppend(IMAPClientTest):
+
+    def setUp(self):
+        super(TestMultiAppend, self).setUp()
+        imap = self.client._imap
+        imap.tagged_commands = {}
+        tags = itertools.count(1)
+
+        def new_tag():
+            tag = ('A%d' % six.next(tags)).encode('ascii')
+            imap.tagged_commands[tag] = None
+            return tag
+        imap._new_tag = new_tag
+        self.responses = []
+
+        def get_response():
+            response = self.responses.pop(0)
+            if response is None:
+                return None     # continuation request
+            tag, typ, text = response
+            imap.tagged_commands[tag] = (typ, [text])
+            return tag
+        imap._get_response = get_response
+
+    def sent(self):
+        return b''.join(c[0][0] for c in self.client._imap.send.call_args_list)
+
+    def set_capabilities(self, *capabilities):
+        self.client._cached_capabilities = ('IMAP4REV1',) + capabilities
+
+    def test_multiappend_literal_plus(self):
+        self.set_capabilities('MULTIAPPEND', 'LITERAL+')
+        self.responses = [(b'A1', 'OK', b'[APPENDUID 7 3:4] done')]
+
+        result = self.client.multi_append('foo', ['one\n', ('two', ['\\Seen'])])
+
+        self.assertEqual(result, ['[APPENDUID 7 3:4] done'])
+        self.assertEqual(self.sent(),
+                         b'A1 APPEND "foo" () {5+}\r\none\r\n'
+                         b' (\\Seen) {3+}\r\ntwo\r\n')
+
+    def test_synchronising_literals(self):
+        self.set_capabilities('MULTIAPPEND')
+        self.responses = [None, None, (b'A1', 'OK', b'done')]
+
+        self.client.multi_append('foo', [b'one', b'two'])
+
+        self.assertEqual(self.sent(),
+                         b'A1 APPEND "foo" () {3}\r\none'
+                         b' () {3}\r\ntwo\r\n')
+        self.assertEqual(self.responses, [])
+
+    def test_literal_minus(self):
+        self.set_capabilities('LITERAL-')
+        self.responses = [None, (b'A1', 'OK', b'one'), (b'A2', 'OK', b'two')]
+
+        result = self.client.multi_append('foo', [b'x' * 4096, b'y' * 4097])
+
+        self.assertEqual(result, ['one', 'two'])
+        sent = self.sent()
+        self.assertTrue(sent.startswith(b'A1 APPEND "foo" () {4096+}\r\n'))
+        self.assertIn(b'A2 APPEND "foo" () {4097}\r\n', sent)
+
+    def test_pipelined_appends(self):
+        self.set_capabilities('LITERAL+')
+        self.responses = [(b'A1', 'OK', b'one'), (b'A2', 'OK', b'two')]
+
+        msg_time = datetime(2009, 4, 5, 11, 0, 5, 0, FixedOffset(2*60))
+        result = self.client.multi_append('foo', [(b'a', (), msg_time), b'b'])
+
+        self.assertEqual(result, ['one', 'two'])
+        self.assertEqual(self.sent(),
+                         b'A1 APPEND "foo" () "05-Apr-2009 11:00:05 +0200" {1+}\r\na\r\n'
+                         b'A2 APPEND "foo" () {1+}\r\nb\r\n')
+
+    def test_rejected_literal(self):
+        self.set_capabilities()
+        self.responses = [(b'A1', 'NO', b'too big'), None, (b'A2', 'OK', b'two')]
+
+        self.assertRaises(IMAPClient.Error, self.client.multi_append, 'foo', [b'a', b'b'])
+        self.assertEqual(self.sent(),
+                         b'A1 APPEND "foo" () {1}\r\n'
+                         b'A2 APPEND "foo" () {1}\r\nb\r\n')
+        self.assertEqual(self.client._imap.tagged_commands, {})
+
+    def test_spooled_literal(self):
+        self.set_capabilities('LITERAL+')
+        self.responses = [(b'A1', 'OK', b'done')]
+        literal = spool(BytesIO(b'spooled\r\n').read, 9)
+
+        self.client.multi_append('foo', [literal])
+
+        self.assertEqual(self.sent(), b'A1 APPEND "foo" () {9+}\r\nspooled\r\n\r\n')
+
+    def test_nothing_to_append(self):
+        self.assertEqual(self.client.multi_append('foo', []), [])
+        self.assertFalse(self.client._imap.send.called)
+
+
+class TestMove(IMAPClientTest):
+
+    def setUp(self):
+        super(TestMove, self).setUp()
+        self.client._imap.untagged_responses = {}
+        self.client._imap._simple_command.return_value = ('OK', [b'done'])
+
+    def test_move(self):
+        self.client._cached_capabilities = ('IMAP4REV1', 'MOVE')
+        self.client._imap.untagged_responses['OK'] = [b'[COPYUID 432 4,6:7 10:12] Moved']
+
+        self.assertEqual(self.client.move([4, 6, 7], 'Trash'), {4: 10, 6: 11, 7: 12})
+        self.client._imap._simple_command.assert_called_once_with(
+            'UID', 'MOVE', '4,6:7', '"Trash"')
+
+    def test_copy_store_expunge(self):
+        self.client._cached_capabilities = ('IMAP4REV1', 'UIDPLUS')
+        self.client._imap._simple_command.return_value = (
+            'OK', [b'[COPYUID 432 5 20] Copied'])
+
+        self.assertEqual(self.client.move([5], 'Trash'), {5: 20})
+        self.assertEqual(self.client._imap._simple_command.call_args_list, [
+            (('UID', 'COPY', '5', '"Trash"'),),
+            (('UID', 'STORE', '5', '+FLAGS.SILENT', '(\\Deleted)'),),
+            (('UID', 'EXPUNGE', '5'),)])
+
+    def test_no_uidplus(self):
+        self.client._cached_capabilities = ('IMAP4REV1',)
+
+        self.assertEqual(self.client.move([5], 'Trash'), {})
+        self.assertEqual(self.client._imap._simple_command.call_count, 2)
+
+    def test_failure(self):
+        self.client._cached_capabilities = ('IMAP4REV1', 'MOVE')
+        self.client._imap._simple_command.return_value = ('NO', [b'no such folder'])
+        self.assertRaises(IMAPClient.Error, self.client.move, [5], 'Trash')
+
+    def test_nothing_to_move(self):
+        self.assertEqual(self.client.move([], 'Trash'), {})
+        self.assertFalse(self.client._imap._simple_command.called)
+
+
+class TestResponseCodes(unittest.TestCase):
+
+    def test_copyuid(self):
+        self.assertEqual(parse_copyuid(b'[COPYUID 38505 304,319:320 3956:3958] Done'),
+                         (38505, {304: 3956, 319: 3957, 320: 3958}))
+
+    def test_copyuid_reversed_range(self):
+        self.assertEqual(parse_copyuid('[COPYUID 1 3:2 8:9] Done'), (1, {2: 8, 3: 9}))
+
+    def test_appenduid(self):
+        self.assertEqual(parse_appenduid(b'[APPENDUID 38505 3955:3957] Done'),
+                         (38505, [3955, 3956, 3957]))
+
+    def test_missing(self):
+        self.assertIsNone(parse_copyuid('Done'))
+        self.assertIsNone(parse_appenduid(None))
+
+
 class TestDateTimeToImap(unittest.TestCase):
 
     def test_with_timezone(self):
@@ -348,6 +556,10 @@ class TestIdleAndNoop(IMAPClientTest):
             count = six.next(counter)
             if count == 0:
                 return '* 99 EXISTS'
+            if count == 1:
+                return b'* 3 FETCH (FLAGS (\\Seen))'
+            if count == 2:
+                return b'* OK Still here'
             client._imap.tagged_commands[sentinel.tag] = ('OK', ['Idle done'])
         client._imap._get_response = fake_get_response
             
@@ -355,7 +567,9 @@ class TestIdleAndNoop(IMAPClientTest):
                                                                 'IDLE')
         self.assertEqual(client._imap.tagged_commands, {})
         self.assertEqual(text, 'Idle done')
-        self.assertListEqual([(99, 'EXISTS')], responses)
+        self.assertListEqual([(99, 'EXISTS'),
+                              (3, 'FETCH', ('FLAGS', ('\\Seen',))),
+                              ('OK', 'Still here')], responses)
 
 
                          
@@ -390,7 +604,10 @@ class TestTimeNormalisation(IMAPClientTest):
             self.client.fetch(22, ['SOMETHING'])
             parse_fetch_response.assert_called_with(sentinel.fetch_data,
                                                     expected,
-                                                    sentinel.use_uid)
+                                                    sentinel.use_uid,
+                                                    buffer_literals=False,
+                                                    epoch_times=False,
+                                                    decode_literals=True)
 
         self.client.normalise_times = True
         check(True)
@@ -399,6 +616,81 @@ class TestTimeNormalisation(IMAPClientTest):
         check(False)
 
 
+class TestIterFetch(IMAPClientTest):
+
+    def setUp(self):
+        super(TestIterFetch, self).setUp()
+        self.client._imap._command.return_value = sentinel.tag
+        self.client._imap.tagged_commands = {sentinel.tag: None}
+        self.client._imap.untagged_responses = {}
+
+    def script_responses(self, *fetch_responses):
+        imap = self.client._imap
+        responses = list(fetch_responses)
+        def fake_get_response():
+            if responses:
+                imap.untagged_responses.setdefault('FETCH', []).extend(responses.pop(0))
+            else:
+                imap.tagged_commands[sentinel.tag] = ('OK', [b'Fetch completed'])
+        imap._get_response = fake_get_response
+
+    def test_yields_each_response(self):
+        self.script_responses([b'2 (UID 22 FLAGS (\\Seen))'],
+                              [(b'3 (UID 33 RFC822 {4}', b'body'), b')'])
+
+        out = self.client.iter_fetch([22, 33], ['FLAGS', 'RFC822'])
+        self.assertEqual(six.next(out), (22, {'SEQ': 2, 'FLAGS': ('\\Seen',)}))
+        # The second response hasn't been read yet.
+        self.assertEqual(self.client._imap.untagged_responses, {})
+        self.assertEqual(list(out), [(33, {'SEQ': 3, 'RFC822': 'body'})])
+
+        self.client._imap._command.assert_called_once_with(
+            'UID', 'FETCH', '22,33', '(FLAGS RFC822)', None)
+        self.assertEqual(self.client._imap.tagged_commands, {})
+
+    def test_buffer_literals(self):
+        self.client.buffer_literals = True
+        self.script_responses([(b'3 (UID 33 RFC822 {4}', b'bod\xff'), b')'])
+
+        [(msgid, data)] = list(self.client.iter_fetch([33], ['RFC822']))
+        self.assertEqual(msgid, 33)
+        self.assertTrue(isinstance(data['RFC822'], memoryview))
+        self.assertEqual(data['RFC822'].tobytes(), b'bod\xff')
+
+    @patch('imapclient.internaldate.FixedOffset.for_system')
+    def test_one_date_converter(self, for_system):
+        for_system.return_value = FixedOffset(0)
+        self.script_responses([b'2 (UID 22 INTERNALDATE "12-Feb-2007 17:08:08 +0200")'],
+                              [b'3 (UID 33 INTERNALDATE "12-Feb-2007 17:08:08 +0100")'])
+
+        out = list(self.client.iter_fetch([22, 33], ['INTERNALDATE']))
+        self.assertEqual([data['INTERNALDATE'] for _, data in out],
+                         [datetime(2007, 2, 12, 15, 8, 8),
+                          datetime(2007, 2, 12, 16, 8, 8)])
+        self.assertEqual(for_system.call_count, 1)
+
+    def test_without_uid(self):
+        self.client.use_uid = False
+        self.script_responses([b'2 (FLAGS ())'])
+
+        self.assertEqual(list(self.client.iter_fetch(2, ['FLAGS'])),
+                         [(2, {'SEQ': 2, 'FLAGS': ()})])
+        self.client._imap._command.assert_called_once_with(
+            'FETCH', '2', '(FLAGS)', None)
+
+    def test_no_messages(self):
+        self.assertEqual(list(self.client.iter_fetch([], ['FLAGS'])), [])
+        self.assertFalse(self.client._imap._command.called)
+
+    def test_error(self):
+        imap = self.client._imap
+        def fake_get_response():
+            imap.tagged_commands[sentinel.tag] = ('NO', [b'Bad UIDs'])
+        imap._get_response = fake_get_response
+
+        self.assertRaises(IMAPClient.Error, list, self.client.iter_fetch([1], ['FLAGS']))
+
+
 class TestGmailLabels(IMAPClientTest):
 
     def setUp(self):
@@ -429,6 +721,17 @@ class TestGmailLabels(IMAPClientTest):
         self.client._store.assert_called_with('X-GM-LABELS', sentinel.messages, sentinel.labels, 'X-GM-LABELS')
 
 
+class TestStore(IMAPClientTest):
+
+    def test_literal_values_decoded(self):
+        self.client._imap.uid.return_value = ('OK', [
+            (b'1 (UID 11 X-GM-LABELS ("\\\\Inbox" {5}', b'a"b c'), b'))'])
+
+        out = self.client.add_gmail_labels([11], ['a"b c'])
+        self.assertEqual(out, {11: ('\\Inbox', 'a"b c')})
+        self.assertTrue(isinstance(out[11][1], six.text_type))
+
+
 class TestNamespace(IMAPClientTest):
 
     def set_return(self, value):
@@ -452,6 +755,23 @@ class TestNamespace(IMAPClientTest):
             (("#shared/", "/"), ("#public/", "/"), ("#ftp/", "/"), ("#news.", ".")),
             ))
 
+class TestEnable(IMAPClientTest):
+
+    def test_enable(self):
+        self.client._imap._simple_command.return_value = ('OK', [b'Enabled'])
+        self.client._imap._untagged_response.return_value = ('OK', [b'QRESYNC condstore'])
+
+        self.assertEqual(self.client.enable('QRESYNC', 'CONDSTORE'), ['QRESYNC', 'CONDSTORE'])
+        self.client._imap._simple_command.assert_called_once_with('ENABLE', 'QRESYNC', 'CONDSTORE')
+        self.client._imap._untagged_response.assert_called_once_with('OK', [b'Enabled'], 'ENABLED')
+
+    def test_nothing_enabled(self):
+        self.client._imap._simple_command.return_value = ('OK', [b'Enabled'])
+        self.client._imap._untagged_response.return_value = ('OK', [None])
+
+        self.assertEqual(self.client.enable('FOO'), [])
+
+
 class TestCapabilities(IMAPClientTest):
 
     def test_preauth(self):
@@ -0,0 +1,54 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+from datetime import datetime
+from mock import patch
+
+from imapclient.fixed_offset import FixedOffset
+from imapclient.internaldate import InternalDateConverter, offset_for
+from imapclient.test.util import unittest
+
+
+class TestInternalDateConverter(unittest.TestCase):
+
+    def test_aware(self):
+        convert = InternalDateConverter(normalise_times=False)
+        dt = convert(' 9-Feb-2007 17:08:08 -0430')
+        self.assertEqual(dt, datetime(2007, 2, 9, 17, 8, 8, 0, FixedOffset(-4*60 - 30)))
+        self.assertEqual(dt.tzname(), '-0430')
+
+    def test_offsets_shared(self):
+        convert = InternalDateConverter(normalise_times=False)
+        self.assertTrue(convert('12-Feb-2007 17:08:08 +0200').tzinfo is
+                        convert('13-Mar-2008 01:00:00 +0200').tzinfo)
+        self.assertTrue(offset_for(120) is offset_for(120))
+
+    @patch('imapclient.internaldate.FixedOffset.for_system')
+    def test_normalised(self, for_system):
+        for_system.return_value = FixedOffset(60)
+        convert = InternalDateConverter()
+        self.assertEqual(convert(' 9-Feb-2007 17:08:08 -0430'),
+                         datetime(2007, 2, 9, 22, 38, 8))
+        self.assertEqual(convert('31-Dec-2007 23:30:00 +0000'),
+                         datetime(2008, 1, 1, 0, 30, 0))
+        self.assertEqual(for_system.call_count, 1)
+
+    def test_epoch(self):
+        convert = InternalDateConverter(epoch=True)
+        self.assertEqual(convert(' 1-Jan-1970 00:00:00 +0000'), 0)
+        self.assertEqual(convert(' 1-Jan-1970 01:00:00 +0100'), 0)
+        self.assertEqual(convert(' 9-Feb-2007 17:08:08 -0430'), 1171057088)
+
+    def test_invalid(self):
+        convert = InternalDateConverter()
+        self.assertRaises(ValueError, convert, 'foo')
+        self.assertRaises(ValueError, convert, '9-Feb-2007 17:08:08 +0000')
+        self.assertRaises(ValueError, convert, ' 9-Foo-2007 17:08:08 +0000')
+        self.assertRaises(ValueError, convert, ' 9-Feb-2007 17:08:08 *0000')
+
+
+if __name__ == '__main__':
+    unittest.main()
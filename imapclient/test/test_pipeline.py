@@ -0,0 +1,142 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+import itertools
+
+from imapclient import six
+from imapclient.pipeline import Pipeline
+from imapclient.test.testable_imapclient import TestableIMAPClient as IMAPClient
+from imapclient.test.util import unittest
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.client = IMAPClient()
+        imap = self.client._imap
+        imap.tagged_commands = {}
+        imap.untagged_responses = {}
+        tags = itertools.count(1)
+
+        def new_tag():
+            tag = ('A%d' % six.next(tags)).encode('ascii')
+            imap.tagged_commands[tag] = None
+            return tag
+        imap._new_tag = new_tag
+        self.responses = []
+
+        def get_response():
+            kind, key, value = self.responses.pop(0)
+            if kind == 'tagged':
+                imap.tagged_commands[key] = value
+            else:
+                imap.untagged_responses.setdefault(key, []).append(value)
+        imap._get_response = get_response
+
+    def script(self, *responses):
+        self.responses.extend(responses)
+
+    def test_commands_sent_together(self):
+        self.script(('untagged', 'FETCH', b'1 (UID 11 FLAGS (\\Seen))'),
+                    ('tagged', b'A1', ('OK', [b'Fetch done'])),
+                    ('untagged', 'STATUS', b'"INBOX" (MESSAGES 3 UNSEEN 1)'),
+                    ('tagged', b'A2', ('OK', [b'Status done'])),
+                    ('tagged', b'A3', ('OK', [b'Copy done'])))
+
+        with self.client.pipeline() as p:
+            fetched = p.fetch([11], ['FLAGS'])
+            status = p.folder_status('INBOX', ['MESSAGES', 'UNSEEN'])
+            copied = p.copy([11, 12], 'Archive')
+            self.assertFalse(fetched.done)
+            self.assertRaises(ValueError, fetched.result)
+
+        self.client._imap.send.assert_called_once_with(
+            b'A1 UID FETCH 11 (FLAGS)\r\n'
+            b'A2 STATUS "INBOX" (MESSAGES UNSEEN)\r\n'
+            b'A3 UID COPY 11:12 "Archive"\r\n')
+        self.assertEqual(fetched.result(), {11: {'SEQ': 1, 'FLAGS': ('\\Seen',)}})
+        self.assertEqual(status.result(), {'MESSAGES': 3, 'UNSEEN': 1})
+        self.assertEqual(copied.result(), 'Copy done')
+        self.assertEqual(self.client._imap.tagged_commands, {})
+
+    def test_untagged_assigned_in_order(self):
+        self.script(('untagged', 'FETCH', b'1 (UID 11 FLAGS ())'),
+                    ('tagged', b'A1', ('OK', [b'done'])),
+                    ('untagged', 'FETCH', b'2 (UID 12 FLAGS (\\Deleted))'),
+                    ('tagged', b'A2', ('OK', [b'done'])))
+
+        with self.client.pipeline() as p:
+            fetched = p.fetch([11], ['FLAGS'])
+            stored = p.add_flags([12], ['\\Deleted'])
+
+        self.assertEqual(fetched.result(), {11: {'SEQ': 1, 'FLAGS': ()}})
+        self.assertEqual(stored.result(), {12: ('\\Deleted',)})
+
+    def test_failed_command(self):
+        self.script(('tagged', b'A1', ('NO', [b'No such folder'])),
+                    ('untagged', 'STATUS', b'"INBOX" (MESSAGES 3)'),
+                    ('tagged', b'A2', ('OK', [b'done'])))
+
+        p = self.client.pipeline()
+        copied = p.copy([1], 'Missing')
+        status = p.folder_status('INBOX')
+        self.assertEqual(p.execute(), [copied, status])
+
+        self.assertRaises(IMAPClient.Error, copied.result)
+        self.assertEqual(status.result(), {'MESSAGES': 3})
+
+    def test_without_uid(self):
+        self.client.use_uid = False
+        self.script(('tagged', b'A1', ('OK', [b'done'])))
+
+        with self.client.pipeline() as p:
+            p.set_flags([3], ['\\Seen'])
+
+        self.client._imap.send.assert_called_once_with(b'A1 STORE 3 FLAGS (\\Seen)\r\n')
+
+    def test_nothing_to_send(self):
+        with self.client.pipeline() as p:
+            fetched = p.fetch([], ['FLAGS'])
+        self.assertEqual(fetched.result(), {})
+        self.assertFalse(self.client._imap.send.called)
+
+    def test_not_executed_on_error(self):
+        try:
+            with self.client.pipeline() as p:
+                p.fetch([1], ['FLAGS'])
+                raise KeyError()
+        except KeyError:
+            pass
+        self.assertFalse(self.client._imap.send.called)
+
+    def test_window(self):
+        sent = []
+        self.client._imap.send = sent.append
+        self.script(('tagged', b'A1', ('OK', [b'one'])),
+                    ('tagged', b'A2', ('OK', [b'two'])),
+                    ('tagged', b'A3', ('OK', [b'three'])))
+
+        p = self.client.pipeline(window=2)
+        results = [p.copy([n], 'Archive') for n in (1, 2, 3)]
+        out = p.iter_execute()
+
+        self.assertTrue(six.next(out) is results[0])
+        # The third command went out once the first had completed.
+        self.assertEqual(sent, [b'A1 UID COPY 1 "Archive"\r\n'
+                                b'A2 UID COPY 2 "Archive"\r\n',
+                                b'A3 UID COPY 3 "Archive"\r\n'])
+        self.assertEqual(list(out), results[1:])
+        self.assertEqual([r.result() for r in results], ['one', 'two', 'three'])
+
+    def test_bad_window(self):
+        self.assertRaises(ValueError, self.client.pipeline, 0)
+
+    def test_is_pipeline(self):
+        self.assertTrue(isinstance(self.client.pipeline(), Pipeline))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+import socket
+import threading
+
+from mock import Mock, patch
+
+from imapclient.config import Bunch
+from imapclient.imapclient import IMAPClient
+from imapclient.pool import ConnectionPool
+from imapclient.test.util import unittest
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.conf = Bunch(host='imap.test')
+        self.clients = []
+
+    def factory(self, conf):
+        self.assertIs(conf, self.conf)
+        client = Mock(name='client%d' % len(self.clients))
+        self.clients.append(client)
+        return client
+
+    def pool(self, **kwargs):
+        return ConnectionPool(self.conf, factory=self.factory, **kwargs)
+
+    def test_prefill(self):
+        self.pool(size=3)
+        self.assertEqual(len(self.clients), 3)
+
+    def test_prefill_failure(self):
+        def factory(conf):
+            if len(self.clients) == 2:
+                raise IMAPClient.Error('login failed')
+            return self.factory(conf)
+
+        self.assertRaises(IMAPClient.Error, ConnectionPool, self.conf, size=3,
+                          factory=factory)
+        self.assertEqual(len(self.clients), 2)
+        for client in self.clients:
+            client.logout.assert_called_once_with()
+
+    def test_no_prefill(self):
+        pool = self.pool(size=3, prefill=False)
+        self.assertEqual(self.clients, [])
+        with pool.connection() as client:
+            self.assertIs(client, self.clients[0])
+        with pool.connection() as client:
+            self.assertIs(client, self.clients[0])
+        self.assertEqual(len(self.clients), 1)
+
+    def test_bad_size(self):
+        self.assertRaises(ValueError, self.pool, size=0)
+
+    def test_selects_folder(self):
+        pool = self.pool(size=1)
+        with pool.connection('INBOX', readonly=True) as client:
+            client.select_folder.assert_called_once_with('INBOX', True)
+
+    def test_reuses_selected_folder(self):
+        pool = self.pool(size=2)
+        with pool.connection('INBOX') as first:
+            with pool.connection('Sent') as second:
+                pass
+        for folder, expected in [('INBOX', first), ('Sent', second), ('INBOX', first)]:
+            with pool.connection(folder) as client:
+                self.assertIs(client, expected)
+        self.assertEqual(first.select_folder.call_count, 1)
+        self.assertEqual(second.select_folder.call_count, 1)
+
+    def test_folder_info(self):
+        pool = self.pool(size=1)
+        self.clients[0].select_folder.return_value = {'UIDVALIDITY': 7}
+        for _ in range(2):
+            with pool.connection('INBOX') as client:
+                self.assertEqual(pool.folder_info(client), {'UIDVALIDITY': 7})
+        self.assertEqual(client.select_folder.call_count, 1)
+        self.assertRaises(KeyError, pool.folder_info, client)
+
+    def test_readonly_reselects(self):
+        pool = self.pool(size=1)
+        with pool.connection('INBOX', readonly=True):
+            pass
+        with pool.connection('INBOX') as client:
+            self.assertEqual(client.select_folder.call_count, 2)
+
+    def test_failed_select_forgets_folder(self):
+        pool = self.pool(size=1)
+        client = self.clients[0]
+        client.select_folder.side_effect = IMAPClient.Error('no such folder')
+        with self.assertRaises(IMAPClient.Error):
+            with pool.connection('Nope'):
+                pass
+        client.select_folder.side_effect = None
+        with pool.connection('Nope'):
+            pass
+        self.assertEqual(client.select_folder.call_count, 2)
+
+    def test_connection_error_replaces_session(self):
+        pool = self.pool(size=1)
+        with self.assertRaises(socket.error):
+            with pool.connection():
+                raise socket.error('reset')
+        self.clients[0].logout.assert_called_once_with()
+        with pool.connection() as client:
+            self.assertIs(client, self.clients[1])
+
+    def test_other_errors_keep_session(self):
+        pool = self.pool(size=1)
+        with self.assertRaises(IMAPClient.Error):
+            with pool.connection():
+                raise IMAPClient.Error('search failed')
+        with pool.connection() as client:
+            self.assertIs(client, self.clients[0])
+
+    def test_health_check(self):
+        pool = self.pool(size=1, check_interval=30)
+        with patch('imapclient.pool.time.time', return_value=pool._idle[0].last_used + 10):
+            with pool.connection() as client:
+                self.assertFalse(client.noop.called)
+        with patch('imapclient.pool.time.time', return_value=pool._idle[0].last_used + 60):
+            with pool.connection() as client:
+                client.noop.assert_called_once_with()
+                self.assertIs(client, self.clients[0])
+
+    def test_health_check_failure(self):
+        pool = self.pool(size=1, check_interval=0)
+        self.clients[0].noop.side_effect = IMAPClient.AbortError('gone')
+        with pool.connection('INBOX') as client:
+            self.assertIs(client, self.clients[1])
+            client.select_folder.assert_called_once_with('INBOX', False)
+
+    def test_timeout(self):
+        pool = self.pool(size=1)
+        with pool.connection():
+            self.assertRaisesRegex(IMAPClient.Error, 'no connection free',
+                                   pool.connection(timeout=0.01).__enter__)
+
+    def test_waits_for_release(self):
+        pool = self.pool(size=1)
+        got = []
+
+        def borrow():
+            with pool.connection() as client:
+                got.append(client)
+        with pool.connection():
+            thread = threading.Thread(target=borrow)
+            thread.start()
+            thread.join(0.05)
+            self.assertEqual(got, [])
+        thread.join()
+        self.assertEqual(got, self.clients)
+
+    def test_close(self):
+        pool = self.pool(size=2)
+        with pool.connection() as lent:
+            pool.close()
+            idle = [c for c in self.clients if c is not lent][0]
+            idle.logout.assert_called_once_with()
+            self.assertFalse(lent.logout.called)
+        lent.logout.assert_called_once_with()
+        self.assertRaisesRegex(IMAPClient.Error, 'closed', pool.connection().__enter__)
+
+
+if __name__ == '__main__':
+    unittest.main()
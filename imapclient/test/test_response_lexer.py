@@ -0,0 +1,116 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+'''
+Unit tests for the Lexer and RegexLexer classes
+'''
+
+from __future__ import unicode_literals
+
+from imapclient import response_lexer
+from imapclient.response_lexer import TokenSource, Lexer, RegexLexer
+from imapclient.test.util import unittest
+
+
+class TestRegexLexer(unittest.TestCase):
+
+    def test_atoms(self):
+        self.check('FOO bar 123', ['FOO', 'bar', '123'])
+        self.check(r'\Seen F.O:-O_0;', [r'\Seen', 'F.O:-O_0;'])
+
+    def test_whitespace(self):
+        self.check('  FOO\t\r\nBAR  ', ['FOO', 'BAR'])
+        self.check('   ', [])
+        self.check('', [])
+
+    def test_punctuation(self):
+        self.check('(a (b))', ['(', 'a', '(', 'b', ')', ')'])
+        self.check('x%y', ['x', '%', 'y'])
+        self.check('a\x01b', ['a', '\x01', 'b'])
+
+    def test_non_latin1_is_punctuation(self):
+        self.check('\u0100ab', ['\u0100', 'ab'])
+
+    def test_quoted(self):
+        self.check('"foo bar" "(x)"', ['"foo bar"', '"(x)"'])
+        self.check('"a""b"', ['"a"', '"b"'])
+        self.check('"a"b', ['"a"', 'b'])
+        self.check('"a\r\nb"', ['"a\r\nb"'])
+
+    def test_quoted_escapes(self):
+        self.check(r'"\"foo bar\""', ['""foo bar""'])
+        self.check(r'"foo\\bar"', [r'"foo\bar"'])
+
+    def test_square_brackets(self):
+        self.check('BODY[HEADER.FIELDS (FROM)] {5}',
+                   ['BODY[HEADER.FIELDS (FROM)]', '{5}'])
+        self.check('[foo bar]def', ['[foo bar]def'])
+        self.check('a[b]c[d "e"]', ['a[b]c[d "e"]'])
+
+    def test_unclosed_quote(self):
+        self.check_error('"abc next', """No closing '"'""")
+        self.check_error(r'"abc\"', """No closing '"'""")
+
+    def test_unclosed_bracket(self):
+        self.check_error('foo[bar', "No closing ']'")
+
+    def test_quote_after_atom(self):
+        self.assertRaises(AssertionError, list, TokenSource(['abc"def"'], RegexLexer))
+
+    def test_literal_access(self):
+        src = TokenSource([('(12 "foo" {3}', 'abc'), ')'], RegexLexer)
+        tokens = []
+        for token in src:
+            tokens.append(token)
+            if token == '{3}':
+                self.assertEqual(src.current_literal, 'abc')
+        self.assertEqual(tokens, ['(', '12', '"foo"', '{3}', ')'])
+
+    def test_same_tokens_as_Lexer(self):
+        responses = [
+            '123 (UID 317 FLAGS (\\Seen \\Answered) '
+            'INTERNALDATE " 9-Feb-2007 17:08:08 -0430" '
+            'BODY (("TEXT" "HTML" ("CHARSET" "us-ascii") NIL NIL "QUOTED-PRINTABLE" 55 3)'
+            '("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 26 1) "MIXED"))',
+            r'(\HasNoChildren) "/" "Test \"Folder\""',
+            '(\\NoInferiors \\UnMarked) "/" "Left\\\\Right"',
+            ('1 (BODY[HEADER.FIELDS (from subject)] {11}', 'Hi there.\r\n'),
+            ')',
+            '* OK [UIDVALIDITY 1239278212] UIDs valid',
+        ]
+        self.assertEqual(list(TokenSource(responses, RegexLexer)),
+                         list(TokenSource(responses, Lexer)))
+
+    def test_bytes(self):
+        self.check(b'(\\Seen "f\xf6o")', ['(', '\\Seen', '"f\xf6o"', ')'])
+        src = TokenSource([(b'(12 {3}', b'a\xffc'), b')'], RegexLexer)
+        tokens = []
+        for token in src:
+            tokens.append(token)
+            if token == '{3}':
+                self.assertEqual(src.current_literal, b'a\xffc')
+        self.assertEqual(tokens, ['(', '12', '{3}', ')'])
+
+    def check(self, text, expected):
+        self.assertEqual(list(TokenSource([text], RegexLexer)), expected)
+
+    def check_error(self, text, expected_msg):
+        self.assertRaisesRegex(ValueError, expected_msg,
+                               list, TokenSource([text], RegexLexer))
+
+
+class TestTokenSource(unittest.TestCase):
+
+    def test_default_lexer(self):
+        self.assertTrue(isinstance(TokenSource(['a']).lex,
+                                   response_lexer.DEFAULT_LEXER))
+
+    def test_fallback_lexer(self):
+        src = TokenSource(['(a "b")'], Lexer)
+        self.assertTrue(type(src.lex) is Lexer)
+        self.assertEqual(list(src), ['(', 'a', '"b"', ')'])
+
+
+if __name__ == '__main__':
+    unittest.main()
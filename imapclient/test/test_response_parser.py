@@ -11,8 +11,18 @@ from __future__ import unicode_literals
 from datetime import datetime
 from textwrap import dedent
 
+from imapclient import six
 from imapclient.fixed_offset import FixedOffset
-from imapclient.response_parser import parse_response, parse_fetch_response, ParseError
+from imapclient.response_parser import (
+    parse_response,
+    parse_fetch_response,
+    gen_fetch_response,
+    Body,
+    BodyData,
+    BodyType1Part,
+    BodyTypeMPart,
+    ParseError,
+)
 from imapclient.test.util import unittest
 
 #TODO: tokenising tests
@@ -121,6 +131,10 @@ class TestParseResponse(unittest.TestCase):
         self._test(response, (12, 'foo', literal_text))
 
 
+    def test_bytes(self):
+        self._test([b'(12 "f\xf6o" \\Seen NIL)'], (12, 'f\xf6o', '\\Seen', None))
+        self._test([(b'(12 {4}', b'ab\xffc'), b')'], (12, b'ab\xffc'))
+
     def test_quoted_specials(self):
         self._test(r'"\"foo bar\""', '"foo bar"')
         self._test(r'"foo \"bar\""', 'foo "bar"')
@@ -241,6 +255,30 @@ class TestParseFetchResponse(unittest.TestCase):
                                'SEQ': 1}})
 
 
+    def test_bytes_literals(self):
+        response = [(b'1 (UID 9 RFC822 {4}', b'b\xf6dy'), b' FLAGS (\\Seen))']
+        self.assertEqual(parse_fetch_response(response),
+                         {9: {'RFC822': b'b\xf6dy', 'FLAGS': ('\\Seen',), 'SEQ': 1}})
+        self.assertEqual(parse_fetch_response(response, decode_literals=True),
+                         {9: {'RFC822': 'b\xf6dy', 'FLAGS': ('\\Seen',), 'SEQ': 1}})
+
+    def test_buffer_literals(self):
+        literal = b'Subject: test\r\n\r\nb\xf6dy'
+        parsed = parse_fetch_response([(b'1 (UID 9 RFC822 {21}', literal),
+                                       b' FLAGS (\\Seen))'],
+                                      buffer_literals=True)
+        self.assertEqual(list(parsed), [9])
+        self.assertEqual(parsed[9]['FLAGS'], ('\\Seen',))
+        buf = parsed[9]['RFC822']
+        self.assertTrue(isinstance(buf, memoryview))
+        self.assertTrue(buf.readonly)
+        self.assertEqual(buf.tobytes(), literal)
+
+    def test_buffer_literals_wrong_size(self):
+        self.assertRaises(ParseError, parse_fetch_response,
+                          [(b'1 (RFC822 {99}', b'abc'), b')'],
+                          buffer_literals=True)
+
     def test_literals_and_keys_with_square_brackets(self):
         self.assertEqual(parse_fetch_response([('1 (BODY[TEXT] {11}', 'Hi there.\r\n'), ')']),
                           { 1: {'BODY[TEXT]': 'Hi there.\r\n',
@@ -322,6 +360,11 @@ class TestParseFetchResponse(unittest.TestCase):
         check(' 9-Dec-2007 17:08:08 +0000',
               datetime(2007, 12, 9, 17, 8, 8, 0, FixedOffset(0)))
 
+    def test_INTERNALDATE_epoch(self):
+        output = parse_fetch_response(['3 (INTERNALDATE " 9-Feb-2007 17:08:08 -0430")'],
+                                      epoch_times=True)
+        self.assertEqual(output[3]['INTERNALDATE'], 1171057088)
+
     def test_mixed_types(self):
         self.assertEqual(parse_fetch_response([('1 (INTERNALDATE " 9-Feb-2007 17:08:08 +0100" RFC822 {21}',
                                                 'Subject: test\r\n\r\nbody'),
@@ -333,6 +376,89 @@ class TestParseFetchResponse(unittest.TestCase):
                                'SEQ': 1}})
 
 
+class TestGenFetchResponse(unittest.TestCase):
+
+    def test_yields_each_response(self):
+        self.assertEqual(list(gen_fetch_response(["2 (UID 22 FLAGS (Foo))",
+                                                  "2 (UID 22 MODSEQ 4)",
+                                                  "7 (UID 77 FLAGS ())"])),
+                         [(22, {'FLAGS': ('Foo',), 'SEQ': 2}),
+                          (22, {'MODSEQ': 4, 'SEQ': 2}),
+                          (77, {'FLAGS': (), 'SEQ': 7})])
+
+    def test_is_lazy(self):
+        responses = gen_fetch_response(["2 (FLAGS (Foo))", "3 WHAT"])
+        self.assertEqual(six.next(responses), (2, {'FLAGS': ('Foo',), 'SEQ': 2}))
+        self.assertRaises(ParseError, six.next, responses)
+
+    def test_none_special_case(self):
+        self.assertEqual(list(gen_fetch_response([None])), [])
+
+
+class TestBody(unittest.TestCase):
+
+    multipart = parse_response([
+        '(("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 26 1)'
+        '(("TEXT" "HTML" ("CHARSET" "us-ascii") NIL NIL "7BIT" 55 3)'
+        '("IMAGE" "PNG" ("NAME" "x.png") NIL NIL "BASE64" 100) "RELATED")'
+        '"MIXED" ("BOUNDARY" "xyz") NIL NIL)'])[0]
+
+    def test_single_part(self):
+        body = Body.create(self.multipart[0])
+        self.assertTrue(isinstance(body, BodyType1Part))
+        self.assertEqual(body.type, 'body-type-text')
+        self.assertEqual(body.content_type, 'text/plain')
+        self.assertEqual(body.part_count, 0)
+        self.assertEqual(body, self.multipart[0])
+
+    def test_types(self):
+        self.assertEqual(Body.create(('IMAGE', 'PNG')).type, 'body-type-basic')
+        self.assertEqual(Body.create(('message', 'RFC822')).type, 'body-type-msg')
+
+    def test_multipart(self):
+        body = Body.create(self.multipart)
+        self.assertTrue(isinstance(body, BodyTypeMPart))
+        self.assertEqual(body.type, 'body-type-mpart')
+        self.assertEqual(body.content_type, 'multipart/mixed')
+        self.assertEqual(body.part_count, 2)
+        self.assertEqual(body, self.multipart)
+
+    def test_parts_created_on_access(self):
+        body = Body.create(self.multipart)
+        self.assertTrue(type(tuple.__getitem__(body, 1)) is tuple)
+        self.assertTrue(isinstance(body[1], BodyTypeMPart))
+        self.assertEqual(body[1].content_type, 'multipart/related')
+        self.assertEqual(body[1][1].content_type, 'image/png')
+        self.assertEqual(body[-6].content_type, 'text/plain')
+        # Extension data isn't a body part.
+        self.assertTrue(type(body[3]) is tuple)
+        self.assertEqual([type(part) for part in body[:2]],
+                         [BodyType1Part, BodyTypeMPart])
+        self.assertEqual([getattr(part, 'content_type', None) for part in body],
+                         ['text/plain', 'multipart/related', None, None, None, None])
+
+    def test_compact(self):
+        body = Body.create(self.multipart)
+        self.assertFalse(hasattr(body, '__dict__'))
+        self.assertTrue(body[0].content_type is
+                        Body.create(('text', 'Plain')).content_type)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Body.create, 'TEXT')
+        self.assertRaises(ValueError, Body.create, (1, 2))
+
+    def test_BodyData(self):
+        body = BodyData.create(self.multipart)
+        self.assertFalse(hasattr(body, '__dict__'))
+        self.assertEqual(body.content_type, 'multipart/mixed')
+        self.assertTrue(isinstance(body[1], BodyData))
+        section = body.get_section('2.2')
+        self.assertTrue(isinstance(section, BodyData))
+        self.assertEqual(section.content_type, 'image/png')
+        self.assertEqual(section, ('IMAGE', 'PNG', ('NAME', 'x.png'), None, None, 'BASE64', 100))
+        self.assertRaises(IndexError, body.get_section, '3')
+
+
 def add_crlf(text):
     return CRLF.join(text.splitlines()) + CRLF
 
@@ -0,0 +1,93 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+from io import BytesIO
+
+from mock import Mock
+
+from imapclient.spool import SpooledLiteral, spool
+from imapclient.test.testable_imapclient import TestableIMAPClient as IMAPClient
+from imapclient.test.util import unittest
+
+
+class TestSpool(unittest.TestCase):
+
+    def test_spool(self):
+        data = b''.join(b'%05d' % i for i in range(2000))
+        source = BytesIO(data + b'trailing')
+        read = Mock(side_effect=source.read)
+
+        literal = spool(read, len(data), chunk_size=4096)
+
+        self.assertEqual(len(literal), 10000)
+        self.assertEqual([c[0][0] for c in read.call_args_list], [4096, 4096, 1808])
+        self.assertEqual(literal.read(), data)
+        self.assertEqual(b''.join(literal.iter_chunks(3000)), data)
+        self.assertEqual([len(c) for c in literal.iter_chunks(3000)], [3000, 3000, 3000, 1000])
+        self.assertEqual(source.read(), b'trailing')
+        self.assertEqual(repr(literal), '<SpooledLiteral of 10000 bytes>')
+
+    def test_open_rewinds(self):
+        literal = spool(BytesIO(b'hello').read, 5)
+        self.assertEqual(literal.open().read(3), b'hel')
+        self.assertEqual(literal.open().read(), b'hello')
+
+    def test_close(self):
+        with spool(BytesIO(b'hello').read, 5) as literal:
+            self.assertFalse(literal.closed)
+        self.assertTrue(literal.closed)
+
+    def test_short_read(self):
+        self.assertRaises(EOFError, spool, BytesIO(b'hel').read, 5)
+
+
+class FakeIMAP(object):
+
+    def __init__(self, data):
+        self.source = BytesIO(data)
+
+    def read(self, size):
+        return self.source.read(size)
+
+
+class TestSpoolingClient(unittest.TestCase):
+
+    def setUp(self):
+        self.client = IMAPClient()
+        self.client._imap.read = self.client._literal_reader(FakeIMAP(b'0123456789' * 10))
+
+    def test_off_by_default(self):
+        self.assertIsNone(self.client.spool_threshold)
+        self.assertEqual(self.client._imap.read(20), b'01234567890123456789')
+
+    def test_below_threshold(self):
+        self.client.spool_threshold = 21
+        self.assertEqual(self.client._imap.read(20), b'01234567890123456789')
+
+    def test_at_threshold(self):
+        self.client.spool_threshold = 20
+        literal = self.client._imap.read(20)
+        self.assertIsInstance(literal, SpooledLiteral)
+        self.assertEqual(literal.read(), b'01234567890123456789')
+        literal.close()
+
+    def test_eof_aborts(self):
+        self.client.spool_threshold = 20
+        self.assertRaises(IMAPClient.AbortError, self.client._imap.read, 200)
+
+    def test_fetch(self):
+        self.client.spool_threshold = 20
+        literal = self.client._imap.read(100)
+        self.client._imap._command_complete.return_value = ('OK', [b'done'])
+        self.client._imap._untagged_response.return_value = (
+            'OK', [(b'1 (UID 5 RFC822 {100}', literal), b')'])
+        with self.client.fetch([5], ['RFC822'])[5]['RFC822'] as got:
+            self.assertIs(got, literal)
+            self.assertEqual(len(got.read()), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+
+from mock import Mock
+
+from imapclient.sync import FolderState, SyncEngine, parse_vanished
+from imapclient.test.testable_imapclient import TestableIMAPClient as IMAPClient
+from imapclient.test.util import unittest
+from imapclient.uidset import UIDSet
+
+
+class TestParseVanished(unittest.TestCase):
+
+    def test_earlier(self):
+        self.assertEqual(parse_vanished([b'(EARLIER) 41,43:45']), UIDSet([41, 43, 44, 45]))
+
+    def test_several(self):
+        self.assertEqual(parse_vanished([b'3', b'(EARLIER) 1:2']), UIDSet([1, 2, 3]))
+
+    def test_none(self):
+        self.assertEqual(parse_vanished([]), UIDSet())
+
+
+class SyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = IMAPClient()
+        self.client._cached_capabilities = ('IMAP4REV1', 'CONDSTORE')
+        self.client.select_folder = Mock()
+        self.client.fetch = Mock()
+        self.client.search_uidset = Mock()
+
+    def set_select(self, uidvalidity=7, modseq=100, exists=2):
+        info = {'UIDVALIDITY': uidvalidity, 'EXISTS': exists}
+        if modseq is not None:
+            info['HIGHESTMODSEQ'] = modseq
+        self.client.select_folder.return_value = info
+
+
+class TestCondstoreSync(SyncTest):
+
+    def setUp(self):
+        super(TestCondstoreSync, self).setUp()
+        self.engine = SyncEngine(self.client)
+        self.set_select()
+        self.client.fetch.return_value = {1: {'FLAGS': (), 'MODSEQ': (90,)},
+                                          2: {'FLAGS': ('\\Seen',), 'MODSEQ': (100,)}}
+        self.first = self.engine.sync('INBOX')
+
+    def test_first_sync_is_full(self):
+        self.assertFalse(self.engine.qresync)
+        self.assertTrue(self.first.full)
+        self.assertEqual(sorted(self.first.changed), [1, 2])
+        self.client.fetch.assert_called_once_with('1:*', ['FLAGS', 'MODSEQ'])
+        state = self.engine.folders['INBOX']
+        self.assertEqual((state.uidvalidity, state.highestmodseq, state.uids),
+                         (7, 100, UIDSet([1, 2])))
+
+    def test_changes_only(self):
+        self.set_select(modseq=120, exists=2)
+        self.client.fetch.return_value = {3: {'FLAGS': (), 'MODSEQ': (120,)}}
+        self.client.search_uidset.return_value = UIDSet([2, 3])
+
+        result = self.engine.sync('INBOX')
+
+        self.assertFalse(result.full)
+        self.assertEqual(list(result.changed), [3])
+        self.assertEqual(result.vanished, UIDSet([1]))
+        self.client.fetch.assert_called_with('1:*', ['FLAGS', 'MODSEQ'], ['CHANGEDSINCE 100'])
+        state = self.engine.folders['INBOX']
+        self.assertEqual((state.highestmodseq, state.uids), (120, UIDSet([2, 3])))
+
+    def test_emptied_folder(self):
+        self.set_select(modseq=130, exists=0)
+        self.client.fetch.reset_mock()
+        result = self.engine.sync('INBOX')
+        self.assertEqual(result.vanished, UIDSet([1, 2]))
+        self.assertFalse(self.client.fetch.called)
+        self.assertFalse(self.client.search_uidset.called)
+
+    def test_uidvalidity_change(self):
+        self.set_select(uidvalidity=8, modseq=5)
+        self.client.fetch.return_value = {1: {'FLAGS': (), 'MODSEQ': (5,)}}
+        result = self.engine.sync('INBOX')
+        self.assertTrue(result.full)
+        self.client.fetch.assert_called_with('1:*', ['FLAGS', 'MODSEQ'])
+        self.assertEqual(self.engine.folders['INBOX'].uidvalidity, 8)
+
+    def test_no_modseq(self):
+        self.set_select(modseq=None)
+        result = self.engine.sync('INBOX')
+        self.assertTrue(result.full)
+        self.assertNotIn('INBOX', self.engine.folders)
+        self.client.fetch.assert_called_with('1:*', ['FLAGS'])
+
+    def test_no_condstore(self):
+        self.client._cached_capabilities = ('IMAP4REV1',)
+        self.set_select(modseq=None)
+        self.client.fetch.reset_mock()
+        self.client.fetch.return_value = {1: {'FLAGS': ()}}
+        result = SyncEngine(self.client).sync('INBOX')
+        self.assertTrue(result.full)
+        self.client.fetch.assert_called_once_with('1:*', ['FLAGS'])
+
+    def test_save_and_load(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, 'sync.json')
+            self.engine.save(path)
+            engine = SyncEngine(self.client)
+            engine.load(path)
+        finally:
+            shutil.rmtree(tmpdir)
+        state = engine.folders['INBOX']
+        self.assertEqual((state.uidvalidity, state.highestmodseq, state.uids),
+                         (7, 100, UIDSet([1, 2])))
+
+    def test_empty_state_round_trip(self):
+        state = FolderState.from_dict(FolderState(1, 2, UIDSet()).as_dict())
+        self.assertEqual(state.uids, UIDSet())
+
+
+class TestQresyncSync(SyncTest):
+
+    def setUp(self):
+        super(TestQresyncSync, self).setUp()
+        self.client._cached_capabilities = ('IMAP4REV1', 'CONDSTORE', 'QRESYNC')
+        self.client.enable = Mock(return_value=['QRESYNC'])
+        imap = self.client._imap
+        self.responses = {}
+
+        def simple_command(name, *args):
+            imap.untagged_responses.update(self.responses)
+            return 'OK', [b'done']
+        imap._simple_command.side_effect = simple_command
+
+        self.engine = SyncEngine(self.client, items=['flags', 'internaldate'])
+        self.engine.folders['INBOX'] = FolderState(7, 100, UIDSet([1, 2, 3]))
+
+    def test_enabled(self):
+        self.client.enable.assert_called_once_with('QRESYNC')
+        self.assertTrue(self.engine.qresync)
+
+    def test_not_enabled(self):
+        self.client.enable.return_value = []
+        self.assertFalse(SyncEngine(self.client).qresync)
+
+    def test_sync(self):
+        self.responses = {
+            'EXISTS': [b'3'],
+            'UIDVALIDITY': [b'7'],
+            'HIGHESTMODSEQ': [b'150'],
+            'VANISHED': [b'(EARLIER) 1'],
+            'FETCH': [b'2 (UID 3 FLAGS (\\Seen) MODSEQ (140))',
+                      b'3 (UID 4 FLAGS () MODSEQ (150))'],
+        }
+        self.client.fetch.return_value = {3: {'INTERNALDATE': 'a'}, 4: {'INTERNALDATE': 'b'}}
+
+        result = self.engine.sync('INBOX')
+
+        self.client._imap._simple_command.assert_called_once_with(
+            'EXAMINE', '"INBOX"', '(QRESYNC (7 100))')
+        self.assertFalse(self.client.select_folder.called)
+        self.client.fetch.assert_called_once_with([3, 4], ['INTERNALDATE'])
+        self.assertFalse(self.client.search_uidset.called)
+        self.assertFalse(result.full)
+        self.assertEqual(result.vanished, UIDSet([1]))
+        self.assertEqual(result.changed, {
+            3: {'SEQ': 2, 'FLAGS': ('\\Seen',), 'MODSEQ': (140,), 'INTERNALDATE': 'a'},
+            4: {'SEQ': 3, 'FLAGS': (), 'MODSEQ': (150,), 'INTERNALDATE': 'b'},
+        })
+        self.assertEqual(result.info, {'EXISTS': 3, 'UIDVALIDITY': 7, 'HIGHESTMODSEQ': 150})
+        state = self.engine.folders['INBOX']
+        self.assertEqual((state.highestmodseq, state.uids), (150, UIDSet([2, 3, 4])))
+        self.assertEqual(self.client._imap.state, 'SELECTED')
+
+    def test_nothing_changed(self):
+        self.responses = {'EXISTS': [b'3'], 'UIDVALIDITY': [b'7'], 'HIGHESTMODSEQ': [b'100']}
+        result = self.engine.sync('INBOX')
+        self.assertEqual((result.changed, result.vanished), ({}, UIDSet()))
+        self.assertFalse(self.client.fetch.called)
+
+    def test_failed_select(self):
+        self.client._imap._simple_command.side_effect = None
+        self.client._imap._simple_command.return_value = ('NO', [b'no such folder'])
+        self.assertRaises(IMAPClient.Error, self.engine.sync, 'INBOX')
+
+
+if __name__ == '__main__':
+    unittest.main()
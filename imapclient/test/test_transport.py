@@ -0,0 +1,152 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+import socket
+import threading
+
+from imapclient import transport
+from imapclient.transport import RecvBuffer
+from imapclient.test.util import unittest
+
+
+def scripted(*pieces):
+    # A recv_into function returning *pieces* one call at a time.
+    pieces = list(pieces)
+    calls = []
+
+    def recv_into(buf):
+        calls.append(len(buf))
+        if not pieces:
+            return 0
+        piece = pieces.pop(0)
+        n = min(len(piece), len(buf))
+        buf[:n] = piece[:n]
+        if n < len(piece):
+            pieces.insert(0, piece[n:])
+        return n
+    recv_into.calls = calls
+    return recv_into
+
+
+class TestRecvBuffer(unittest.TestCase):
+
+    def test_readline(self):
+        buf = RecvBuffer(scripted(b'* OK hello\r\n* 3 EX', b'ISTS\r\n'))
+        self.assertEqual(buf.readline(), b'* OK hello\r\n')
+        self.assertEqual(buf.pending, len(b'* 3 EX'))
+        self.assertEqual(buf.readline(), b'* 3 EXISTS\r\n')
+        self.assertEqual(buf.readline(), b'')
+
+    def test_readline_at_eof(self):
+        buf = RecvBuffer(scripted(b'partial'))
+        self.assertEqual(buf.readline(), b'partial')
+
+    def test_readline_limit(self):
+        buf = RecvBuffer(scripted(b'0123456789\r\n'))
+        self.assertEqual(buf.readline(4), b'0123')
+        self.assertEqual(buf.readline(100), b'456789\r\n')
+
+    def test_long_line_grows_buffer(self):
+        line = b'x' * 50 + b'\r\n'
+        buf = RecvBuffer(scripted(line[:20], line[20:45], line[45:]), size=16)
+        self.assertEqual(buf.readline(), line)
+
+    def test_buffer_reused(self):
+        lines = [b'* %d EXISTS\r\n' % i for i in range(100)]
+        buf = RecvBuffer(scripted(*lines), size=32)
+        for line in lines:
+            self.assertEqual(buf.readline(), line)
+        self.assertEqual(len(buf._buf), 32)
+
+    def test_read_literal(self):
+        literal = b'y' * 100000
+        recv_into = scripted(b'* 1 FETCH (RFC822 {100000}\r\n' + literal[:10],
+                             literal[10:60000], literal[60000:] + b')\r\n')
+        buf = RecvBuffer(recv_into, size=64)
+        self.assertEqual(buf.readline(), b'* 1 FETCH (RFC822 {100000}\r\n')
+        self.assertEqual(buf.read(100000), literal)
+        self.assertEqual(buf.readline(), b')\r\n')
+        # The rest of the literal went straight into one bytearray.
+        self.assertEqual(recv_into.calls[1], 100000 - 10)
+
+    def test_read_short(self):
+        buf = RecvBuffer(scripted(b'abc'), size=2)
+        self.assertEqual(buf.read(10), b'abc')
+
+    def test_read1(self):
+        buf = RecvBuffer(scripted(b'abcdef', b'gh'))
+        self.assertEqual(buf.read1(4), b'abcd')
+        self.assertEqual(buf.read1(), b'ef')
+        self.assertEqual(buf.read1(), b'gh')
+        self.assertEqual(buf.read1(), b'')
+
+    def test_nothing_lost_on_error(self):
+        pieces = [b'* OK par', socket.error('would block'), b'tial\r\n']
+
+        def recv_into(buf):
+            piece = pieces.pop(0)
+            if isinstance(piece, Exception):
+                raise piece
+            buf[:len(piece)] = piece
+            return len(piece)
+        buf = RecvBuffer(recv_into)
+
+        self.assertRaises(socket.error, buf.readline)
+        self.assertEqual(buf.readline(), b'* OK partial\r\n')
+
+
+class TestIMAP4(unittest.TestCase):
+
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.listen(1)
+        self.addCleanup(self.listener.close)
+
+    def serve(self, script):
+        # Accept one connection, then for each (expected, reply) wait
+        # for a line containing expected and send reply, with TAG
+        # replaced by the command's tag.
+        def run():
+            conn, _ = self.listener.accept()
+            infile = conn.makefile('rb')
+            try:
+                conn.sendall(b'* OK ready\r\n')
+                for expected, reply in script:
+                    line = infile.readline()
+                    assert expected in line, line
+                    conn.sendall(reply.replace(b'TAG', line.split()[0]))
+            finally:
+                infile.close()
+                conn.close()
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join)
+
+    def test_fetch(self):
+        literal = b'z' * 300000
+        self.serve([
+            (b'CAPABILITY', b'* CAPABILITY IMAP4rev1\r\nTAG OK done\r\n'),
+            (b'FETCH', b'* 1 FETCH (RFC822 {300000}\r\n' + literal +
+                       b')\r\n* 2 FETCH (FLAGS (\\Seen))\r\n'),
+        ])
+        port = self.listener.getsockname()[1]
+        imap = transport.IMAP4('127.0.0.1', port)
+        try:
+            self.assertIsInstance(imap.file, RecvBuffer)
+            tag = imap._new_tag()
+            imap.send(tag + b' FETCH 1:2 (RFC822)\r\n')
+            imap._get_response()
+            self.assertEqual(imap.untagged_responses['FETCH'][0],
+                             (b'1 (RFC822 {300000}', literal))
+            self.assertEqual(imap.readline(), b'* 2 FETCH (FLAGS (\\Seen))\r\n')
+            self.assertEqual(imap.pending, 0)
+        finally:
+            imap.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
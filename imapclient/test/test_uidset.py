@@ -0,0 +1,93 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+from __future__ import unicode_literals
+
+from imapclient.uidset import UIDSet
+from imapclient.test.util import unittest
+
+
+class TestUIDSet(unittest.TestCase):
+
+    def test_runs(self):
+        uids = UIDSet([5, 1, 2, 3, 3, 10, 4, 12, 11])
+        self.assertEqual(uids.ranges(), [(1, 5), (10, 12)])
+        self.assertEqual(str(uids), '1:5,10:12')
+        self.assertEqual(list(uids), [1, 2, 3, 4, 5, 10, 11, 12])
+        self.assertEqual(len(uids), 8)
+
+    def test_empty(self):
+        uids = UIDSet()
+        self.assertFalse(uids)
+        self.assertEqual(len(uids), 0)
+        self.assertEqual(list(uids), [])
+        self.assertEqual(str(uids), '')
+
+    def test_single(self):
+        self.assertEqual(str(UIDSet([7])), '7')
+        self.assertEqual(str(UIDSet([1, 3, 5])), '1,3,5')
+
+    def test_contains(self):
+        uids = UIDSet([1, 2, 3, 7, 9, 10])
+        for uid in (1, 2, 3, 7, 9, 10):
+            self.assertTrue(uid in uids)
+        for uid in (0, 4, 6, 8, 11):
+            self.assertFalse(uid in uids)
+
+    def test_from_ranges(self):
+        uids = UIDSet.from_ranges([(10, 20), (1, 5), (6, 8), (15, 25)])
+        self.assertEqual(uids.ranges(), [(1, 8), (10, 25)])
+        self.assertRaises(ValueError, UIDSet.from_ranges, [(5, 1)])
+
+    def test_parse(self):
+        self.assertEqual(UIDSet.parse('1:3,5,9:7'), UIDSet([1, 2, 3, 5, 7, 8, 9]))
+        self.assertEqual(UIDSet.parse(b'4'), UIDSet([4]))
+        self.assertRaises(ValueError, UIDSet.parse, '1:*')
+
+    def test_from_search(self):
+        self.assertEqual(UIDSet.from_search(b'1 2 3 5 6 100').ranges(),
+                         [(1, 3), (5, 6), (100, 100)])
+        self.assertEqual(UIDSet.from_search('9 3 4 2').ranges(), [(2, 4), (9, 9)])
+        self.assertEqual(UIDSet.from_search(None), UIDSet())
+
+    def test_union(self):
+        self.assertEqual(UIDSet([1, 2, 5]) | UIDSet([3, 9]), UIDSet([1, 2, 3, 5, 9]))
+        self.assertEqual(UIDSet([1]).union([2]), UIDSet([1, 2]))
+
+    def test_intersection(self):
+        a = UIDSet.from_ranges([(1, 10), (20, 30)])
+        b = UIDSet.from_ranges([(5, 25), (29, 40)])
+        self.assertEqual((a & b).ranges(), [(5, 10), (20, 25), (29, 30)])
+        self.assertEqual(a & UIDSet(), UIDSet())
+
+    def test_difference(self):
+        a = UIDSet.from_ranges([(1, 10), (20, 30)])
+        b = UIDSet.from_ranges([(3, 4), (8, 22), (30, 30)])
+        self.assertEqual((a - b).ranges(), [(1, 2), (5, 7), (23, 29)])
+        self.assertEqual(a - UIDSet(), a)
+        self.assertEqual(a - a, UIDSet())
+        self.assertEqual(a.difference([1, 2]).ranges(), [(3, 10), (20, 30)])
+
+    def test_chunks(self):
+        uids = UIDSet.from_ranges([(1, 5), (10, 12)])
+        self.assertEqual([str(c) for c in uids.chunks(3)], ['1:3', '4:5,10', '11:12'])
+        self.assertEqual([str(c) for c in uids.chunks(100)], ['1:5,10:12'])
+        self.assertEqual(list(UIDSet().chunks(3)), [])
+        self.assertRaises(ValueError, list, uids.chunks(0))
+
+    def test_equality(self):
+        self.assertEqual(UIDSet([1, 2]), UIDSet([2, 1]))
+        self.assertNotEqual(UIDSet([1, 2]), UIDSet([1]))
+        self.assertNotEqual(UIDSet([1]), [1])
+
+    def test_copy(self):
+        uids = UIDSet([1, 2])
+        self.assertEqual(UIDSet(uids), uids)
+
+    def test_repr(self):
+        self.assertEqual(repr(UIDSet([1, 2, 4])), "UIDSet('1:2,4')")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,6 +6,7 @@ from __future__ import unicode_literals
 
 from imapclient.imapclient import (
     messages_to_str,
+    UIDSet,
     normalise_search_criteria,
     normalise_text_list,
     seq_to_parenstr,
@@ -112,6 +113,14 @@ class Test_messages_to_str(unittest.TestCase):
     def test_iter(self):
         self.check(iter([123, 99]), '123,99')
 
+    def test_runs(self):
+        self.check([1, 2, 3, 5, 7, 8], '1:3,5,7:8')
+        self.check([3, 2, 1], '3,2,1')
+        self.check([1, 2, '3', 4, 5], '1:2,3,4:5')
+
+    def test_uidset(self):
+        self.check(UIDSet([5, 1, 2, 3]), '1:3,5')
+
 class Test_normalise_search_criteria(unittest.TestCase):
 
     def check(self, criteria, expected):
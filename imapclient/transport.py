@@ -0,0 +1,209 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+Buffered connections for imaplib.
+
+imaplib reads responses a line at a time through a file object, and
+under some Python versions (see imaplib_ssl_fix) a byte at a time.
+The IMAP4, IMAP4_SSL and IMAP4_stream classes here are the imaplib
+classes with their file replaced by a RecvBuffer. A RecvBuffer reads
+from the connection with large ``recv_into()`` calls into one reusable
+bytearray and finds line ends in that. Literals are read straight into
+an object of the literal's size, so they are not assembled from
+smaller pieces.
+
+IMAPClient uses these classes for its connections. Everything else
+about imaplib (and other code using the file, such as compression and
+the IdleWatcher) works as before.
+"""
+
+from __future__ import unicode_literals
+
+import imaplib
+import os
+
+__all__ = ['RecvBuffer', 'IMAP4', 'IMAP4_SSL', 'IMAP4_stream']
+
+BUFFER_SIZE = 256 * 1024
+
+# Line length limit used by imaplib where it has one.
+MAXLINE = getattr(imaplib, '_MAXLINE', 1000000)
+
+
+class RecvBuffer(object):
+    """A file-like object reading from a connection through a buffer.
+
+    *recv_into* is a function like ``socket.recv_into`` that reads
+    into a writable buffer and returns the number of bytes read (0 at
+    the end of the stream). *fileobj*, if given, is closed by close().
+    The buffer starts at *size* bytes and grows if a line doesn't fit.
+    """
+
+    def __init__(self, recv_into, fileobj=None, size=BUFFER_SIZE):
+        self._recv_into = recv_into
+        self._fileobj = fileobj
+        self._buf = bytearray(size)
+        self._start = 0
+        self._end = 0
+
+    @property
+    def pending(self):
+        """The number of bytes received but not yet read."""
+        return self._end - self._start
+
+    def _fill(self):
+        # Read more data after what is buffered, making room first.
+        # Returns the number of bytes read.
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif self._end == len(self._buf):
+            pending = self.pending
+            if self._start:
+                self._buf[:pending] = self._buf[self._start:self._end]
+            else:
+                self._buf.extend(bytearray(len(self._buf)))
+            self._start, self._end = 0, pending
+        # The view must be gone before the buffer can be resized.
+        view = memoryview(self._buf)[self._end:]
+        try:
+            n = self._recv_into(view) or 0
+        finally:
+            del view
+        self._end += n
+        return n
+
+    def _take(self, end):
+        view = memoryview(self._buf)[self._start:end]
+        data = view.tobytes()
+        del view
+        self._start = end
+        return data
+
+    def readline(self, limit=-1):
+        """Read a line, including its ``\\n``, or at most *limit*
+        bytes. If the stream ends first, what was left is returned.
+        """
+        scanned = 0     # bytes after _start known to hold no newline
+        while True:
+            end = self._buf.find(b'\n', self._start + scanned, self._end)
+            if end >= 0:
+                end += 1
+                break
+            if 0 <= limit <= self.pending:
+                end = self._start + limit
+                break
+            scanned = self.pending
+            if not self._fill():
+                end = self._end
+                break
+        if 0 <= limit < end - self._start:
+            end = self._start + limit
+        return self._take(end)
+
+    def read1(self, size=BUFFER_SIZE):
+        """Read up to *size* bytes, reading from the connection at
+        most once.
+        """
+        if not self.pending:
+            self._fill()
+        return self._take(self._start + min(size, self.pending))
+
+    def read(self, size):
+        """Read *size* bytes, or fewer if the stream ends first.
+
+        The bytes already buffered are copied into a bytearray of the
+        full size, and the rest are read straight into it.
+        """
+        if size <= self.pending:
+            return self._take(self._start + size)
+        literal = bytearray(size)
+        have = self.pending
+        literal[:have] = self._buf[self._start:self._end]
+        self._start = self._end = 0
+        view = memoryview(literal)
+        try:
+            while have < size:
+                n = self._recv_into(view[have:])
+                if not n:
+                    break
+                have += n
+        finally:
+            del view
+        if have < size:
+            del literal[have:]
+        return bytes(literal)
+
+    def close(self):
+        if self._fileobj is not None:
+            self._fileobj.close()
+
+
+def _readinto(fileobj):
+    # A recv_into() style function for a pipe. Python 3 pipes have a
+    # raw file whose readinto() returns what is available; Python 2
+    # file objects would wait to fill the whole buffer.
+    raw = getattr(fileobj, 'raw', None)
+    if raw is not None:
+        return raw.readinto
+    fd = fileobj.fileno()
+
+    def readinto(buf):
+        data = os.read(fd, len(buf))
+        buf[:len(data)] = data
+        return len(data)
+    return readinto
+
+
+class BufferedTransport:
+    # Mixed in to the imaplib classes, which are old style classes
+    # under Python 2. Subclasses put a RecvBuffer where imaplib reads
+    # from in open().
+
+    _buffer = None
+
+    @property
+    def pending(self):
+        """The number of bytes received but not yet read."""
+        return self._buffer is not None and self._buffer.pending or 0
+
+    def _infile(self):
+        # Looked up on each read as compression replaces the file.
+        return self.file
+
+    def read(self, size):
+        return self._infile().read(size)
+
+    def readline(self):
+        line = self._infile().readline(MAXLINE + 1)
+        if len(line) > MAXLINE:
+            raise self.error('got more than %d bytes' % MAXLINE)
+        return line
+
+
+class IMAP4(BufferedTransport, imaplib.IMAP4):
+
+    def open(self, *args, **kwargs):
+        imaplib.IMAP4.open(self, *args, **kwargs)
+        self.file = self._buffer = RecvBuffer(self.sock.recv_into, self.file)
+
+
+class IMAP4_SSL(BufferedTransport, imaplib.IMAP4_SSL):
+
+    def open(self, *args, **kwargs):
+        imaplib.IMAP4_SSL.open(self, *args, **kwargs)
+        # Python 2 keeps the SSL object in sslobj.
+        sock = getattr(self, 'sslobj', None) or self.sock
+        self.file = self._buffer = RecvBuffer(sock.recv_into, self.file)
+
+
+class IMAP4_stream(BufferedTransport, imaplib.IMAP4_stream):
+
+    def open(self, *args, **kwargs):
+        imaplib.IMAP4_stream.open(self, *args, **kwargs)
+        self.readfile = self._buffer = RecvBuffer(_readinto(self.readfile),
+                                                  self.readfile)
+
+    def _infile(self):
+        return self.readfile
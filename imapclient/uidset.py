@@ -0,0 +1,252 @@
+# Copyright (c) 2013, Menno Smits
+# Released subject to the New BSD License
+# Please see http://en.wikipedia.org/wiki/BSD_licenses
+
+"""
+A set of message ids stored as ranges.
+
+Large folders tend to have long runs of consecutive UIDs, so a UIDSet
+stores the start and end of each run in two arrays rather than one
+Python int per message. It renders as a compact IMAP sequence set (eg.
+``1:5000,5002,5010:5020``) for use in commands.
+"""
+
+from __future__ import unicode_literals
+
+from array import array
+from bisect import bisect_right
+from itertools import chain
+
+from .six import binary_type, moves
+xrange = moves.xrange
+
+__all__ = ['UIDSet']
+
+# Unsigned, at least 32 bits: enough for any UID.
+_TYPECODE = 'L'
+
+
+class UIDSet(object):
+    """An immutable set of message ids (UIDs or sequence numbers).
+
+    *uids* is an iterable of integers, in any order and possibly with
+    duplicates. UIDSets support ``len()``, ``in``, iteration in
+    ascending order, comparison and the set operators ``|``, ``&`` and
+    ``-``.
+
+    ``str()`` of a UIDSet is its IMAP sequence set. UIDSets can be
+    passed to any IMAPClient method that takes *messages*.
+    """
+
+    __slots__ = ('_starts', '_ends')
+
+    def __init__(self, uids=()):
+        if isinstance(uids, UIDSet):
+            self._starts = uids._starts
+            self._ends = uids._ends
+            return
+        uids = [int(uid) for uid in uids]
+        try:
+            self._starts, self._ends = _runs(uids)
+        except _Unsorted:
+            uids.sort()
+            self._starts, self._ends = _runs(uids)
+
+    @classmethod
+    def from_ranges(cls, ranges):
+        """Create a UIDSet from ``(start, end)`` tuples, where *end* is
+        included. Ranges may overlap and be in any order.
+        """
+        uidset = cls.__new__(cls)
+        uidset._starts = starts = array(_TYPECODE)
+        uidset._ends = ends = array(_TYPECODE)
+        for start, end in sorted((int(s), int(e)) for s, e in ranges):
+            if start > end:
+                raise ValueError('invalid range %d:%d' % (start, end))
+            if ends and start <= ends[-1] + 1:
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        return uidset
+
+    @classmethod
+    def parse(cls, text):
+        """Create a UIDSet from an IMAP sequence set such as
+        ``'1:5,7,10:8'``. ``*`` can't be used as the set doesn't know
+        the largest id in the folder.
+        """
+        if isinstance(text, binary_type):
+            text = text.decode('ascii')
+        ranges = []
+        for item in text.split(','):
+            start, _, end = item.partition(':')
+            try:
+                start = int(start)
+                end = int(end) if end else start
+            except ValueError:
+                raise ValueError('invalid sequence set %r' % text)
+            if start > end:
+                start, end = end, start
+            ranges.append((start, end))
+        return cls.from_ranges(ranges)
+
+    @classmethod
+    def from_search(cls, data):
+        """Create a UIDSet from the space separated ids of a SEARCH (or
+        SORT) response line, as text or bytes. None gives an empty set.
+
+        Servers usually return ids in ascending order, in which case
+        runs are collected as the line is read, without building a
+        list of ids first.
+        """
+        if not data:
+            return cls()
+        uidset = cls.__new__(cls)
+        try:
+            uidset._starts, uidset._ends = _runs(int(uid) for uid in data.split())
+        except _Unsorted:
+            return cls(data.split())
+        return uidset
+
+    def ranges(self):
+        """Return a list of ``(start, end)`` tuples, *end* included."""
+        return list(zip(self._starts, self._ends))
+
+    def chunks(self, size):
+        """Yield UIDSets of at most *size* ids each, in ascending
+        order, which together make up this set.
+        """
+        if size < 1:
+            raise ValueError('size must be at least 1')
+        chunk = []
+        room = size
+        for start, end in zip(self._starts, self._ends):
+            while start <= end:
+                stop = min(end, start + room - 1)
+                chunk.append((start, stop))
+                room -= stop - start + 1
+                start = stop + 1
+                if not room:
+                    yield UIDSet.from_ranges(chunk)
+                    chunk = []
+                    room = size
+        if chunk:
+            yield UIDSet.from_ranges(chunk)
+
+    def to_seq_str(self):
+        """Return the IMAP sequence set for the ids, eg.
+        ``'1:5000,5002,5010:5020'``.
+        """
+        return ','.join('%d' % start if start == end else '%d:%d' % (start, end)
+                        for start, end in zip(self._starts, self._ends))
+
+    __str__ = to_seq_str
+
+    def union(self, other):
+        return UIDSet.from_ranges(chain(self.ranges(), _as_uidset(other).ranges()))
+
+    def intersection(self, other):
+        other = _as_uidset(other)
+        out = []
+        a, b = self.ranges(), other.ranges()
+        i = j = 0
+        while i < len(a) and j < len(b):
+            start = max(a[i][0], b[j][0])
+            end = min(a[i][1], b[j][1])
+            if start <= end:
+                out.append((start, end))
+            if a[i][1] < b[j][1]:
+                i += 1
+            else:
+                j += 1
+        return UIDSet.from_ranges(out)
+
+    def difference(self, other):
+        other = _as_uidset(other)
+        out = []
+        b = other.ranges()
+        j = 0
+        for start, end in self.ranges():
+            while j < len(b) and b[j][1] < start:
+                j += 1
+            k = j
+            while k < len(b) and b[k][0] <= end:
+                if b[k][0] > start:
+                    out.append((start, b[k][0] - 1))
+                start = max(start, b[k][1] + 1)
+                k += 1
+            if start <= end:
+                out.append((start, end))
+        return UIDSet.from_ranges(out)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+
+    def __len__(self):
+        return int(sum(self._ends) - sum(self._starts) + len(self._starts))
+
+    def __bool__(self):
+        return bool(self._starts)
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        return chain.from_iterable(xrange(start, end + 1)
+                                   for start, end in zip(self._starts, self._ends))
+
+    def __contains__(self, uid):
+        i = bisect_right(self._starts, uid) - 1
+        return i >= 0 and uid <= self._ends[i]
+
+    def __eq__(self, other):
+        if not isinstance(other, UIDSet):
+            return NotImplemented
+        return self._starts == other._starts and self._ends == other._ends
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "UIDSet('%s')" % self.to_seq_str()
+
+
+class _Unsorted(Exception):
+    pass
+
+
+def _as_uidset(uids):
+    if isinstance(uids, UIDSet):
+        return uids
+    return UIDSet(uids)
+
+
+def _runs(uids):
+    # Collect the runs in *uids*, which must be in ascending order
+    # (duplicates are allowed).
+    starts = array(_TYPECODE)
+    ends = array(_TYPECODE)
+    start = end = None
+    for uid in uids:
+        if end is not None:
+            if uid == end + 1:
+                end = uid
+                continue
+            if uid <= end:
+                if uid < start:
+                    raise _Unsorted()
+                continue
+            starts.append(start)
+            ends.append(end)
+        start = end = uid
+    if end is not None:
+        starts.append(start)
+        ends.append(end)
+    return starts, ends
@@ -12,18 +12,29 @@ import sys
 import getpass
 import imapclient
 import imapclient.six as six
-import copy
+from imapclient import batching, body_patterns
 import email
+import email.feedparser
 import base64
 import re
+import tempfile
+import threading
+import collections
+import itertools
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
 
 try:
     from ConfigParser import SafeConfigParser
 except ImportError:
     from configparser import SafeConfigParser
 from imapclient.config import parse_config_file, create_client_from_config
+from imapclient.pool import ConnectionPool
 
-import HTMLParser
+HTMLParser = six.moves.html_parser
 
 
 class MyHTMLParser(HTMLParser.HTMLParser):
@@ -102,44 +113,64 @@ class IMAPPYClient(imapclient.IMAPClient):
         return self.folderdata
         
 
-    def get_bodies(self,uids):
-        """Fragile if the folder changes while we work on it."""
+    def iter_bodies(self, uids, planner=None):
+        """Yield (uid, data) pairs of BODY and INTERNALDATE data,
+        a batch at a time.  Only the current batch is kept in memory.
+        Batch sizes are chosen by planner (a BatchPlanner, by default
+        a new one) and left in self.batch_sizes."""
+        if planner is None:
+            planner = batching.BatchPlanner()
+        for k, data in batching.fetch_in_batches(self, uids,
+                                                 ['BODY','INTERNALDATE'],
+                                                 planner):
+            yield k, data
+        self.batch_sizes = planner.batch_sizes
+
+
+    def get_bodies(self,uids, batch_size=50, window=16):
+        """Fragile if the folder changes while we work on it.
+        The batches are pipelined, window of them in flight at once,
+        so this costs about one round trip per window batches."""
         self.bodies = {}
-        # Do this in small batches of uids, using a scratch copy
-        # of the list which is deleted to track progress.
-        uids = copy.copy(uids)
         print("Getting %d body data." % len(uids), end="", file=sys.stderr)
-        while (uids):
+        uids = list(uids)
+        p = self.pipeline(window)
+        for i in range(0, len(uids), batch_size):
+            p.fetch(uids[i:i+batch_size], ['BODY','INTERNALDATE'])
+        for batch in p.iter_execute():
             print(".", end="", file=sys.stderr)
-            uidlist = uids[:50]
-            del(uids[:50])
-            data = self.fetch(uidlist,['BODY','INTERNALDATE'])
-            for _,k in enumerate(data):
-                self.bodies[k] = data[k]
+            for k, data in six.iteritems(batch.result()):
+                self.bodies.setdefault(k, {}).update(data)
         print(".ok", file=sys.stderr)
         print("Got %d bodies." % len(self.bodies), file=sys.stderr)
 
 
     def analyze_bodies(self,uids=None):
-        if (uids is not None):
-            self.get_bodies(uids)
+        """Find smime.p7m candidates among self.bodies, or if uids are
+        given, among those messages as they stream in from the server
+        (without storing every body in self.bodies)."""
+        if (uids is None):
+            bodies = six.iteritems(self.bodies)
+            print("Checking %d bodies." % len(self.bodies),
+                  end="", file=sys.stderr)
+        else:
+            bodies = self.iter_bodies(uids)
+            print("Checking %d bodies." % len(uids),
+                  end="", file=sys.stderr)
         self.candidates = {}
-        print("Checking %d bodies." % len(self.bodies),
-              end="", file=sys.stderr)
-        for i,k in enumerate(self.bodies):
-            if (i % 50 == 0):
+        for i, (k, data) in enumerate(bodies):
+            if (uids is None and i % 50 == 0):
                 print(".", end="", file=sys.stderr)
-            
-            b = self.bodies[k]['BODY']
-
-            if has_smimep7m(b):
-                self.candidates[k] = self.bodies[k]
-                # Fetch and merge envelope data (for UID number k)
-                # It's fine to overwrite duplcate keys (like SEQ)
-                env = self.fetch(k,'ENVELOPE')
-                for key in env[k].keys():
-                    self.candidates[k][key] = env[k][key]
-                
+            if has_smimep7m(data.get('BODY')):
+                self.candidates[k] = data
+
+        # Fetch and merge envelope data for all candidates at once.
+        # It's fine to overwrite duplcate keys (like SEQ)
+        if self.candidates:
+            env = self.fetch(list(self.candidates), 'ENVELOPE')
+            for k in self.candidates:
+                self.candidates[k].update(env.get(k, {}))
+
         print(".ok", file=sys.stderr)
         print("Found %d smime.p7m candidates." % len(self.candidates),
               file=sys.stderr)
@@ -157,9 +188,12 @@ class IMAPPYClient(imapclient.IMAPClient):
 
     # DANGER DANGER doesn't have enough error handling
     # Don't call it from wrong folder, without proper preparation, etc.
-    # Whoah wait I don't want to store hundreds of messages in-memory.
-    def fetch_rfc822(self, uids):
-        """Fetches RFC822 data for given uids"""
+    def fetch_rfc822(self, uids, spool_threshold=1024*1024):
+        """Fetches RFC822 data for given uids into self.rfc822.
+        Messages of at least spool_threshold bytes are written to
+        temporary files as they arrive, so memory use stays bounded;
+        self.rfc822 holds the raw (possibly spooled) messages,
+        to be parsed lazily with message_from_buffer."""
         self.rfc822 = {}
         total = 0
         if not isinstance(uids, (list,tuple)):
@@ -167,82 +201,254 @@ class IMAPPYClient(imapclient.IMAPClient):
         count = len(uids)
         print("Downloading %d full messages." % count,
               end="", file=sys.stderr)
-        for _,k in enumerate(uids):
-            print(".", end="", file=sys.stderr)
-            d = self.fetch(k,'RFC822')[k]['RFC822']
-            msg = email.message_from_string(d)
-            self.rfc822[k] = msg
-            total += len(d)
+        # Get the raw bytes, not a latin-1 decoded copy of them.
+        buffer_literals = self.buffer_literals
+        saved_threshold = self.spool_threshold
+        self.buffer_literals = True
+        self.spool_threshold = spool_threshold
+        try:
+            for _,k in enumerate(uids):
+                print(".", end="", file=sys.stderr)
+                d = self.fetch(k,'RFC822')[k]['RFC822']
+                self.rfc822[k] = d
+                total += len(d)
+        finally:
+            self.buffer_literals = buffer_literals
+            self.spool_threshold = saved_threshold
         print(".ok", file=sys.stderr)
         print("Downloaded a total of %d bytes." % total,
               file=sys.stderr)
 
+    def _fetch_raw(self, uid, item, key):
+        # Fetch one item of one message as raw bytes
+        # (a memoryview, or a SpooledLiteral if spool_threshold is set).
+        buffer_literals = self.buffer_literals
+        self.buffer_literals = True
+        try:
+            return self.fetch(uid, [item])[uid][key]
+        finally:
+            self.buffer_literals = buffer_literals
+
+    def fetch_header(self, uid):
+        """Fetches the raw header block of a message as bytes,
+        without setting the \\Seen flag."""
+        return to_bytes(self._fetch_raw(uid, 'BODY.PEEK[HEADER]', 'BODY[HEADER]'))
+
+    def iter_section(self, uid, section, size=None, chunk_size=4*1024*1024):
+        """Yields the raw content of one body section of a message
+        (eg. '2', a section number as used by BodyData.get_section),
+        without setting the \\Seen flag.  A section known to be larger
+        than chunk_size bytes (size, from the BODY structure) is
+        fetched in <offset.length> pieces, one FETCH per piece."""
+        if size is not None and size <= chunk_size:
+            yield self._fetch_raw(uid, 'BODY.PEEK[%s]' % section,
+                                  'BODY[%s]' % section)
+            return
+        offset = 0
+        while True:
+            chunk = self._fetch_raw(uid,
+                                    'BODY.PEEK[%s]<%d.%d>' % (section, offset, chunk_size),
+                                    'BODY[%s]<%d>' % (section, offset))
+            if len(chunk):
+                yield chunk
+            if len(chunk) < chunk_size:
+                return
+            offset += len(chunk)
+
 #end class IMAPPYClient
 
 
 def doit(c, auid, upload=None, trash=None):
     '''Given a UID, fetch it from the selected folder, convert it,
-    upload it to a folder, possibly trash it (copy to trash and flag \Deleted)
+    upload it to a folder, possibly trash it (move it to the trash folder)
 
     Inputs:
     upload = name of upload folder
     trash = name of trash folder'''
 
     internaldate = c.candidates[auid]['INTERNALDATE']
-    c.fetch_rfc822(auid)
-    c.msg = c.rfc822[auid]
-    c.msg_new = convert_smimep7m_to_new_email(c.msg)
+    found = find_smimep7m_section(c.candidates[auid].get('BODY'))
+    if found is not None:
+        # Only download the header and the smime.p7m part.
+        section, size = found
+        print("Downloading %d byte smime.p7m part." % size, file=sys.stderr)
+        c.msg_new = convert_smimep7m_stream(c.fetch_header(auid),
+                                            c.iter_section(auid, section, size))
+        # multi_append sends it from its file a chunk at a time.
+        new_message = c.msg_new
+    else:
+        c.fetch_rfc822(auid)
+        c.msg = message_from_buffer(c.rfc822[auid])
+        c.msg_new = convert_smimep7m_to_new_email(c.msg)
+        new_message = c.msg_new.as_string()
     
     if upload is not None:
         print("Uploading..", end="",
               file=sys.stderr)
-        c.append(upload,c.msg_new.as_string(),msg_time=internaldate)
+        c.multi_append(upload, [(new_message, (), internaldate)])
         print(".done", file=sys.stderr)
 
     if trash is not None:
-        print("Copying to trash.", end="", file=sys.stderr)
-        c.copy(auid, trash)
-        c.add_flags(auid, r'\Deleted')
-        print("..and flagged as deleted, ready for expunge.")
+        print("Moving to trash..", end="", file=sys.stderr)
+        c.trashed = c.move(auid, trash)
+        print(".done", file=sys.stderr)
 
     # ...free memory
+    if isinstance(c.msg_new, imapclient.SpooledLiteral):
+        c.msg_new.close()
     c.rfc822 = {}
     c.msg = ""
     c.msg_new = ""
     return None
 
 
+def convert_raw_message(raw):
+    """Convert the raw bytes of an smime.p7m message,
+    returning the converted message as a string ready for upload.
+    Runs in a worker process, so it only takes and returns
+    picklable values."""
+    return convert_smimep7m_to_new_email(message_from_buffer(raw)).as_string()
+
+
+class InlineExecutor(object):
+    """Stands in for a concurrent.futures executor, running each
+    function when it is submitted."""
+
+    class Future(object):
+        def __init__(self, fn, args):
+            try:
+                self._value, self._error = fn(*args), None
+            except Exception as e:
+                self._value, self._error = None, e
+        def result(self):
+            if self._error is not None:
+                raise self._error
+            return self._value
+
+    def submit(self, fn, *args):
+        return self.Future(fn, args)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def doit_many(c, auids, upload=None, trash=None,
+              max_pending=4, executor=None):
+    '''Like doit for many UIDs, with the conversions done in a pool of
+    worker processes so that they overlap the downloads and uploads.
+
+    At most max_pending downloaded messages wait for conversion or
+    upload at once, which bounds the memory used.  Messages are
+    uploaded in the order of auids, then all moved to the trash
+    folder with one command; the old-to-new UID mapping of the
+    move is left in c.trashed.
+
+    Inputs:
+    upload = name of upload folder
+    trash = name of trash folder
+    executor = a concurrent.futures executor to use
+               (default: a ProcessPoolExecutor, shut down when done;
+               without concurrent.futures, such as on Python 2 without
+               the futures backport, the conversions run in-process)'''
+    own_executor = executor is None
+    if own_executor:
+        if ProcessPoolExecutor is None:
+            executor = InlineExecutor()
+        else:
+            executor = ProcessPoolExecutor()
+    pending = collections.deque()
+    uploaded = []
+
+    def finish_oldest():
+        auid, future = pending.popleft()
+        converted = future.result()
+        if upload is not None:
+            c.append(upload, converted,
+                     msg_time=c.candidates[auid]['INTERNALDATE'])
+        uploaded.append(auid)
+        print(".", end="", file=sys.stderr)
+
+    print("Converting %d messages." % len(auids), end="", file=sys.stderr)
+    buffer_literals = c.buffer_literals
+    c.buffer_literals = True
+    try:
+        for auid in auids:
+            if len(pending) >= max_pending:
+                finish_oldest()
+            raw = c.fetch(auid, 'RFC822')[auid]['RFC822']
+            pending.append((auid, executor.submit(convert_raw_message, to_bytes(raw))))
+            del raw
+        while pending:
+            finish_oldest()
+    finally:
+        c.buffer_literals = buffer_literals
+        if own_executor:
+            executor.shutdown()
+    print(".ok", file=sys.stderr)
+    if trash is not None:
+        c.trashed = c.move(uploaded, trash)
+        print("Moved %d messages to trash." % len(uploaded), file=sys.stderr)
 
 
+
+
+def message_from_buffer(buf, chunk_size=65536):
+    """Parse an <email.message.Message> from a bytes-like buffer
+    (eg. a memoryview from fetch with buffer_literals set)
+    or a SpooledLiteral (from fetch with spool_threshold set),
+    feeding it to the parser a chunk at a time
+    rather than making a full copy of it first."""
+    if six.PY3:
+        parser = email.feedparser.BytesFeedParser()
+    else:
+        parser = email.feedparser.FeedParser()
+    for chunk in iter_buffer(buf, chunk_size):
+        parser.feed(chunk)
+    return parser.close()
+
+
+def iter_buffer(buf, chunk_size=65536):
+    """Yield the contents of a bytes-like buffer or a SpooledLiteral
+    as bytes, chunk_size bytes at a time."""
+    if isinstance(buf, imapclient.SpooledLiteral):
+        for chunk in buf.iter_chunks(chunk_size):
+            yield chunk
+    else:
+        for i in six.moves.xrange(0, len(buf), chunk_size):
+            yield to_bytes(buf[i:i+chunk_size])
+
+
+def to_bytes(buf):
+    """Copy a bytes-like buffer or a SpooledLiteral to bytes.
+    (Under Python 2, bytes(memoryview) is its repr, not its content.)"""
+    if isinstance(buf, imapclient.SpooledLiteral):
+        return buf.read()
+    if isinstance(buf, memoryview):
+        return buf.tobytes()
+    return bytes(buf)
+
+
+
+_is_smimep7m = body_patterns.compile(body_patterns.SMIME_P7M)
+
 def has_smimep7m(b):
-    """Simplistic check for smime.p7m attachment.
-    Input: a tuple representing a BODY fetch result from imapclient.
+    """Check for an smime.p7m attachment.
+    Input: a tuple representing a BODY or BODYSTRUCTURE fetch result
+    from imapclient.
     Returns: Boolean true/false."""
+    return _is_smimep7m(b)
 
-    # This is madness!
-    # I need a proper parser!
-    if (isinstance(b, (tuple,list))
-        and isinstance(b[-1], six.string_types)
-        and b[-1].lower() == 'mixed'
-        and isinstance(b[0], (tuple,list))
-        # Ignore other details of first part b[0]
-        and isinstance(b[1], (tuple,list))
-        and len(b[1]) >= 7
-        and isinstance(b[1][0], six.string_types)
-        and b[1][0].lower() == 'application'
-        and isinstance(b[1][1], six.string_types)
-        and b[1][1].lower() == 'octet-stream'
-        and isinstance(b[1][2], (tuple,list))
-        and isinstance(b[1][2][0], six.string_types)
-        and b[1][2][0].lower() == 'name'
-        and isinstance(b[1][2][1], six.string_types)
-        and b[1][2][1].lower() == 'smime.p7m'
-        and isinstance(b[1][5], six.string_types)
-        and b[1][5].lower() == 'base64'
-        ):
-        return True
-    else:
-        return False
+
+def find_smimep7m_section(b):
+    """Find the smime.p7m attachment of a candidate.
+    Input: a BODY or BODYSTRUCTURE fetch result, as for has_smimep7m.
+    Returns: (section, size), the IMAP section number of the attachment
+    and the size of its (base64) content in bytes, or None if the
+    message is not a candidate."""
+    if not has_smimep7m(b):
+        return None
+    section = '2'     # SMIME_P7M only matches the second part
+    return section, b[int(section) - 1][6]
 
 
 
@@ -266,11 +472,121 @@ def convert_smimep7m_to_new_email(msg):
     
     smime_p7m = p.get_payload()
     converted = base64.b64decode(smime_p7m)
+    return rebuild_message(msg, converted)
+
+
+def convert_smimep7m_stream(header, p7m, max_memory=1024*1024,
+                            chunk_size=65536):
+    """Like convert_smimep7m_to_new_email, but from just the raw
+    header block of the message and the raw (base64) content of its
+    smime.p7m attachment, as fetched by fetch_header and iter_section.
+    p7m may be a buffer, a SpooledLiteral or a sequence of them.
+
+    The attachment is decoded chunk_size bytes at a time and written,
+    after the original headers (with the Content-Type of the decoded
+    message), to a temporary file that stays in memory until it grows
+    past max_memory bytes.  So no whole copy of the encoded or decoded
+    message is ever built.
+
+    Line endings are written as CRLF, so the result can be uploaded
+    as is with multi_append.
+
+    Returns: the new message as a SpooledLiteral."""
+    if isinstance(p7m, (bytes, memoryview, imapclient.SpooledLiteral)):
+        p7m = [p7m]
+    encoded = (chunk for buf in p7m for chunk in iter_buffer(buf, chunk_size))
+    decoded = iter_b64decode(encoded)
+
+    # Collect the header block of the decoded message.
+    inner = b''
+    match = None
+    for chunk in decoded:
+        inner += chunk
+        match = _end_of_header.search(inner)
+        if match:
+            break
+    if match:
+        inner_header, rest = inner[:match.start()], inner[match.end():]
+    else:
+        inner_header, rest = inner, b''
+
+    content_type = [f for f in _header_fields(inner_header)
+                    if _field_name(f) == b'content-type'][:1]
+    fields = []
+    for field in _header_fields(header):
+        if content_type and _field_name(field) == b'content-type':
+            field = content_type.pop()
+        fields.append(field)
+    out = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    size = 0
+    for chunk in iter_crlf(itertools.chain(fields, [b'\r\n', rest], decoded)):
+        out.write(chunk)
+        size += len(chunk)
+    return imapclient.SpooledLiteral(out, size)
+
+
+_end_of_header = re.compile(br'^\r?\n|\r?\n\r?\n')
+_not_base64 = re.compile(br'[^A-Za-z0-9+/=]')
+
+def iter_b64decode(chunks):
+    """Decode base64 data given as a sequence of bytes chunks,
+    yielding the decoded bytes a chunk at a time.
+    Line breaks (and other non-alphabet characters) may fall anywhere;
+    they are ignored, as by base64.b64decode."""
+    rest = b''
+    for chunk in chunks:
+        data = rest + _not_base64.sub(b'', chunk)
+        n = len(data) - len(data) % 4
+        rest = data[n:]
+        if n:
+            yield base64.b64decode(data[:n])
+    if rest:
+        yield base64.b64decode(rest)
+
+
+_line_end = re.compile(br'\r\n|\r|\n')
+
+def iter_crlf(chunks):
+    """Yield the bytes chunks given with every line ending
+    (CR, LF or CRLF, possibly split between chunks) as CRLF."""
+    cr = False      # the last chunk ended in CR
+    for chunk in chunks:
+        if cr:
+            chunk = b'\r' + chunk
+        cr = chunk.endswith(b'\r')
+        if cr:
+            chunk = chunk[:-1]
+        if chunk:
+            yield _line_end.sub(b'\r\n', chunk)
+    if cr:
+        yield b'\r\n'
+
+
+def _header_fields(block):
+    # Split a raw header block into its fields, each with its
+    # continuation lines, ending in a line break.
+    fields = []
+    for line in block.splitlines(True):
+        if line[:1] in (b' ', b'\t') and fields:
+            fields[-1] += line
+        elif line.strip():
+            fields.append(line)
+    return [f if f.endswith(b'\n') else f + b'\r\n' for f in fields]
+
+
+def _field_name(field):
+    return field.split(b':', 1)[0].strip().lower()
+
+
+def rebuild_message(msg, converted):
+    """Input: the original <email.message.Message> (only its headers
+    are used) and the decoded content of its smime.p7m attachment.
+    Output: a new <email.message.Message>"""
 
     # The converted data will be the payload of a new Message,
     # with the headers copied from the original message.
 
-    msg_new = email.message_from_string(converted)
+    msg_new = message_from_buffer(converted)
 
     saved_content_type = msg_new['Content-Type']
 
@@ -294,6 +610,111 @@ def convert_smimep7m_to_new_email(msg):
 
 
 
+def scan_folder(client, folder, uidvalidity=None, batch_size=50, cache=None,
+                select_info=None):
+    """Find smime.p7m candidates in one folder.
+    Selects the folder read-only on the given client, unless its
+    uidvalidity or select_info (the select_folder() response) is
+    given (meaning it is already selected), and returns
+    a dict of BODY and INTERNALDATE data keyed by
+    (folder, uidvalidity, uid), like the fields of a Message.
+
+    If cache (an imapclient.cache.MetadataCache) is given, only
+    messages new since the last scan are fetched, and the data
+    is BODYSTRUCTURE, INTERNALDATE and the other cached items."""
+    if select_info is not None:
+        uidvalidity = select_info['UIDVALIDITY']
+    if cache is not None:
+        metadata = cache.sync_folder(client, folder, select_info=select_info)
+        uidvalidity = cache.folder_state(client.host, folder)[0]
+        return dict(((folder, uidvalidity, k), data)
+                    for k, data in six.iteritems(metadata)
+                    if has_smimep7m(data.get('BODYSTRUCTURE')))
+    if uidvalidity is None:
+        uidvalidity = client.select_folder(folder, readonly=True)['UIDVALIDITY']
+    found = {}
+    for batch in client.search_uidset('ALL').chunks(batch_size):
+        for k, data in client.iter_fetch(batch, ['BODY','INTERNALDATE']):
+            if has_smimep7m(data.get('BODY')):
+                found[(folder, uidvalidity, k)] = data
+    return found
+
+
+def scan_folders(folders, conf=None, pool=None, concurrency=4, batch_size=50,
+                 cache=None):
+    """Find smime.p7m candidates in many folders at once.
+
+    Inputs:
+    folders = folder names, or the result of list_folders()
+              (folders flagged \\Noselect are skipped)
+    conf = config Bunch (see imapclient.config.parse_config_file),
+           used to log in a pool of concurrency connections
+    pool = an imapclient.pool.ConnectionPool to use instead of conf
+    cache = an imapclient.cache.MetadataCache (see scan_folder)
+
+    Each folder is scanned on one of concurrency worker threads,
+    with its own connection from the pool.
+    Returns (candidates, failed): candidates is a dict keyed by
+    (folder, uidvalidity, uid) as per scan_folder, failed is a dict
+    of folder name -> the exception that stopped its scan."""
+    names = []
+    for f in folders:
+        if isinstance(f, tuple):
+            if '\\Noselect' in f[0]:
+                continue
+            f = f[2]
+        names.append(f)
+
+    own_pool = pool is None
+    if own_pool:
+        pool = ConnectionPool(conf, size=concurrency)
+    todo = six.moves.queue.Queue()
+    for name in names:
+        todo.put(name)
+    candidates = {}
+    failed = {}
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                folder = todo.get_nowait()
+            except six.moves.queue.Empty:
+                return
+            try:
+                # Let the pool do the SELECT, so it knows the folder,
+                # and pass on its response so it isn't repeated.
+                with pool.connection(folder, readonly=True) as client:
+                    found = scan_folder(client, folder, None, batch_size,
+                                        cache, pool.folder_info(client))
+            except Exception as e:
+                with lock:
+                    failed[folder] = e
+                print("Scan of {} failed: {}".format(folder, e), file=sys.stderr)
+                continue
+            with lock:
+                candidates.update(found)
+                print(".", end="", file=sys.stderr)
+
+    print("Scanning %d folders." % len(names), end="", file=sys.stderr)
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(concurrency, len(names)))]
+    try:
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        if own_pool:
+            pool.close()
+    print(".ok", file=sys.stderr)
+    print("Found %d smime.p7m candidates in %d folders." %
+          (len(candidates), len(names) - len(failed)), file=sys.stderr)
+    return candidates, failed
+
+
+
 
 h = {}                          # host dict
 u = {}                          # user dict
@@ -340,11 +761,18 @@ c.analyze_bodies()              # result in c.candidates
 
 cuids = c.candidates.keys()
 
+### or scan every folder, 4 connections at a time
+conf = parse_config_file(os.path.expanduser('~/Private/.imappy-exchange.ini'))
+candidates, failed = imappy.scan_folders(c.list_folders(), conf, concurrency=4)
+
 first = cuids[0:1]
 
 for auid in first:
     imappy.doit(c, auid, upload=folder_dest, trash=folder_del)
 
+### or convert in worker processes while downloading the next ones
+imappy.doit_many(c, cuids, upload=folder_dest, trash=folder_del)
+
 del(cuids[0:1])
 
 #first = cuids[0:2]
@@ -352,7 +780,8 @@ del(cuids[0:1])
 
 #mostly done
 
-#to see what will be expunged
+#move() only leaves messages behind, flagged as deleted,
+#on servers with neither MOVE nor UIDPLUS.  To see what will be expunged
 c.search('deleted')
 
 c.expunge()
@@ -8,9 +8,86 @@ test_imappy
 Tests for `imappy` module.
 """
 
+from __future__ import unicode_literals
+
+import base64
 import unittest
+from datetime import datetime
+
+from mock import Mock
+
+import imapclient
+import imappy
+from imapclient.cache import MetadataCache
+from imapclient.uidset import UIDSet
+
+
+INNER = b'Content-Type: text/plain\r\n\r\nsecret text\r\n'
+
+SMIME_HEADER = (
+    b'Subject: wrapped\r\n'
+    b'Content-Type: multipart/mixed; boundary="b1"\r\n'
+    b'\r\n')
+
+SMIME_P7M = base64.b64encode(INNER) + b'\r\n'
+
+SMIME_MESSAGE = (
+    SMIME_HEADER +
+    b'--b1\r\n'
+    b'Content-Type: text/plain\r\n'
+    b'\r\n'
+    b'see attachment\r\n'
+    b'--b1\r\n'
+    b'Content-Type: application/octet-stream; name="smime.p7m"\r\n'
+    b'Content-Transfer-Encoding: base64\r\n'
+    b'\r\n' +
+    SMIME_P7M +
+    b'--b1--\r\n')
+
+INTERNALDATE = datetime(2013, 2, 3, 4, 5, 6)
+
+
+SMIME_BODY = (
+    ('text', 'plain', ('charset', 'us-ascii'), None, None, '7bit', 14, 1),
+    ('application', 'octet-stream', ('name', 'smime.p7m'), None, None,
+     'base64', len(SMIME_P7M)),
+    'mixed')
 
-from imappy import imappy
+
+class FakeClient(imappy.IMAPPYClient):
+
+    def _create_IMAP4(self):
+        return Mock()
+
+
+def fake_client(fetched):
+    # A client whose fetch() returns fetched[item] (with BODY.PEEK
+    # items keyed by their BODY name) as a memoryview, as it does
+    # with buffer_literals set.
+    c = FakeClient('imap.test')
+    c.candidates = {}
+
+    def fetch(uid, items):
+        if not isinstance(items, list):
+            items = [items]
+        out = {}
+        for item in items:
+            key = item.replace('BODY.PEEK', 'BODY')
+            out[key] = memoryview(fetched[item])
+        return {uid: out}
+    c.fetch = Mock(side_effect=fetch)
+    c.append = Mock()
+    c.uploaded = []
+
+    def multi_append(folder, messages):
+        # Read spooled messages now, as doit closes them afterwards.
+        for msg, flags, msg_time in messages:
+            if isinstance(msg, imapclient.SpooledLiteral):
+                msg = msg.read()
+            c.uploaded.append((folder, msg, flags, msg_time))
+    c.multi_append = Mock(side_effect=multi_append)
+    c.move = Mock(return_value={7: 70})
+    return c
 
 
 class TestImappy(unittest.TestCase):
@@ -24,5 +101,98 @@ class TestImappy(unittest.TestCase):
     def tearDown(self):
         pass
 
+
+class TestDoit(unittest.TestCase):
+
+    def test_smimep7m_section(self):
+        c = fake_client({'BODY.PEEK[HEADER]': SMIME_HEADER,
+                         'BODY.PEEK[2]': SMIME_P7M})
+        c.candidates[7] = {'INTERNALDATE': INTERNALDATE, 'BODY': SMIME_BODY}
+
+        imappy.doit(c, 7, upload='new', trash='Trash')
+
+        self.assertEqual([call[0][1] for call in c.fetch.call_args_list],
+                         [['BODY.PEEK[HEADER]'], ['BODY.PEEK[2]']])
+        self.assertEqual(c.uploaded, [('new',
+                                       b'Subject: wrapped\r\n'
+                                       b'Content-Type: text/plain\r\n'
+                                       b'\r\n'
+                                       b'secret text\r\n',
+                                       (), INTERNALDATE)])
+        self.assertFalse(c.append.called)
+        c.move.assert_called_once_with(7, 'Trash')
+        self.assertEqual(c.trashed, {7: 70})
+
+    def test_full_message(self):
+        c = fake_client({'RFC822': SMIME_MESSAGE})
+        c.candidates[7] = {'INTERNALDATE': INTERNALDATE, 'BODY': None}
+
+        imappy.doit(c, 7, upload='new')
+
+        [(folder, converted, flags, msg_time)] = c.uploaded
+        self.assertIn('secret text', converted)
+        self.assertEqual(msg_time, INTERNALDATE)
+
+
+class TestConvertStream(unittest.TestCase):
+
+    def test_line_endings(self):
+        inner = b'Content-Type: text/plain\n\nline 1\nline 2\r\n'
+        p7m = base64.b64encode(inner)
+        chunks = [p7m[:5], p7m[5:21], p7m[21:]]
+        with imappy.convert_smimep7m_stream(SMIME_HEADER, chunks, chunk_size=3) as out:
+            self.assertEqual(out.read(),
+                             b'Subject: wrapped\r\n'
+                             b'Content-Type: text/plain\r\n'
+                             b'\r\n'
+                             b'line 1\r\nline 2\r\n')
+
+    def test_iter_crlf(self):
+        self.assertEqual(b''.join(imappy.iter_crlf([b'a\r', b'\nb\n', b'c\r', b'd\r'])),
+                         b'a\r\nb\r\nc\r\nd\r\n')
+
+
+class TestScanFolders(unittest.TestCase):
+
+    def test_cache_uses_pool_select(self):
+        client = Mock()
+        client.host = 'imap.test'
+        client.fetch.return_value = {7: {'SEQ': 1, 'BODYSTRUCTURE': SMIME_BODY,
+                                         'INTERNALDATE': INTERNALDATE}}
+        client.search_uidset.return_value = UIDSet([7])
+        pool = Mock()
+        pool.connection.return_value.__enter__ = Mock(return_value=client)
+        pool.connection.return_value.__exit__ = Mock(return_value=False)
+        pool.folder_info.return_value = {'UIDVALIDITY': 3, 'UIDNEXT': 8}
+
+        candidates, failed = imappy.scan_folders(['INBOX'], pool=pool,
+                                                 cache=MetadataCache())
+
+        self.assertEqual(failed, {})
+        self.assertEqual(list(candidates), [('INBOX', 3, 7)])
+        pool.connection.assert_called_once_with('INBOX', readonly=True)
+        self.assertFalse(client.select_folder.called)
+
+
+class TestDoitMany(unittest.TestCase):
+
+    def test_converts_buffers(self):
+        c = fake_client({'RFC822': SMIME_MESSAGE})
+        c.candidates[7] = {'INTERNALDATE': INTERNALDATE}
+
+        imappy.doit_many(c, [7], upload='new', executor=imappy.InlineExecutor())
+
+        (folder, converted), kwargs = c.append.call_args
+        self.assertEqual(folder, 'new')
+        self.assertEqual(kwargs, {'msg_time': INTERNALDATE})
+        self.assertIn('secret text', converted)
+        self.assertIn('Subject: wrapped', converted)
+        self.assertFalse(c.buffer_literals)
+
+    def test_inline_executor(self):
+        future = imappy.InlineExecutor().submit(int, 'x')
+        self.assertRaises(ValueError, future.result)
+
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()